@@ -5,6 +5,6 @@ storage-only and embedding swaps are independent of vector storage.
 """
 
 from .base import Embedder
-from .factory import create_embedder
+from .factory import create_embedder, create_ingest_embedder, create_service_embedder
 
-__all__ = ["Embedder", "create_embedder"]
+__all__ = ["Embedder", "create_embedder", "create_ingest_embedder", "create_service_embedder"]
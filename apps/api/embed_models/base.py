@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List
 
 
 class Embedder(ABC):
@@ -28,3 +28,12 @@ class Embedder(ABC):
     def embed_one(self, text: str) -> List[float]:
         """Convenience wrapper around `embed_texts`."""
         return self.embed_texts([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Runtime counters surfaced on the KB service's `/health`.
+        Wrapping embedders (batching, caching) merge their own section
+        on top of the inner embedder's."""
+        return {"model": self.model_name}
+
+    def close(self) -> None:
+        """Release any held resources. Default is a no-op."""
@@ -0,0 +1,177 @@
+"""Cross-request micro-batching in front of an Embedder.
+
+The KB service handles `/multi` on worker threads, and every search
+embeds its 1-6 rewritten queries with its own `embed_texts` call. On
+CPU, ten concurrent batch-of-3 forward passes through bge-m3 cost far
+more than one batch-of-30 pass, so this wrapper parks callers for a
+few milliseconds, concatenates whatever arrived, runs one batched
+encode on a dedicated dispatcher thread and hands every caller back
+its own slice.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .base import Embedder
+
+logger = logging.getLogger("fshd_kb.embed_models.batching")
+
+
+class _PendingRequest:
+    __slots__ = ("texts", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, texts: List[str]) -> None:
+        self.texts = texts
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result: Optional[List[List[float]]] = None
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatchingEmbedder(Embedder):
+    """Coalesce concurrent `embed_texts` calls into batched encodes.
+
+    A batch is dispatched when `max_batch` texts are queued or when
+    the oldest queued request has waited `window_ms`, whichever comes
+    first. A single request larger than `max_batch` is dispatched on
+    its own rather than split, so ingest-sized batches keep the inner
+    embedder's own batching behaviour.
+    """
+
+    def __init__(self, inner: Embedder, window_ms: float = 5.0, max_batch: int = 32) -> None:
+        self.inner = inner
+        self.model_name = inner.model_name
+        self.dimension = inner.dimension
+        self.window_s = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+
+        self._cond = threading.Condition()
+        self._queue: Deque[_PendingRequest] = deque()
+        self._queued_texts = 0
+
+        # Metrics. Guarded by `_cond` so /health snapshots are coherent.
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._fill_sum = 0.0
+        self._wait_sum_s = 0.0
+        self._wait_max_s = 0.0
+
+        self._dispatcher = threading.Thread(
+            target=self._run,
+            name="embed-microbatch",
+            daemon=True,
+        )
+        self._dispatcher.start()
+        logger.info(
+            "Micro-batching embedder ready: model=%s window_ms=%.1f max_batch=%d",
+            self.model_name,
+            self.window_s * 1000.0,
+            self.max_batch,
+        )
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        request = _PendingRequest(list(texts))
+        with self._cond:
+            self._queue.append(request)
+            self._queued_texts += len(request.texts)
+            self._cond.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result or []
+
+    # --------------------------------------------------------------- dispatch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            self._dispatch(batch)
+
+    def _collect_batch(self) -> List[_PendingRequest]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0].enqueued_at + self.window_s
+            while self._queued_texts < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch: List[_PendingRequest] = []
+            size = 0
+            while self._queue:
+                nxt = self._queue[0]
+                if batch and size + len(nxt.texts) > self.max_batch:
+                    break
+                self._queue.popleft()
+                batch.append(nxt)
+                size += len(nxt.texts)
+            self._queued_texts -= size
+            return batch
+
+    def _dispatch(self, batch: List[_PendingRequest]) -> None:
+        started = time.monotonic()
+        texts = [text for request in batch for text in request.texts]
+        try:
+            vectors = self.inner.embed_texts(texts)
+            if len(vectors) != len(texts):
+                raise RuntimeError(
+                    f"Embedder returned {len(vectors)} vectors for {len(texts)} texts"
+                )
+        except BaseException as exc:  # noqa: BLE001 - re-raised in each caller
+            for request in batch:
+                request.error = exc
+                request.done.set()
+            return
+
+        offset = 0
+        for request in batch:
+            request.result = vectors[offset : offset + len(request.texts)]
+            offset += len(request.texts)
+
+        with self._cond:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts += len(texts)
+            self._fill_sum += min(1.0, len(texts) / self.max_batch)
+            for request in batch:
+                waited = started - request.enqueued_at
+                self._wait_sum_s += waited
+                if waited > self._wait_max_s:
+                    self._wait_max_s = waited
+
+        for request in batch:
+            request.done.set()
+
+    # ---------------------------------------------------------------- metrics
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            batches = self._batches
+            requests = self._requests
+            snapshot = {
+                "batches": batches,
+                "requests": requests,
+                "texts": self._texts,
+                "queued_texts": self._queued_texts,
+                "avg_fill_ratio": round(self._fill_sum / batches, 4) if batches else 0.0,
+                "avg_queue_wait_ms": (
+                    round(self._wait_sum_s * 1000.0 / requests, 3) if requests else 0.0
+                ),
+                "max_queue_wait_ms": round(self._wait_max_s * 1000.0, 3),
+                "window_ms": self.window_s * 1000.0,
+                "max_batch": self.max_batch,
+            }
+        return {**self.inner.stats(), "micro_batching": snapshot}
+
+    def close(self) -> None:
+        self.inner.close()
@@ -0,0 +1,275 @@
+"""LRU + TTL cache of query embeddings.
+
+The Node orchestrator rewrites most questions into the same handful of
+standard FSHD phrasings ("FSHD 是什么病", "D4Z4 重复减少" ...), so the KB
+service keeps paying a full transformer forward pass for vectors it
+has already computed. This wrapper memoises `embed_texts` per text.
+
+Keys are a sha256 over the model name plus the whitespace-normalised
+text, never the text itself: queries routinely carry patient context
+and neither the in-memory table nor the optional on-disk snapshot
+should become a second store of PHI.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base import Embedder
+
+logger = logging.getLogger("fshd_kb.embed_models.cache")
+
+#: Bumped when the snapshot layout changes; mismatching files are ignored.
+_SNAPSHOT_VERSION = 1
+
+#: Rough per-entry overhead (key string, OrderedDict node, tuple, array
+#: header) on top of the 4 bytes per float32 component. Only used for
+#: the memory budget, so it errs on the generous side.
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+def _norm_text(text: str) -> str:
+    # Same normalisation as knowledge._norm_text, duplicated so the
+    # embed_models package stays importable without knowledge.py.
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\x1f")
+    h.update(_norm_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+
+class CachingEmbedder(Embedder):
+    """Bounded LRU + TTL memo in front of another Embedder.
+
+    `max_bytes` caps the approximate memory held by cached vectors
+    (stored as float32); the least recently used entries are evicted
+    first. Entries older than `ttl_seconds` are treated as misses.
+    When `persist_path` is set the cache is loaded from it at
+    construction and written back every `flush_seconds` (and on
+    `close()`), so a restarted pod comes up warm.
+    """
+
+    def __init__(
+        self,
+        inner: Embedder,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 24 * 3600,
+        persist_path: Optional[str] = None,
+        flush_seconds: float = 300.0,
+    ) -> None:
+        self.inner = inner
+        self.model_name = inner.model_name
+        self.dimension = inner.dimension
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.persist_path = Path(persist_path) if persist_path else None
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, array]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+        self._dirty = False
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+        if self.persist_path is not None:
+            self.load()
+            if flush_seconds > 0:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop,
+                    args=(float(flush_seconds),),
+                    name="embed-cache-flush",
+                    daemon=True,
+                )
+                self._flusher.start()
+
+    # ------------------------------------------------------------------ embed
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        keys = [cache_key(self.model_name, text) for text in texts]
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        # key -> positions in `texts` still waiting for a vector. Keeps
+        # duplicate texts inside one call down to a single encode.
+        missing: "OrderedDict[str, List[int]]" = OrderedDict()
+
+        now = time.time()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and self._is_fresh(entry[0], now):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    out[i] = entry[1].tolist()
+                    continue
+                if entry is not None:
+                    self._expired += 1
+                    self._drop(key)
+                self._misses += 1
+                missing.setdefault(key, []).append(i)
+
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            vectors = self.inner.embed_texts(miss_texts)
+            if len(vectors) != len(miss_texts):
+                raise RuntimeError(
+                    f"Embedder returned {len(vectors)} vectors for {len(miss_texts)} texts"
+                )
+            with self._lock:
+                for (key, positions), vector in zip(missing.items(), vectors):
+                    stored = array("f", vector)
+                    self._store(key, stored, now)
+                    # Hand back the float32-rounded copy so a miss and a
+                    # later hit for the same text return identical values.
+                    as_list = stored.tolist()
+                    for i in positions:
+                        out[i] = list(as_list)
+
+        return out  # type: ignore[return-value]
+
+    # ------------------------------------------------------------ bookkeeping
+
+    def _is_fresh(self, created_at: float, now: float) -> bool:
+        return not self.ttl_seconds or now - created_at < self.ttl_seconds
+
+    def _entry_size(self, vector: array) -> int:
+        return vector.itemsize * len(vector) + _ENTRY_OVERHEAD_BYTES
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= self._entry_size(entry[1])
+            self._dirty = True
+
+    def _store(self, key: str, vector: array, created_at: float) -> None:
+        size = self._entry_size(vector)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (created_at, vector)
+        self._bytes += size
+        self._dirty = True
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            snapshot = {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expired": self._expired,
+                "ttl_seconds": self.ttl_seconds,
+                "persisted": self.persist_path is not None,
+            }
+        return {**self.inner.stats(), "embedding_cache": snapshot}
+
+    # ------------------------------------------------------------ persistence
+
+    def save(self) -> None:
+        """Atomically write the live entries to `persist_path`."""
+        if self.persist_path is None:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [
+                [key, created_at, base64.b64encode(vector.tobytes()).decode("ascii")]
+                for key, (created_at, vector) in self._entries.items()
+                if self._is_fresh(created_at, now)
+            ]
+            self._dirty = False
+        payload = {
+            "version": _SNAPSHOT_VERSION,
+            "model": self.model_name,
+            "dimension": self.dimension,
+            "entries": entries,
+        }
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_name(self.persist_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp_path, self.persist_path)
+        logger.info("Embedding cache saved: %d entries -> %s", len(entries), self.persist_path)
+
+    def load(self) -> int:
+        """Seed the cache from `persist_path`. Returns entries loaded.
+        A missing, corrupt or foreign-model snapshot is ignored."""
+        if self.persist_path is None or not self.persist_path.exists():
+            return 0
+        try:
+            with self.persist_path.open("r", encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable embedding cache %s: %s", self.persist_path, exc)
+            return 0
+        if payload.get("version") != _SNAPSHOT_VERSION or payload.get("model") != self.model_name:
+            logger.warning(
+                "Ignoring embedding cache %s: written for model=%r version=%r",
+                self.persist_path,
+                payload.get("model"),
+                payload.get("version"),
+            )
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            # Snapshot order is LRU -> MRU, so replaying it in order
+            # rebuilds the same recency ranking.
+            for key, created_at, encoded in payload.get("entries") or []:
+                if not self._is_fresh(float(created_at), now):
+                    continue
+                vector = array("f")
+                vector.frombytes(base64.b64decode(encoded))
+                if self.dimension and len(vector) != self.dimension:
+                    continue
+                self._store(str(key), vector, float(created_at))
+                loaded += 1
+            self._dirty = False
+        logger.info("Embedding cache loaded: %d entries from %s", loaded, self.persist_path)
+        return loaded
+
+    def _flush_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            if self._dirty:
+                try:
+                    self.save()
+                except Exception:
+                    logger.exception("Failed to persist embedding cache")
+
+    def close(self) -> None:
+        """Stop the flush thread and write a final snapshot."""
+        self._stop.set()
+        if self.persist_path is not None and self._dirty:
+            try:
+                self.save()
+            except Exception:
+                logger.exception("Failed to persist embedding cache on close")
+        self.inner.close()
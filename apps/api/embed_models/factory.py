@@ -21,3 +21,72 @@ def create_embedder(model_name: Optional[str] = None) -> Embedder:
     from .sentence_transformer import SentenceTransformerEmbedder
 
     return SentenceTransformerEmbedder(model_name=resolved)
+
+
+def create_service_embedder(model_name: Optional[str] = None) -> Embedder:
+    """Embedder stack for the long-lived KB service.
+
+    From the outside in: a `CachingEmbedder` answers repeated query
+    phrasings without touching the model, then a `MicroBatchingEmbedder`
+    coalesces the remaining misses from concurrent `/multi` requests
+    into shared forward passes. `KB_EMBED_CACHE_MAX_BYTES=0` and
+    `KB_EMBED_BATCH_WINDOW_MS=0` disable the respective layer.
+    One-shot callers (ingest, CLI) should keep using `create_embedder`:
+    with a single caller the batching window is pure added latency.
+    """
+    from .batching import MicroBatchingEmbedder
+    from .cache import CachingEmbedder
+
+    embedder = create_embedder(model_name)
+    window_ms = _env_float("KB_EMBED_BATCH_WINDOW_MS", 5.0)
+    if window_ms > 0:
+        embedder = MicroBatchingEmbedder(
+            embedder,
+            window_ms=window_ms,
+            max_batch=int(_env_float("KB_EMBED_MAX_BATCH", 32)),
+        )
+    cache_bytes = int(_env_float("KB_EMBED_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    if cache_bytes > 0:
+        embedder = CachingEmbedder(
+            embedder,
+            max_bytes=cache_bytes,
+            ttl_seconds=_env_float("KB_EMBED_CACHE_TTL_SECONDS", 24 * 3600),
+            persist_path=os.getenv("KB_EMBED_CACHE_PATH", "").strip() or None,
+            flush_seconds=_env_float("KB_EMBED_CACHE_FLUSH_SECONDS", 300.0),
+        )
+    return embedder
+
+
+def create_ingest_embedder(model_name: Optional[str] = None) -> Embedder:
+    """Embedder for the bulk writers (kb-ingest, kb-import-from-chroma).
+
+    With `KB_EMBED_STORE_PATH` set, vectors are served from and written
+    to the persistent `EmbeddingStore` there, and the model itself is
+    only loaded once a text misses the store. Without it this is plain
+    `create_embedder`.
+    """
+    store_path = os.getenv("KB_EMBED_STORE_PATH", "").strip()
+    if not store_path:
+        return create_embedder(model_name)
+
+    from .store import EmbeddingStore, StoredEmbedder
+
+    resolved = (model_name or os.getenv("KB_EMBED_MODEL", "BAAI/bge-m3")).strip()
+    store = EmbeddingStore(
+        store_path,
+        resolved,
+        dtype=os.getenv("KB_EMBED_STORE_DTYPE", "").strip() or "float32",
+    )
+    logger.info("Embedding store: %s (%d vectors)", store.path, len(store))
+    return StoredEmbedder(store, lambda: create_embedder(resolved))
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("invalid %s=%r, falling back to %s", name, raw, default)
+        return default
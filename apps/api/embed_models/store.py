@@ -0,0 +1,400 @@
+"""Persistent on-disk store of chunk embeddings.
+
+Re-embedding the whole KB with bge-m3 takes hours of CPU, and every DB
+wipe, index rebuild or schema migration used to pay it again because
+the vectors only lived in the database. `EmbeddingStore` keeps them
+next to the content instead, keyed by (sha256 of the whitespace-
+normalised text, embed model), and `StoredEmbedder` consults it before
+encoding, so a rebuild only embeds text the store has never seen.
+
+Layout: one directory per model under the store root, holding
+
+    meta.json     {"version", "model", "dimension", "dtype"}
+    keys.bin      32-byte sha256 digest per row
+    vectors.bin   `dimension` float32/float16 values per row
+
+Both data files are append-only and row-aligned; `vectors.bin` is read
+through a memory map so opening a large store costs only the key
+index. A row exists once its key is written (vectors go first), so a
+crash mid-append leaves at most a trailing partial row that the next
+writer truncates.
+
+`export_store` / `import_store` move a model's rows as one `.npz`
+file, which is how a cold environment gets seeded without running the
+model; see scripts/kb-embed-store.py.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .base import Embedder
+from .cache import _norm_text
+
+logger = logging.getLogger("fshd_kb.embed_models.store")
+
+#: Bumped when the on-disk layout changes; mismatching stores are refused.
+_STORE_VERSION = 1
+
+_KEY_BYTES = 32
+_DTYPES = ("float32", "float16")
+
+
+def content_key(text: str) -> bytes:
+    """sha256 digest of the normalised text. The model is not part of
+    the digest: each model has its own directory."""
+    return hashlib.sha256(_norm_text(text).encode("utf-8")).digest()
+
+
+def _model_dir_name(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_name).strip("_") or "model"
+
+
+class EmbeddingStore:
+    """Append-only content-hash -> vector table for one embed model.
+
+    Lookups are served from an in-memory key index and a read-only
+    memory map of `vectors.bin`. Appends take an exclusive `flock` on
+    the directory and first pick up rows other processes appended, so
+    concurrent ingest runs never duplicate a key.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike,
+        model_name: str,
+        dimension: int = 0,
+        dtype: str = "float32",
+    ) -> None:
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported embedding store dtype {dtype!r}; use one of {_DTYPES}")
+        self.root = Path(root)
+        self.model_name = model_name
+        self.path = self.root / _model_dir_name(model_name)
+        self.dimension = int(dimension)
+        self.dtype = dtype
+
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}
+        self._rows = 0
+        self._vectors: Optional[np.memmap] = None
+        self._hits = 0
+        self._misses = 0
+        self._appended = 0
+
+        meta_path = self.path / "meta.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") != _STORE_VERSION or meta.get("model") != model_name:
+                raise RuntimeError(
+                    f"Embedding store {self.path} was written for model={meta.get('model')!r} "
+                    f"version={meta.get('version')!r}"
+                )
+            if self.dimension and self.dimension != meta["dimension"]:
+                raise RuntimeError(
+                    f"Embedding store {self.path} holds dim={meta['dimension']} vectors, "
+                    f"embedder produces dim={self.dimension}"
+                )
+            self.dimension = int(meta["dimension"])
+            self.dtype = meta["dtype"]
+            with self._lock:
+                self._read_new_keys()
+
+    # ----------------------------------------------------------------- lookup
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._index
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        """Stored vector (as float32 values) per key, None for misses."""
+        out: List[Optional[List[float]]] = [None] * len(keys)
+        with self._lock:
+            rows = [self._index.get(key) for key in keys]
+            found = [(i, row) for i, row in enumerate(rows) if row is not None]
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+            if found:
+                vectors = self._mapped()
+                block = np.asarray(vectors[[row for _, row in found]], dtype=np.float32)
+                for (i, _), vector in zip(found, block.tolist()):
+                    out[i] = vector
+        return out
+
+    def items(self, batch_rows: int = 4096) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(keys, vectors) blocks in row order; used by `export_store`."""
+        with self._lock:
+            rows = self._rows
+            vectors = self._mapped() if rows else None
+            keys = self._read_keys(0, rows)
+        for start in range(0, rows, batch_rows):
+            stop = min(rows, start + batch_rows)
+            yield keys[start:stop], np.asarray(vectors[start:stop])
+
+    # ----------------------------------------------------------------- append
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> int:
+        """Append the keys the store does not hold yet. Returns rows
+        written. Duplicate keys within the call are written once."""
+        if len(keys) != len(vectors):
+            raise ValueError(f"{len(keys)} keys for {len(vectors)} vectors")
+        if not keys:
+            return 0
+        block = np.asarray(vectors, dtype=np.float32)
+        if block.ndim != 2:
+            raise ValueError("vectors must be a 2-D batch")
+        with self._lock, self._writer():
+            if not self.dimension:
+                self.dimension = int(block.shape[1])
+            if block.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Embedding store {self.path} holds dim={self.dimension} vectors, "
+                    f"got dim={block.shape[1]}"
+                )
+            self._write_meta()
+            self._read_new_keys()
+            fresh: Dict[bytes, int] = {}
+            for i, key in enumerate(keys):
+                if key not in self._index and key not in fresh:
+                    fresh[key] = i
+            if not fresh:
+                return 0
+            self._truncate_partial_rows()
+            rows = block[list(fresh.values())].astype(self.dtype)
+            with (self.path / "vectors.bin").open("ab") as fh:
+                fh.write(rows.tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+            with (self.path / "keys.bin").open("ab") as fh:
+                fh.write(b"".join(fresh))
+                fh.flush()
+                os.fsync(fh.fileno())
+            for key in fresh:
+                self._index[key] = self._rows
+                self._rows += 1
+            self._appended += len(fresh)
+            return len(fresh)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "path": str(self.path),
+                "rows": self._rows,
+                "dimension": self.dimension,
+                "dtype": self.dtype,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "appended": self._appended,
+            }
+
+    # -------------------------------------------------------------- internals
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.dimension * np.dtype(self.dtype).itemsize
+
+    @contextmanager
+    def _writer(self) -> Iterator[None]:
+        self.path.mkdir(parents=True, exist_ok=True)
+        with (self.path / ".lock").open("a") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def _write_meta(self) -> None:
+        meta_path = self.path / "meta.json"
+        if meta_path.exists():
+            return
+        meta = {
+            "version": _STORE_VERSION,
+            "model": self.model_name,
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+        }
+        tmp_path = meta_path.with_name("meta.json.tmp")
+        tmp_path.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_path, meta_path)
+
+    def _complete_rows(self) -> int:
+        keys_path = self.path / "keys.bin"
+        vectors_path = self.path / "vectors.bin"
+        if not keys_path.exists() or not vectors_path.exists() or not self._row_bytes:
+            return 0
+        return min(
+            keys_path.stat().st_size // _KEY_BYTES,
+            vectors_path.stat().st_size // self._row_bytes,
+        )
+
+    def _read_keys(self, start: int, stop: int) -> np.ndarray:
+        if stop <= start:
+            return np.empty((0, _KEY_BYTES), dtype=np.uint8)
+        with (self.path / "keys.bin").open("rb") as fh:
+            fh.seek(start * _KEY_BYTES)
+            raw = fh.read((stop - start) * _KEY_BYTES)
+        return np.frombuffer(raw, dtype=np.uint8).reshape(-1, _KEY_BYTES)
+
+    def _read_new_keys(self) -> None:
+        rows = self._complete_rows()
+        for offset, key in enumerate(self._read_keys(self._rows, rows)):
+            self._index.setdefault(key.tobytes(), self._rows + offset)
+        self._rows = max(self._rows, rows)
+
+    def _truncate_partial_rows(self) -> None:
+        # Drop whatever a crashed writer left past the last complete row.
+        for name, size in (("keys.bin", _KEY_BYTES), ("vectors.bin", self._row_bytes)):
+            file_path = self.path / name
+            if file_path.exists() and file_path.stat().st_size != self._rows * size:
+                os.truncate(file_path, self._rows * size)
+
+    def _mapped(self) -> np.memmap:
+        if self._vectors is None or self._vectors.shape[0] < self._rows:
+            self._vectors = np.memmap(
+                self.path / "vectors.bin",
+                dtype=self.dtype,
+                mode="r",
+                shape=(self._rows, self.dimension),
+            )
+        return self._vectors
+
+
+class StoredEmbedder(Embedder):
+    """Serve `embed_texts` from an `EmbeddingStore`, encoding misses.
+
+    The inner embedder is built by `load_inner` on the first miss, so a
+    run whose every chunk is already stored (a rebuild after a DB wipe,
+    or a seeded cold environment) never loads the model at all.
+    """
+
+    def __init__(self, store: EmbeddingStore, load_inner: Callable[[], Embedder]) -> None:
+        self.store = store
+        self.model_name = store.model_name
+        self.dimension = store.dimension
+        self._load_inner = load_inner
+        self._inner: Optional[Embedder] = None
+        self._inner_lock = threading.Lock()
+
+    @property
+    def inner(self) -> Embedder:
+        with self._inner_lock:
+            if self._inner is None:
+                self._inner = self._load_inner()
+                if self._inner.model_name != self.model_name:
+                    raise RuntimeError(
+                        f"Embedding store is for {self.model_name!r} but the embedder "
+                        f"loaded {self._inner.model_name!r}"
+                    )
+                self.dimension = self._inner.dimension or self.dimension
+            return self._inner
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [content_key(text) for text in texts]
+        out = self.store.get_many(keys)
+        # key -> positions still waiting for a vector; a chunk repeated
+        # inside one batch is encoded once.
+        missing: Dict[bytes, List[int]] = {}
+        for i, vector in enumerate(out):
+            if vector is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            vectors = self.inner.embed_texts(miss_texts)
+            if len(vectors) != len(miss_texts):
+                raise RuntimeError(
+                    f"Embedder returned {len(vectors)} vectors for {len(miss_texts)} texts"
+                )
+            self.store.put_many(list(missing), vectors)
+            self.dimension = self.store.dimension
+            # Hand back the stored precision so a miss now and a hit on
+            # the next run produce identical vectors.
+            rounded = np.asarray(vectors, dtype=self.store.dtype).astype(np.float32).tolist()
+            for positions, vector in zip(missing.values(), rounded):
+                for i in positions:
+                    out[i] = list(vector)
+        return out  # type: ignore[return-value]
+
+    def stats(self) -> Dict[str, Any]:
+        base = self._inner.stats() if self._inner is not None else {"model": self.model_name}
+        return {**base, "embedding_store": self.store.stats()}
+
+    def close(self) -> None:
+        if self._inner is not None:
+            self._inner.close()
+
+
+# ------------------------------------------------------------- export / import
+
+
+def export_store(store: EmbeddingStore, out_path: str | os.PathLike) -> int:
+    """Write every row of `store` to one `.npz` file. Returns rows."""
+    keys = []
+    vectors = []
+    for key_block, vector_block in store.items():
+        keys.append(key_block)
+        vectors.append(vector_block)
+    all_keys = np.concatenate(keys) if keys else np.empty((0, _KEY_BYTES), dtype=np.uint8)
+    all_vectors = (
+        np.concatenate(vectors) if vectors else np.empty((0, store.dimension), dtype=store.dtype)
+    )
+    meta = {
+        "version": _STORE_VERSION,
+        "model": store.model_name,
+        "dimension": store.dimension,
+        "dtype": store.dtype,
+    }
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("wb") as fh:
+        np.savez(fh, meta=np.array(json.dumps(meta)), keys=all_keys, vectors=all_vectors)
+    return int(all_keys.shape[0])
+
+
+def read_export_meta(path: str | os.PathLike) -> Dict[str, Any]:
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(str(data["meta"]))
+
+
+def import_store(
+    root: str | os.PathLike,
+    in_path: str | os.PathLike,
+    dtype: Optional[str] = None,
+    batch_rows: int = 4096,
+) -> Tuple[EmbeddingStore, int]:
+    """Merge an `export_store` file into the store under `root` for the
+    file's model. Keys already present are skipped. Returns the store
+    and the number of rows added."""
+    with np.load(in_path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("version") != _STORE_VERSION:
+            raise RuntimeError(f"{in_path}: unsupported export version {meta.get('version')!r}")
+        store = EmbeddingStore(
+            root, meta["model"], dimension=meta["dimension"], dtype=dtype or meta["dtype"]
+        )
+        keys = data["keys"]
+        vectors = data["vectors"]
+        added = 0
+        for start in range(0, keys.shape[0], batch_rows):
+            stop = start + batch_rows
+            added += store.put_many(
+                [key.tobytes() for key in keys[start:stop]], vectors[start:stop]
+            )
+    logger.info("Imported %d embeddings into %s", added, store.path)
+    return store, added
@@ -4,7 +4,7 @@ The KB_BACKEND env variable selects an implementation. See
 docs/proposals/local-rag-migration.md for the broader plan.
 """
 
-from .base import VectorBackend, BackendChunk, QueryHit
+from .base import VectorBackend, BackendChunk, CandidateHit, QueryHit
 from .factory import create_backend
 
-__all__ = ["VectorBackend", "BackendChunk", "QueryHit", "create_backend"]
+__all__ = ["VectorBackend", "BackendChunk", "CandidateHit", "QueryHit", "create_backend"]
@@ -24,6 +24,10 @@ class BackendChunk:
     embedding: List[float]
     metadata: Dict[str, Any] = field(default_factory=dict)
     embed_model: Optional[str] = None
+    #: Ingest-time verdict of `kb_text.is_junk` on the normalised
+    #: content. None means "not computed"; readers then fall back to
+    #: evaluating the rule at query time.
+    is_junk: Optional[bool] = None
 
 
 @dataclass
@@ -39,6 +43,23 @@ class QueryHit:
     distance: Optional[float]
     fingerprint: Optional[str] = None
     source_file: Optional[str] = None
+    #: Stored junk verdict when the backend has one (see BackendChunk).
+    is_junk: Optional[bool] = None
+
+
+@dataclass
+class CandidateHit:
+    """Phase-one result of two-phase retrieval (query_ids_multi).
+
+    Carries just enough to dedup, rank and diversify; the chunk body
+    is fetched later with `hydrate` for the candidates that survive.
+    """
+
+    fingerprint: str
+    distance: Optional[float]
+    source_file: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    is_junk: Optional[bool] = None
 
 
 class VectorBackend(ABC):
@@ -64,6 +85,42 @@ class VectorBackend(ABC):
         to `fetch_k` hits ordered by similarity (closest first).
         """
 
+    def query_diversified(
+        self,
+        query_embeddings: List[List[float]],
+        fetch_k: int,
+        final_n: int,
+        max_per_source: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Optional[List[List[QueryHit]]]:
+        """Optional server-side variant of query_multi + merge.
+
+        Backends that can dedup by fingerprint across queries, rank by
+        distance and apply the per-source cap where the data lives
+        return only the survivors (about `final_n` hits), each placed
+        in the bucket of the query that first retrieved it, so the
+        result is still parallel to query_embeddings. Returns None when
+        unsupported or disabled; callers then use query_multi.
+        """
+        return None
+
+    def query_ids_multi(
+        self,
+        query_embeddings: List[List[float]],
+        fetch_k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Optional[List[List[CandidateHit]]]:
+        """Phase one of two-phase retrieval: like query_multi, but
+        without chunk bodies. Returns None when the backend does not
+        support the two-phase path; callers then use query_multi."""
+        return None
+
+    def hydrate(self, fingerprints: List[str]) -> Dict[str, QueryHit]:
+        """Phase two: fetch full hits for the given fingerprints in one
+        round-trip. Fingerprints that no longer exist are omitted.
+        Only called on backends whose query_ids_multi is supported."""
+        raise NotImplementedError(f"{self.id} backend does not support hydrate")
+
     @abstractmethod
     def upsert(self, chunks: List[BackendChunk]) -> None:
         """Insert or replace chunks. Implementations must use the chunk
@@ -116,6 +173,35 @@ class VectorBackend(ABC):
             f"falling back to delete_by_source would wipe the newly-upserted batch"
         )
 
+    def list_source_chunks(self, source_file: str) -> List[BackendChunk]:
+        """Return every stored chunk of `source_file`, embedding
+        included.
+
+        kb-ingest reads this for a changed file so chunks whose
+        fingerprint survived the edit keep their stored embedding
+        instead of being re-embedded. Default raises
+        NotImplementedError; the ingest then embeds every chunk as
+        before.
+        """
+        raise NotImplementedError(
+            f"{self.id} backend does not support listing stored chunks"
+        )
+
+    def set_source_fingerprint(
+        self, fingerprints: List[str], source_fingerprint: str
+    ) -> int:
+        """Re-tag existing chunks with a new `source_fingerprint`
+        without rewriting them. Returns the number of rows touched.
+
+        Used by kb-ingest for chunks whose stored row is identical to
+        the re-parsed one, so the stale-chunk cleanup keeps them. Default
+        raises NotImplementedError; the ingest then upserts those rows
+        in full (still with their reused embedding).
+        """
+        raise NotImplementedError(
+            f"{self.id} backend does not support re-tagging source fingerprints"
+        )
+
     def list_all_source_files(self) -> List[str]:
         """Return every distinct source_file currently in the backend.
 
@@ -129,6 +215,15 @@ class VectorBackend(ABC):
             f"{self.id} backend does not support listing all source files"
         )
 
+    def corpus_version(self) -> Optional[str]:
+        """Opaque token that changes whenever the stored corpus does.
+
+        The KB service keys its retrieval-result cache on this value, so
+        a stale token means stale answers. Backends that cannot report
+        one cheaply return None, which disables result caching for them.
+        """
+        return None
+
     def health(self) -> Dict[str, Any]:
         """Best-effort liveness signal. Implementations may override."""
         return {"backend": self.id, "status": "ok"}
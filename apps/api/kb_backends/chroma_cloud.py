@@ -90,25 +90,16 @@ class ChromaCloudBackend(VectorBackend):
             for i, doc in enumerate(docs):
                 md = metas[i] if i < len(metas) and metas[i] is not None else {}
                 dist = dists[i] if i < len(dists) else None
-                source = (
-                    md.get("source_file")
-                    or md.get("source")
-                    or md.get("file")
-                    or md.get("path")
-                    or md.get("folder_path")
-                )
-                hits.append(
-                    QueryHit(
-                        content=doc or "",
-                        metadata=dict(md) if md else {},
-                        distance=float(dist) if dist is not None else None,
-                        fingerprint=None,
-                        source_file=str(source) if source else None,
-                    )
-                )
+                hits.append(_make_hit(doc, md, float(dist) if dist is not None else None))
             out.append(hits)
         return out
 
+    # No query_ids_multi: two-phase candidates dedup on their id, and
+    # Chroma ids are not content hashes (legacy collections use
+    # arbitrary ids, kb-ingest mixes in source and chunk index), so the
+    # same text under two ids would take two result slots. Full hits
+    # from query_multi let the merge dedup on the content hash instead.
+
     def upsert(self, chunks: List[BackendChunk]) -> None:
         if not chunks:
             return
@@ -121,6 +112,8 @@ class ChromaCloudBackend(VectorBackend):
                 "source_fingerprint": chunk.source_fingerprint,
                 "chunk_index": chunk.chunk_index,
                 "embed_model": chunk.embed_model or "",
+                # Chroma metadata values can't be None.
+                **({"is_junk": chunk.is_junk} if chunk.is_junk is not None else {}),
             }
             for chunk in chunks
         ]
@@ -184,3 +177,26 @@ class ChromaCloudBackend(VectorBackend):
         # Best-effort delete; Chroma does not return removed counts.
         self.collection.delete(where={"source_file": source_file})
         return 0
+
+
+def _source_of(md: Dict[str, Any]) -> Optional[str]:
+    source = (
+        md.get("source_file")
+        or md.get("source")
+        or md.get("file")
+        or md.get("path")
+        or md.get("folder_path")
+    )
+    return str(source) if source else None
+
+
+def _make_hit(doc: Optional[str], md: Dict[str, Any], distance: Optional[float]) -> QueryHit:
+    stored_junk = md.get("is_junk")
+    return QueryHit(
+        content=doc or "",
+        metadata=dict(md) if md else {},
+        distance=distance,
+        fingerprint=None,
+        source_file=_source_of(md),
+        is_junk=stored_junk if isinstance(stored_junk, bool) else None,
+    )
@@ -39,6 +39,11 @@ def create_backend(name: Optional[str] = None) -> VectorBackend:
 
         return ChromaCloudBackend()
 
+    if resolved in ("numpy_mmap", "numpy", "mmap"):
+        from .numpy_mmap import NumpyMmapBackend
+
+        return NumpyMmapBackend()
+
     raise RuntimeError(
-        f"Unknown KB_BACKEND={resolved!r}. Expected 'pgvector' or 'chroma_cloud'."
+        f"Unknown KB_BACKEND={resolved!r}. Expected 'pgvector', 'chroma_cloud' or 'numpy_mmap'."
     )
@@ -0,0 +1,563 @@
+"""In-process brute-force backend over a memory-mapped NumPy matrix.
+
+The whole KB (~12k chunks x 1024 dims, ~50 MB of float32) fits in the
+page cache, so exact search is one `queries x corpus` matrix multiply
+plus `argpartition`, with no socket round-trip or HNSW recall loss.
+This backend serves that from a snapshot directory:
+
+    meta.json        {"version", "generation", "dimension", "rows"}
+    vectors-<gen>.f32   unit-normalised float32 rows, memory-mapped
+    rows-<gen>.jsonl    side table: fingerprint, source, content,
+                        metadata, ... one line per vector row
+
+A snapshot is written whole and published by atomically replacing
+`meta.json`, so readers never see a half-written generation. Reader
+processes (the KB service) notice a new generation on the next query
+and remap; `corpus_version()` returns the generation, so the result
+cache invalidates with it.
+
+Writes (`upsert`, deletes) are applied in memory and persisted by
+`flush()` / `close()`; a crashed writer loses its unflushed changes,
+which kb-ingest redoes on the next run because their source
+fingerprints never reached disk. Normally the snapshot is rebuilt
+from pgvector with `scripts/kb-sync-numpy.py` (`sync_from`).
+
+`where` filters support the same scalar equality as the pgvector
+backend, answered from per-key value bitmaps that are built on first
+use of a key and kept for the snapshot's lifetime.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .base import BackendChunk, CandidateHit, QueryHit, VectorBackend
+
+logger = logging.getLogger("fshd_kb.numpy_mmap")
+
+#: Bumped when the snapshot layout changes; mismatching snapshots are refused.
+_SNAPSHOT_VERSION = 1
+
+#: Side-table fields, in BackendChunk order minus the embedding.
+_ROW_FIELDS = (
+    "content",
+    "fingerprint",
+    "source_file",
+    "source_fingerprint",
+    "chunk_index",
+    "metadata",
+    "embed_model",
+    "is_junk",
+)
+
+#: Below this fraction of rows passing the filter, score only the
+#: selected rows (a gather) instead of the whole matrix (a mask).
+_GATHER_FRACTION = 0.5
+
+
+def _metadata_text(value: Any) -> Optional[str]:
+    """Text form of a metadata value as Postgres' `metadata ->> key`
+    renders it, so equality filters match the pgvector backend."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _source_key(row: Dict[str, Any]) -> str:
+    # Mirrors pgvector._SOURCE_KEY_SQL / knowledge._get_source.
+    md = row.get("metadata") or {}
+    for key in ("source_file", "source", "file", "path", "folder_path"):
+        if md.get(key):
+            return str(md[key])
+    return row.get("source_file") or "unknown"
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class _Snapshot:
+    """One immutable generation: vectors, side table, lazy bitmaps."""
+
+    def __init__(
+        self,
+        generation: str,
+        vectors: np.ndarray,
+        rows: List[Dict[str, Any]],
+    ) -> None:
+        self.generation = generation
+        self.vectors = vectors
+        self.rows = rows
+        self.by_fingerprint = {row["fingerprint"]: i for i, row in enumerate(rows)}
+        # Junk rows never match, like `is_junk IS NOT TRUE` in SQL.
+        self.not_junk = np.fromiter(
+            (row.get("is_junk") is not True for row in rows), dtype=bool, count=len(rows)
+        )
+        self._bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def bitmaps(self, key: str) -> Dict[str, np.ndarray]:
+        """value text -> row bitmap for metadata key `key`."""
+        with self._lock:
+            cached = self._bitmaps.get(key)
+            if cached is not None:
+                return cached
+            positions: Dict[str, List[int]] = {}
+            for i, row in enumerate(self.rows):
+                text = _metadata_text((row.get("metadata") or {}).get(key))
+                if text is not None:
+                    positions.setdefault(text, []).append(i)
+            bitmaps = {}
+            for text, rows in positions.items():
+                bitmap = np.zeros(len(self.rows), dtype=bool)
+                bitmap[rows] = True
+                bitmaps[text] = bitmap
+            self._bitmaps[key] = bitmaps
+            return bitmaps
+
+    def mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = self.not_junk
+        for key, value in (where or {}).items():
+            if not isinstance(value, (str, int, float, bool)):
+                logger.warning(
+                    "numpy_mmap backend dropping unsupported metadata filter: %s=%r "
+                    "(only scalar equality is implemented)",
+                    key,
+                    value,
+                )
+                continue
+            bitmap = self.bitmaps(key).get(str(value))
+            if bitmap is None:
+                return np.zeros(len(self.rows), dtype=bool)
+            mask = mask & bitmap
+        return mask
+
+    def search(
+        self,
+        query_embeddings: List[List[float]],
+        fetch_k: int,
+        where: Optional[Dict[str, Any]],
+    ) -> List[List[Tuple[int, float]]]:
+        """(row, cosine distance) per query, closest first."""
+        out: List[List[Tuple[int, float]]] = [[] for _ in query_embeddings]
+        if not self.rows:
+            return out
+        mask = self.mask(where)
+        selected = int(mask.sum())
+        if not selected:
+            return out
+
+        queries = _normalise(np.asarray(query_embeddings, dtype=np.float32))
+        if selected < _GATHER_FRACTION * len(self.rows):
+            candidates = np.flatnonzero(mask)
+            scores = queries @ self.vectors[candidates].T
+        else:
+            candidates = None
+            scores = queries @ self.vectors.T
+            scores[:, ~mask] = -np.inf
+
+        k = min(max(1, int(fetch_k)), selected)
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), (scores.shape[0], scores.shape[1]))
+        for qi in range(len(query_embeddings)):
+            cols = top[qi]
+            order = cols[np.argsort(-scores[qi, cols], kind="stable")]
+            rows = candidates[order] if candidates is not None else order
+            out[qi] = [
+                (int(row), float(1.0 - score))
+                for row, score in zip(rows, scores[qi, order])
+                if score != -np.inf
+            ]
+        return out
+
+
+class NumpyMmapBackend(VectorBackend):
+    id = "numpy_mmap"
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        resolved = (path or os.getenv("KB_NUMPY_INDEX_PATH", "")).strip()
+        if not resolved:
+            raise RuntimeError("Missing env KB_NUMPY_INDEX_PATH for numpy_mmap backend")
+        self.path = Path(resolved)
+        self._lock = threading.Lock()
+        self._meta_stat: Optional[Tuple[int, int]] = None
+        self._snapshot = _Snapshot("empty", np.zeros((0, 0), dtype=np.float32), [])
+        # fingerprint -> (row, unit vector) once this process writes;
+        # None while it only reads the published snapshot.
+        self._table: Optional[Dict[str, Tuple[Dict[str, Any], np.ndarray]]] = None
+        # Unflushed writes / writes not yet visible to this process' queries.
+        self._dirty = False
+        self._view_stale = False
+        self._reload()
+        logger.info(
+            "numpy_mmap backend ready: path=%s rows=%d generation=%s",
+            self.path,
+            len(self._snapshot.rows),
+            self._snapshot.generation,
+        )
+
+    # ------------------------------------------------------------------ query
+
+    def query_multi(
+        self,
+        query_embeddings: List[List[float]],
+        fetch_k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[List[QueryHit]]:
+        if not query_embeddings:
+            return []
+        snapshot = self._current()
+        return [
+            [_row_to_hit(snapshot.rows[row], distance) for row, distance in hits]
+            for hits in snapshot.search(query_embeddings, fetch_k, where)
+        ]
+
+    def query_ids_multi(
+        self,
+        query_embeddings: List[List[float]],
+        fetch_k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Optional[List[List[CandidateHit]]]:
+        if not query_embeddings:
+            return []
+        snapshot = self._current()
+        # Same shape as the pgvector candidates: the diversification key
+        # travels as source_file with empty metadata.
+        return [
+            [
+                CandidateHit(
+                    fingerprint=snapshot.rows[row]["fingerprint"],
+                    distance=distance,
+                    source_file=_source_key(snapshot.rows[row]),
+                    is_junk=snapshot.rows[row].get("is_junk"),
+                )
+                for row, distance in hits
+            ]
+            for hits in snapshot.search(query_embeddings, fetch_k, where)
+        ]
+
+    def hydrate(self, fingerprints: List[str]) -> Dict[str, QueryHit]:
+        snapshot = self._current()
+        out: Dict[str, QueryHit] = {}
+        for fingerprint in fingerprints:
+            row = snapshot.by_fingerprint.get(fingerprint)
+            if row is not None:
+                out[fingerprint] = _row_to_hit(snapshot.rows[row], None)
+        return out
+
+    # ------------------------------------------------------------------ write
+
+    def upsert(self, chunks: List[BackendChunk]) -> None:
+        if not chunks:
+            return
+        vectors = _normalise(np.asarray([chunk.embedding for chunk in chunks], dtype=np.float32))
+        with self._lock:
+            table = self._writable()
+            dimension = next((v.shape[0] for _, v in table.values()), vectors.shape[1])
+            if vectors.ndim != 2 or vectors.shape[1] != dimension:
+                raise ValueError(
+                    f"Embedding dimension mismatch: index holds dim={dimension}, "
+                    f"got {vectors.shape[-1] if vectors.ndim == 2 else 'ragged'}"
+                )
+            for chunk, vector in zip(chunks, vectors):
+                table[chunk.fingerprint] = (
+                    {name: getattr(chunk, name) for name in _ROW_FIELDS},
+                    vector,
+                )
+            self._dirty = self._view_stale = True
+
+    def delete_fingerprints(self, fingerprints: List[str]) -> int:
+        if not fingerprints:
+            return 0
+        doomed = set(fingerprints)
+        return self._delete(lambda fp, row: fp in doomed)
+
+    def delete_by_source(self, source_file: str) -> int:
+        if not source_file:
+            return 0
+        return self._delete(lambda fp, row: row["source_file"] == source_file)
+
+    def delete_by_source_other_fingerprints(
+        self, source_file: str, keep_fingerprint: str
+    ) -> int:
+        if not source_file or not keep_fingerprint:
+            return 0
+        return self._delete(
+            lambda fp, row: row["source_file"] == source_file
+            and row["source_fingerprint"] != keep_fingerprint
+        )
+
+    def set_source_fingerprint(
+        self, fingerprints: List[str], source_fingerprint: str
+    ) -> int:
+        if not fingerprints or not source_fingerprint:
+            return 0
+        with self._lock:
+            table = self._writable()
+            updated = 0
+            for fingerprint in fingerprints:
+                entry = table.get(fingerprint)
+                if entry is not None and entry[0]["source_fingerprint"] != source_fingerprint:
+                    entry[0]["source_fingerprint"] = source_fingerprint
+                    updated += 1
+            if updated:
+                self._dirty = self._view_stale = True
+            return updated
+
+    def flush(self) -> None:
+        """Publish pending writes as a new snapshot generation."""
+        with self._lock:
+            if not self._dirty or self._table is None:
+                return
+            self._publish(*self._table_arrays())
+            self._dirty = self._view_stale = False
+            self._reload()
+
+    # ----------------------------------------------------------- introspection
+
+    def list_source_chunks(self, source_file: str) -> List[BackendChunk]:
+        """Stored rows of `source_file`; embeddings come back unit-normalised."""
+        if self._table is not None:
+            with self._lock:
+                entries = [(row, vec) for row, vec in self._table.values()]
+        else:
+            snapshot = self._current()
+            entries = [
+                (row, snapshot.vectors[i])
+                for i, row in enumerate(snapshot.rows)
+                if row["source_file"] == source_file
+            ]
+        return sorted(
+            (
+                BackendChunk(embedding=vector.tolist(), **dict(row))
+                for row, vector in entries
+                if row["source_file"] == source_file
+            ),
+            key=lambda chunk: chunk.chunk_index,
+        )
+
+    def list_source_fingerprints(self, source_files: List[str]) -> Dict[str, Set[str]]:
+        wanted = set(source_files)
+        result: Dict[str, Set[str]] = {}
+        for row in self._iter_rows():
+            if row["source_file"] in wanted and row["source_fingerprint"]:
+                result.setdefault(row["source_file"], set()).add(row["source_fingerprint"])
+        return result
+
+    def list_all_source_files(self) -> List[str]:
+        return sorted({row["source_file"] for row in self._iter_rows() if row["source_file"]})
+
+    def corpus_version(self) -> Optional[str]:
+        return self._current().generation
+
+    def health(self) -> Dict[str, Any]:
+        snapshot = self._current()
+        return {
+            "backend": self.id,
+            "status": "ok",
+            "rows": len(snapshot.rows),
+            "dimension": int(snapshot.vectors.shape[1]) if snapshot.rows else 0,
+            "generation": snapshot.generation,
+        }
+
+    def close(self) -> None:
+        self.flush()
+
+    # ------------------------------------------------------------------- sync
+
+    def sync_from(self, source: VectorBackend) -> Dict[str, int]:
+        """Mirror `source` (normally pgvector) into this index.
+
+        Files whose set of source fingerprints already matches are
+        skipped, so a re-sync after an ingest only copies the changed
+        files; files gone from `source` are dropped. Publishes one new
+        generation.
+        """
+        stats = {"files": 0, "files_copied": 0, "files_removed": 0, "chunks_copied": 0}
+        source_files = source.list_all_source_files()
+        stats["files"] = len(source_files)
+        theirs = source.list_source_fingerprints(source_files)
+        ours = self.list_source_fingerprints(source_files)
+        for source_file in source_files:
+            if source_file in ours and ours[source_file] == theirs.get(source_file):
+                continue
+            chunks = source.list_source_chunks(source_file)
+            self.delete_by_source(source_file)
+            self.upsert(chunks)
+            stats["files_copied"] += 1
+            stats["chunks_copied"] += len(chunks)
+        for stale in set(self.list_all_source_files()) - set(source_files):
+            self.delete_by_source(stale)
+            stats["files_removed"] += 1
+        self.flush()
+        return stats
+
+    # -------------------------------------------------------------- internals
+
+    def _current(self) -> _Snapshot:
+        self._maybe_reload()
+        return self._snapshot
+
+    def _iter_rows(self) -> Iterable[Dict[str, Any]]:
+        if self._table is not None:
+            with self._lock:
+                return [row for row, _ in self._table.values()]
+        return self._current().rows
+
+    def _writable(self) -> Dict[str, Tuple[Dict[str, Any], np.ndarray]]:
+        # Caller holds self._lock.
+        if self._table is None:
+            snapshot = self._snapshot
+            self._table = {
+                row["fingerprint"]: (dict(row), np.array(snapshot.vectors[i]))
+                for i, row in enumerate(snapshot.rows)
+            }
+        return self._table
+
+    def _delete(self, predicate) -> int:
+        with self._lock:
+            table = self._writable()
+            doomed = [fp for fp, (row, _) in table.items() if predicate(fp, row)]
+            for fingerprint in doomed:
+                del table[fingerprint]
+            if doomed:
+                self._dirty = self._view_stale = True
+            return len(doomed)
+
+    def _meta_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.path / "meta.json").stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino)
+
+    def _maybe_reload(self) -> None:
+        if self._table is not None:
+            # A writer serves its own pending state.
+            with self._lock:
+                if self._view_stale:
+                    vectors, rows = self._table_arrays()
+                    self._snapshot = _Snapshot(f"pending-{uuid.uuid4().hex}", vectors, rows)
+                    self._view_stale = False
+            return
+        if self._meta_signature() != self._meta_stat:
+            with self._lock:
+                self._reload()
+
+    def _table_arrays(self) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        rows = [dict(row) for row, _ in self._table.values()]
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32), rows
+        return np.stack([vector for _, vector in self._table.values()]), rows
+
+    def _reload(self) -> None:
+        # A writer may publish (and delete the files of the generation
+        # just read from meta.json) between the two reads; retry then.
+        for attempt in range(3):
+            try:
+                return self._load_published()
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+    def _load_published(self) -> None:
+        signature = self._meta_signature()
+        if signature is None:
+            self._meta_stat = None
+            return
+        meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != _SNAPSHOT_VERSION:
+            raise RuntimeError(
+                f"numpy_mmap snapshot {self.path} has version {meta.get('version')!r}, "
+                f"expected {_SNAPSHOT_VERSION}; rebuild it with scripts/kb-sync-numpy.py"
+            )
+        generation = meta["generation"]
+        rows_count = int(meta["rows"])
+        dimension = int(meta["dimension"])
+        if rows_count:
+            vectors = np.memmap(
+                self.path / f"vectors-{generation}.f32",
+                dtype=np.float32,
+                mode="r",
+                shape=(rows_count, dimension),
+            )
+        else:
+            vectors = np.zeros((0, dimension), dtype=np.float32)
+        with (self.path / f"rows-{generation}.jsonl").open("r", encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh]
+        if len(rows) != rows_count:
+            raise RuntimeError(
+                f"numpy_mmap snapshot {self.path} generation {generation}: "
+                f"{len(rows)} side-table rows for {rows_count} vectors"
+            )
+        self._snapshot = _Snapshot(generation, vectors, rows)
+        self._meta_stat = signature
+
+    def _publish(self, vectors: np.ndarray, rows: List[Dict[str, Any]]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        generation = uuid.uuid4().hex
+        with (self.path / ".lock").open("a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                vectors_path = self.path / f"vectors-{generation}.f32"
+                with vectors_path.open("wb") as fh:
+                    fh.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                with (self.path / f"rows-{generation}.jsonl").open("w", encoding="utf-8") as fh:
+                    for row in rows:
+                        fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                meta = {
+                    "version": _SNAPSHOT_VERSION,
+                    "generation": generation,
+                    "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                    "rows": len(rows),
+                }
+                tmp_path = self.path / "meta.json.tmp"
+                tmp_path.write_text(json.dumps(meta), encoding="utf-8")
+                os.replace(tmp_path, self.path / "meta.json")
+                self._remove_old_generations(keep=generation)
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+        logger.info("numpy_mmap snapshot %s published: %d rows", generation, len(rows))
+
+    def _remove_old_generations(self, keep: str) -> None:
+        # Readers that still map an old vectors file keep it alive
+        # (unlinking an mmapped file is safe on POSIX); they switch on
+        # their next query.
+        for old in self.path.iterdir():
+            if old.name.startswith(("vectors-", "rows-")) and keep not in old.name:
+                try:
+                    old.unlink()
+                except FileNotFoundError:
+                    pass
+
+
+def _row_to_hit(row: Dict[str, Any], distance: Optional[float]) -> QueryHit:
+    return QueryHit(
+        content=row["content"],
+        metadata=row.get("metadata") or {},
+        distance=distance,
+        fingerprint=row["fingerprint"],
+        source_file=row.get("source_file"),
+        is_junk=row.get("is_junk"),
+    )
@@ -18,7 +18,7 @@ from pgvector.psycopg import register_vector
 from psycopg.rows import dict_row
 from psycopg_pool import ConnectionPool
 
-from .base import BackendChunk, QueryHit, VectorBackend
+from .base import BackendChunk, CandidateHit, QueryHit, VectorBackend
 
 logger = logging.getLogger("fshd_kb.pgvector")
 
@@ -28,6 +28,52 @@ logger = logging.getLogger("fshd_kb.pgvector")
 #: relying on pgvector's binary error message.
 EXPECTED_EMBED_DIM = 1024
 
+#: Accepted values for KB_PG_UPSERT_MODE / the upsert_mode argument.
+UPSERT_MODES = ("copy", "row")
+
+#: Accepted values for KB_PG_QUANTIZED / the quantized argument. Anything
+#: but "off" runs the HNSW walk on a compact index from the opt-in
+#: db/optional/kb_quantized_<mode>.sql and re-ranks the candidates at
+#: full precision.
+QUANTIZED_MODES = ("off", "halfvec", "binary")
+
+#: ANN index each mode searches. "off" is 006's full-precision index.
+_MODE_INDEX = {
+    "off": "kb_chunks_embedding_hnsw",
+    "halfvec": "kb_chunks_embedding_half_hnsw",
+    "binary": "kb_chunks_embedding_bit_hnsw",
+}
+
+#: Coarse-search ORDER BY per quantized mode. Each must match its
+#: index expression in db/optional/kb_quantized_<mode>.sql exactly, or
+#: the planner falls back to a sequential scan.
+_COARSE_ORDER_SQL = {
+    "halfvec": (
+        f"embedding::halfvec({EXPECTED_EMBED_DIM}) "
+        f"<=> q.q_emb::halfvec({EXPECTED_EMBED_DIM})"
+    ),
+    "binary": (
+        f"binary_quantize(embedding)::bit({EXPECTED_EMBED_DIM}) "
+        f"<~> binary_quantize(q.q_emb)"
+    ),
+}
+
+#: pgvector's upper bound for hnsw.ef_search.
+_MAX_EF_SEARCH = 1000
+
+#: Diversification key computed in SQL; mirrors knowledge._get_source
+#: (first non-empty of the metadata keys, then the source_file column).
+_SOURCE_KEY_SQL = (
+    "COALESCE("
+    "NULLIF(metadata ->> 'source_file', ''), "
+    "NULLIF(metadata ->> 'source', ''), "
+    "NULLIF(metadata ->> 'file', ''), "
+    "NULLIF(metadata ->> 'path', ''), "
+    "NULLIF(metadata ->> 'folder_path', ''), "
+    "NULLIF(source_file, ''), "
+    "'unknown')"
+)
+
 
 class PgVectorBackend(VectorBackend):
     id = "pgvector"
@@ -38,6 +84,9 @@ class PgVectorBackend(VectorBackend):
         table_name: str = "kb_chunks",
         min_size: Optional[int] = None,
         max_size: Optional[int] = None,
+        upsert_mode: Optional[str] = None,
+        quantized: Optional[str] = None,
+        rescore_factor: Optional[int] = None,
     ) -> None:
         self.connection_string = connection_string or os.getenv("DATABASE_URL", "").strip()
         if not self.connection_string:
@@ -54,13 +103,15 @@ class PgVectorBackend(VectorBackend):
                 "Must match [A-Za-z_][A-Za-z0-9_]{0,62}.",
             )
         self.table_name = table_name
+        self._corpus_version_missing_logged = False
 
         # Pool sizing is configurable via env so ops can bump it without a
-        # code change when the KB service grows past its current
-        # single-process-single-thread profile. Constructor arguments win
-        # over env for test injection.
+        # code change. The KB service sizes its admission gate from the
+        # same KB_PG_POOL_MAX (see knowledge_service._build_admission_gate)
+        # so concurrent searches never queue on the pool. Constructor
+        # arguments win over env for test injection.
         resolved_min = min_size if min_size is not None else _env_int("KB_PG_POOL_MIN", 1)
-        resolved_max = max_size if max_size is not None else _env_int("KB_PG_POOL_MAX", 2)
+        resolved_max = max_size if max_size is not None else _env_int("KB_PG_POOL_MAX", 4)
         if resolved_min < 1 or resolved_max < resolved_min:
             raise ValueError(
                 f"Invalid pool sizing: KB_PG_POOL_MIN={resolved_min}, "
@@ -74,12 +125,59 @@ class PgVectorBackend(VectorBackend):
         # error. This synchronous probe gives the operator an
         # actionable message at startup.
         self._verify_vector_extension()
+        self._has_junk_column = self._probe_junk_column()
+
+        # Server-side dedup / rank / per-source cap (query_diversified).
+        # Off by default: it trusts the stored is_junk flag, so it only
+        # returns a full final_n once the corpus has been re-ingested
+        # after db/migrations/016 (legacy NULL rows that turn out to be
+        # junk are still dropped in Python, shortening the result).
+        self.server_merge = _env_flag("KB_PG_SERVER_MERGE") and self._has_junk_column
+
+        # "row" is the original statement-per-chunk path and stays the
+        # default until `scripts/kb-bench.py upsert` has measured "copy"
+        # against it on a real database. "copy" streams each batch
+        # through binary COPY into a temp staging table and merges it
+        # with one INSERT ... SELECT.
+        mode = (upsert_mode or os.getenv("KB_PG_UPSERT_MODE", "") or "row").strip().lower()
+        if mode not in UPSERT_MODES:
+            raise ValueError(
+                f"Invalid KB_PG_UPSERT_MODE '{mode}'. Must be one of {', '.join(UPSERT_MODES)}."
+            )
+        self.upsert_mode = mode
+
+        # Coarse search on the compact representation, exact re-rank of
+        # rescore_factor x fetch_k candidates (db/optional/kb_quantized_*).
+        quantized_mode = (
+            (quantized or os.getenv("KB_PG_QUANTIZED", "") or "off").strip().lower()
+        )
+        if quantized_mode not in QUANTIZED_MODES:
+            raise ValueError(
+                f"Invalid KB_PG_QUANTIZED '{quantized_mode}'. "
+                f"Must be one of {', '.join(QUANTIZED_MODES)}."
+            )
+        if quantized_mode != "off" and not self._probe_quantized_support(quantized_mode):
+            quantized_mode = "off"
+        if quantized_mode == "off" and not self._index_exists(_MODE_INDEX["off"]):
+            logger.warning(
+                "KB_PG_QUANTIZED=off but %s is missing (dropped after enabling a "
+                "quantized mode?): every search is an exact sequential scan. "
+                "Recreate it from db/migrations/006_pgvector_kb.sql or set "
+                "KB_PG_QUANTIZED to the mode whose index is installed",
+                _MODE_INDEX["off"],
+            )
+        self.quantized = quantized_mode
+        self.rescore_factor = max(
+            1,
+            rescore_factor
+            if rescore_factor is not None
+            else _env_int("KB_PG_RESCORE_FACTOR", 4),
+        )
 
         # ConnectionPool gives us reconnect on broken connections, idle
-        # timeout handling, and basic concurrency safety. Defaults (1, 2)
-        # are plenty for the current KB service (single Python process,
-        # serial query handling); raise max via KB_PG_POOL_MAX if a future
-        # worker pool needs more headroom.
+        # timeout handling, and concurrency safety across the KB
+        # service's worker threads. Connections open lazily up to max,
+        # so the one-shot ingest scripts still hold just min_size.
         self.pool = ConnectionPool(
             conninfo=self.connection_string,
             min_size=resolved_min,
@@ -89,10 +187,16 @@ class PgVectorBackend(VectorBackend):
             open=True,
         )
         logger.info(
-            "pgvector backend ready: table=%s pool=[%d,%d]",
+            "pgvector backend ready: table=%s pool=[%d,%d] server_merge=%s upsert=%s "
+            "quantized=%s",
             self.table_name,
             resolved_min,
             resolved_max,
+            self.server_merge,
+            self.upsert_mode,
+            self.quantized
+            if self.quantized == "off"
+            else f"{self.quantized} x{self.rescore_factor}",
         )
 
     def _verify_vector_extension(self) -> None:
@@ -119,6 +223,49 @@ class PgVectorBackend(VectorBackend):
                         "use the `pgvector/pgvector:pg16` Docker image)."
                     )
 
+    def _probe_junk_column(self) -> bool:
+        """Detect `kb_chunks.is_junk` (db/migrations/016). Without it the
+        backend keeps working the pre-016 way: no ingest-time flag is
+        written and junk filtering stays entirely at query time."""
+        with psycopg.connect(self.connection_string) as probe:
+            with probe.cursor() as cur:
+                cur.execute(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = %s AND column_name = 'is_junk'",
+                    (self.table_name,),
+                )
+                present = cur.fetchone() is not None
+        if not present:
+            logger.warning(
+                "%s.is_junk column missing; apply db/migrations/016_kb_chunks_is_junk.sql "
+                "to filter junk chunks inside the vector query",
+                self.table_name,
+            )
+        return present
+
+    def _probe_quantized_support(self, mode: str) -> bool:
+        """Check that db/optional/kb_quantized_<mode>.sql is applied.
+        Without its index the backend logs why and keeps searching the
+        full-precision index instead of scanning the table."""
+        present = self._index_exists(_MODE_INDEX[mode])
+        if not present:
+            logger.warning(
+                "KB_PG_QUANTIZED=%s needs db/optional/kb_quantized_%s.sql "
+                "(pgvector >= 0.7); searching the full-precision index instead",
+                mode,
+                mode,
+            )
+        return present
+
+    def _index_exists(self, index_name: str) -> bool:
+        with psycopg.connect(self.connection_string) as probe:
+            with probe.cursor() as cur:
+                cur.execute(
+                    "SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s",
+                    (self.table_name, index_name),
+                )
+                return cur.fetchone() is not None
+
     @staticmethod
     def _configure_conn(conn: psycopg.Connection) -> None:
         register_vector(conn)
@@ -147,27 +294,33 @@ class PgVectorBackend(VectorBackend):
         values_clause = ", ".join(
             f"({i}, %s::vector)" for i in range(len(query_embeddings))
         )
+        # Junk chunks are dropped inside the LATERAL subquery so they
+        # don't eat into fetch_k. `IS NOT TRUE` keeps rows ingested
+        # before the flag existed (NULL); the orchestrator still runs
+        # the junk rule on those at query time.
+        junk_select = "is_junk" if self._has_junk_column else "NULL::boolean AS is_junk"
+        junk_filter = "AND is_junk IS NOT TRUE" if self._has_junk_column else ""
+        recall_sql = self._recall_sql(
+            f"content, metadata, source_file, fingerprint, {junk_select}",
+            f"{junk_filter} {where_sql}",
+        )
         sql = (
             f"WITH queries(idx, q_emb) AS (VALUES {values_clause}) "
             f"SELECT q.idx AS query_idx, c.content, c.metadata, "
-            f"  c.source_file, c.fingerprint, c.distance "
+            f"  c.source_file, c.fingerprint, c.is_junk, c.distance "
             f"FROM queries q "
-            f"CROSS JOIN LATERAL ("
-            f"  SELECT content, metadata, source_file, fingerprint, "
-            f"    (embedding <=> q.q_emb) AS distance "
-            f"  FROM {self.table_name} "
-            f"  WHERE embedding IS NOT NULL "
-            f"  {where_sql} "
-            f"  ORDER BY embedding <=> q.q_emb "
-            f"  LIMIT %s"
-            f") c "
+            f"CROSS JOIN LATERAL ({recall_sql}) c "
             f"ORDER BY q.idx"
         )
 
         # Params order: every embedding (for the VALUES clause), then
         # every where-clause param (applied once -- the lateral
-        # subquery's WHERE is fixed across `q` rows), then fetch_k.
-        params: List[Any] = [*query_embeddings, *where_params, fetch_k_int]
+        # subquery's WHERE is fixed across `q` rows), then the limits.
+        params: List[Any] = [
+            *query_embeddings,
+            *where_params,
+            *self._recall_limits(fetch_k_int),
+        ]
 
         # Pre-seed an empty bucket per input query so the output stays
         # parallel to query_embeddings even when one of them has zero
@@ -177,25 +330,164 @@ class PgVectorBackend(VectorBackend):
 
         with self.pool.connection() as conn:
             with conn.cursor(row_factory=dict_row) as cur:
+                self._set_ef_search(cur, fetch_k_int)
                 cur.execute(sql, params)
                 for row in cur.fetchall():
                     idx = row["query_idx"]
                     if 0 <= idx < len(out):
-                        out[idx].append(
-                            QueryHit(
-                                content=row["content"],
-                                metadata=row.get("metadata") or {},
-                                distance=(
-                                    float(row["distance"])
-                                    if row["distance"] is not None
-                                    else None
-                                ),
-                                fingerprint=row.get("fingerprint"),
-                                source_file=row.get("source_file"),
+                        out[idx].append(_row_to_hit(row))
+        return out
+
+    def query_diversified(
+        self,
+        query_embeddings: List[List[float]],
+        fetch_k: int,
+        final_n: int,
+        max_per_source: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Optional[List[List[QueryHit]]]:
+        if not self.server_merge:
+            return None
+        if not query_embeddings:
+            return []
+
+        where_sql, where_params = self._build_where(where)
+
+        # Same LATERAL recall as query_multi, but the candidate rows
+        # carry only (id, fingerprint, source key, distance); the
+        # window functions below replay knowledge._merge_and_select:
+        #
+        #   deduped  - first occurrence of a fingerprint in (query
+        #              order, distance) order wins, keeping its own
+        #              distance and query index;
+        #   capped   - per-source rank by distance (_SOURCE_KEY_SQL),
+        #              cut at max_per_source;
+        #   chosen   - global distance order, LIMIT final_n.
+        #
+        # Only the chosen rows are joined back for content + metadata,
+        # so ~final_n rows cross the wire instead of N * fetch_k.
+        values_clause = ", ".join(
+            f"({i}, %s::vector)" for i in range(len(query_embeddings))
+        )
+        recall_sql = self._recall_sql(
+            f"id, fingerprint, {_SOURCE_KEY_SQL} AS source_key",
+            f"AND is_junk IS NOT TRUE {where_sql}",
+        )
+        sql = (
+            f"WITH queries(idx, q_emb) AS (VALUES {values_clause}), "
+            f"candidates AS ("
+            f"  SELECT q.idx AS query_idx, c.id, c.fingerprint, c.source_key, c.distance "
+            f"  FROM queries q "
+            f"  CROSS JOIN LATERAL ({recall_sql}) c"
+            f"), "
+            f"deduped AS ("
+            f"  SELECT *, ROW_NUMBER() OVER ("
+            f"    PARTITION BY fingerprint ORDER BY query_idx, distance"
+            f"  ) AS fp_rank "
+            f"  FROM candidates"
+            f"), "
+            f"capped AS ("
+            f"  SELECT *, ROW_NUMBER() OVER ("
+            f"    PARTITION BY source_key ORDER BY distance, query_idx"
+            f"  ) AS source_rank "
+            f"  FROM deduped WHERE fp_rank = 1"
+            f"), "
+            f"chosen AS ("
+            f"  SELECT query_idx, id, distance FROM capped "
+            f"  WHERE source_rank <= %s "
+            f"  ORDER BY distance, query_idx "
+            f"  LIMIT %s"
+            f") "
+            f"SELECT s.query_idx, t.content, t.metadata, t.source_file, "
+            f"  t.fingerprint, t.is_junk, s.distance "
+            f"FROM chosen s JOIN {self.table_name} t ON t.id = s.id "
+            f"ORDER BY s.distance, s.query_idx"
+        )
+        params: List[Any] = [
+            *query_embeddings,
+            *where_params,
+            *self._recall_limits(fetch_k),
+            max(1, int(max_per_source)),
+            max(1, int(final_n)),
+        ]
+
+        out: List[List[QueryHit]] = [[] for _ in query_embeddings]
+        with self.pool.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                self._set_ef_search(cur, fetch_k)
+                cur.execute(sql, params)
+                for row in cur.fetchall():
+                    idx = row["query_idx"]
+                    if 0 <= idx < len(out):
+                        out[idx].append(_row_to_hit(row))
+        return out
+
+    def query_ids_multi(
+        self,
+        query_embeddings: List[List[float]],
+        fetch_k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Optional[List[List[CandidateHit]]]:
+        if not query_embeddings:
+            return []
+
+        where_sql, where_params = self._build_where(where)
+
+        # Same recall as query_multi minus content and the metadata
+        # JSONB: the diversification key is resolved in SQL and handed
+        # back as `source_file` (with empty metadata, so
+        # knowledge._get_source falls through to it). The TOASTed
+        # content column is never read for candidates that lose.
+        values_clause = ", ".join(
+            f"({i}, %s::vector)" for i in range(len(query_embeddings))
+        )
+        junk_select = "is_junk" if self._has_junk_column else "NULL::boolean AS is_junk"
+        junk_filter = "AND is_junk IS NOT TRUE" if self._has_junk_column else ""
+        recall_sql = self._recall_sql(
+            f"fingerprint, {_SOURCE_KEY_SQL} AS source_key, {junk_select}",
+            f"{junk_filter} {where_sql}",
+        )
+        sql = (
+            f"WITH queries(idx, q_emb) AS (VALUES {values_clause}) "
+            f"SELECT q.idx AS query_idx, c.fingerprint, c.source_key, c.is_junk, c.distance "
+            f"FROM queries q "
+            f"CROSS JOIN LATERAL ({recall_sql}) c "
+            f"ORDER BY q.idx"
+        )
+        params: List[Any] = [*query_embeddings, *where_params, *self._recall_limits(fetch_k)]
+
+        out: List[List[CandidateHit]] = [[] for _ in query_embeddings]
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                self._set_ef_search(cur, fetch_k)
+                cur.execute(sql, params)
+                for query_idx, fingerprint, source_key, is_junk, distance in cur.fetchall():
+                    if 0 <= query_idx < len(out):
+                        out[query_idx].append(
+                            CandidateHit(
+                                fingerprint=fingerprint,
+                                distance=float(distance) if distance is not None else None,
+                                source_file=source_key,
+                                is_junk=is_junk,
                             )
                         )
         return out
 
+    def hydrate(self, fingerprints: List[str]) -> Dict[str, QueryHit]:
+        if not fingerprints:
+            return {}
+        junk_select = "is_junk" if self._has_junk_column else "NULL::boolean AS is_junk"
+        with self.pool.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    f"SELECT content, metadata, source_file, fingerprint, {junk_select}, "
+                    f"  NULL::float8 AS distance "
+                    f"FROM {self.table_name} WHERE fingerprint = ANY(%s)",
+                    (list(fingerprints),),
+                )
+                rows = cur.fetchall()
+        return {row["fingerprint"]: _row_to_hit(row) for row in rows}
+
     # ----------------------------------------------------------------- upsert
 
     def upsert(self, chunks: List[BackendChunk]) -> None:
@@ -206,42 +498,108 @@ class PgVectorBackend(VectorBackend):
         # message instead of pgvector's lower-level type error.
         self._validate_embedding_dims(chunks)
 
+        if self.upsert_mode == "copy":
+            self._upsert_copy(chunks)
+        else:
+            self._upsert_rows(chunks)
+
+    def _upsert_columns(self) -> List[str]:
+        columns = [
+            "source_file",
+            "source_fingerprint",
+            "chunk_index",
+            "content",
+            "fingerprint",
+            "metadata",
+            "embed_model",
+            "embedding",
+        ]
+        if self._has_junk_column:
+            columns.append("is_junk")
+        return columns
+
+    def _upsert_set_clause(self) -> str:
+        return ", ".join(
+            f"{col} = EXCLUDED.{col}" for col in self._upsert_columns() if col != "fingerprint"
+        )
+
+    def _upsert_rows(self, chunks: List[BackendChunk]) -> None:
+        """One INSERT ... ON CONFLICT per chunk (the original path)."""
+        columns = self._upsert_columns()
+        placeholders = ", ".join(
+            {"metadata": "%s::jsonb", "embedding": "%s::vector"}.get(col, "%s") for col in columns
+        )
         sql = (
-            f"INSERT INTO {self.table_name} ("
-            f"  source_file, source_fingerprint, chunk_index, content, "
-            f"  fingerprint, metadata, embed_model, embedding"
-            f") VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s, %s::vector) "
-            f"ON CONFLICT (fingerprint) DO UPDATE SET "
-            f"  source_file = EXCLUDED.source_file, "
-            f"  source_fingerprint = EXCLUDED.source_fingerprint, "
-            f"  chunk_index = EXCLUDED.chunk_index, "
-            f"  content = EXCLUDED.content, "
-            f"  metadata = EXCLUDED.metadata, "
-            f"  embed_model = EXCLUDED.embed_model, "
-            f"  embedding = EXCLUDED.embedding"
+            f"INSERT INTO {self.table_name} ({', '.join(columns)}) "
+            f"VALUES ({placeholders}) "
+            f"ON CONFLICT (fingerprint) DO UPDATE SET {self._upsert_set_clause()}"
         )
         with self.pool.connection() as conn:
             try:
                 with conn.cursor() as cur:
                     for chunk in chunks:
-                        cur.execute(
-                            sql,
-                            (
-                                chunk.source_file,
-                                chunk.source_fingerprint,
-                                chunk.chunk_index,
-                                chunk.content,
-                                chunk.fingerprint,
-                                _json_dump(chunk.metadata or {}),
-                                chunk.embed_model or "",
-                                chunk.embedding,
-                            ),
-                        )
+                        row = self._upsert_row(chunk)
+                        row[columns.index("metadata")] = _json_dump(chunk.metadata or {})
+                        cur.execute(sql, row)
                 conn.commit()
             except Exception:
                 conn.rollback()
                 raise
 
+    def _upsert_copy(self, chunks: List[BackendChunk]) -> None:
+        """Binary COPY into a transaction-scoped staging table, then a
+        single set-based INSERT ... SELECT ... ON CONFLICT.
+
+        The staging table is cloned from the target's column types, so
+        COPY's binary dumpers line up with what the merge expects. A
+        fingerprint repeated within one batch keeps its last occurrence,
+        the same outcome as the row-by-row path (later statements
+        overwrite earlier ones); ON CONFLICT DO UPDATE itself refuses
+        to touch one row twice.
+        """
+        columns = self._upsert_columns()
+        column_list = ", ".join(columns)
+        stage = f"{self.table_name}_upsert_stage"
+        with self.pool.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DROP AS "
+                        f"SELECT 0::integer AS ord, {column_list} "
+                        f"FROM {self.table_name} WITH NO DATA"
+                    )
+                    with cur.copy(
+                        f"COPY {stage} (ord, {column_list}) FROM STDIN WITH (FORMAT BINARY)"
+                    ) as copy:
+                        copy.set_types(["int4", *(_COPY_TYPES[col] for col in columns)])
+                        for ord_, chunk in enumerate(chunks):
+                            copy.write_row([ord_, *self._upsert_row(chunk)])
+                    cur.execute(
+                        f"INSERT INTO {self.table_name} ({column_list}) "
+                        f"SELECT DISTINCT ON (fingerprint) {column_list} "
+                        f"FROM {stage} ORDER BY fingerprint, ord DESC "
+                        f"ON CONFLICT (fingerprint) DO UPDATE SET {self._upsert_set_clause()}"
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _upsert_row(self, chunk: BackendChunk) -> List[Any]:
+        row: List[Any] = [
+            chunk.source_file,
+            chunk.source_fingerprint,
+            chunk.chunk_index,
+            chunk.content,
+            chunk.fingerprint,
+            chunk.metadata or {},
+            chunk.embed_model or "",
+            chunk.embedding,
+        ]
+        if self._has_junk_column:
+            row.append(chunk.is_junk)
+        return row
+
     # ----------------------------------------------------------------- delete
 
     def delete_fingerprints(self, fingerprints: List[str]) -> int:
@@ -302,8 +660,63 @@ class PgVectorBackend(VectorBackend):
                 conn.rollback()
                 raise
 
+    def set_source_fingerprint(
+        self, fingerprints: List[str], source_fingerprint: str
+    ) -> int:
+        """Move unchanged chunks to the re-ingested file's fingerprint
+        with a plain UPDATE: no embedding or content rewrite, no index
+        churn on the vector column."""
+        if not fingerprints or not source_fingerprint:
+            return 0
+        with self.pool.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"UPDATE {self.table_name} SET source_fingerprint = %s "
+                        f"WHERE fingerprint = ANY(%s) AND source_fingerprint <> %s",
+                        (source_fingerprint, list(fingerprints), source_fingerprint),
+                    )
+                    updated = cur.rowcount or 0
+                conn.commit()
+                return updated
+            except Exception:
+                conn.rollback()
+                raise
+
     # --------------------------------------------------------------- introspection
 
+    def list_source_chunks(self, source_file: str) -> List[BackendChunk]:
+        """Every stored row of `source_file` as a BackendChunk, vector
+        included, for kb-ingest's embedding reuse."""
+        if not source_file:
+            return []
+        junk_select = "is_junk" if self._has_junk_column else "NULL::boolean AS is_junk"
+        with self.pool.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    f"SELECT content, fingerprint, source_file, source_fingerprint, "
+                    f"  chunk_index, embedding, metadata, embed_model, {junk_select} "
+                    f"FROM {self.table_name} WHERE source_file = %s "
+                    f"ORDER BY chunk_index",
+                    (source_file,),
+                )
+                rows = cur.fetchall()
+        return [
+            BackendChunk(
+                content=row["content"],
+                fingerprint=row["fingerprint"],
+                source_file=row["source_file"],
+                source_fingerprint=row["source_fingerprint"],
+                chunk_index=row["chunk_index"],
+                # register_vector hands back numpy arrays.
+                embedding=row["embedding"].tolist() if row["embedding"] is not None else [],
+                metadata=row.get("metadata") or {},
+                embed_model=row.get("embed_model") or None,
+                is_junk=row.get("is_junk"),
+            )
+            for row in rows
+        ]
+
     def list_source_fingerprints(self, source_files: List[str]) -> Dict[str, Set[str]]:
         """Return every distinct source_fingerprint per source_file.
         The dict-of-set shape matters: a source with two fingerprints
@@ -343,6 +756,27 @@ class PgVectorBackend(VectorBackend):
                 rows = cur.fetchall()
         return [row[0] for row in rows if row[0]]
 
+    def corpus_version(self) -> Optional[str]:
+        """Read the counter kept by db/migrations/015_kb_corpus_version.sql.
+        Returns None (result caching off) when the migration hasn't been
+        applied yet, logging once so the operator knows why."""
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT version FROM kb_corpus_version WHERE id = 1")
+                    row = cur.fetchone()
+        except psycopg.errors.UndefinedTable:
+            if not self._corpus_version_missing_logged:
+                logger.warning(
+                    "kb_corpus_version table missing; retrieval-result caching "
+                    "disabled until db/migrations/015_kb_corpus_version.sql is applied"
+                )
+                self._corpus_version_missing_logged = True
+            return None
+        if row is None:
+            return None
+        return str(row[0])
+
     def health(self) -> Dict[str, Any]:
         try:
             with self.pool.connection() as conn:
@@ -373,6 +807,44 @@ class PgVectorBackend(VectorBackend):
                     f"got {actual} values, expected {EXPECTED_EMBED_DIM}"
                 )
 
+    def _recall_sql(self, columns: str, filters_sql: str) -> str:
+        """Body of the per-query LATERAL subquery: `columns` plus the
+        exact cosine `distance` of the nearest rows to `q.q_emb`.
+
+        Unquantized, that is the HNSW walk on `embedding` with one LIMIT
+        placeholder. Quantized, the inner query walks the compact index
+        for rescore_factor x fetch_k candidates and the outer one
+        re-ranks them by the full-precision distance (two LIMIT
+        placeholders). `_recall_limits` supplies the matching params.
+        """
+        recall = (
+            f"SELECT {columns}, (embedding <=> q.q_emb) AS distance "
+            f"FROM {self.table_name} "
+            f"WHERE embedding IS NOT NULL {filters_sql} "
+        )
+        if self.quantized == "off":
+            return recall + "ORDER BY embedding <=> q.q_emb LIMIT %s"
+        return (
+            f"SELECT * FROM ("
+            f"{recall}ORDER BY {_COARSE_ORDER_SQL[self.quantized]} LIMIT %s"
+            f") coarse ORDER BY distance LIMIT %s"
+        )
+
+    def _recall_limits(self, fetch_k: int) -> List[int]:
+        fetch_k = max(1, int(fetch_k))
+        if self.quantized == "off":
+            return [fetch_k]
+        return [fetch_k * self.rescore_factor, fetch_k]
+
+    def _set_ef_search(self, cur: psycopg.Cursor, fetch_k: int) -> None:
+        """An HNSW scan yields at most hnsw.ef_search rows (default 40),
+        which would silently cap the coarse candidate list; raise it for
+        this transaction only."""
+        if self.quantized == "off":
+            return
+        coarse_k = min(_MAX_EF_SEARCH, self._recall_limits(fetch_k)[0])
+        cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(coarse_k),))
+
     def _build_where(self, where: Optional[Dict[str, Any]]):
         """Translate a Chroma-style metadata filter into SQL.
 
@@ -402,10 +874,41 @@ class PgVectorBackend(VectorBackend):
         return "AND " + " AND ".join(clauses), params
 
 
+#: Binary COPY type per upsert column (must match db/migrations/006 +
+#: 016). `vector` resolves to pgvector's binary dumper registered by
+#: register_vector on every pooled connection.
+_COPY_TYPES = {
+    "source_file": "text",
+    "source_fingerprint": "text",
+    "chunk_index": "int4",
+    "content": "text",
+    "fingerprint": "text",
+    "metadata": "jsonb",
+    "embed_model": "text",
+    "embedding": "vector",
+    "is_junk": "bool",
+}
+
+
+def _row_to_hit(row: Dict[str, Any]) -> QueryHit:
+    return QueryHit(
+        content=row["content"],
+        metadata=row.get("metadata") or {},
+        distance=float(row["distance"]) if row["distance"] is not None else None,
+        fingerprint=row.get("fingerprint"),
+        source_file=row.get("source_file"),
+        is_junk=row.get("is_junk"),
+    )
+
+
 def _json_dump(payload: Dict[str, Any]) -> str:
     return json.dumps(payload, ensure_ascii=False)
 
 
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
 def _env_int(name: str, default: int) -> int:
     raw = os.getenv(name, "").strip()
     if not raw:
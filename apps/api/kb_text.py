@@ -0,0 +1,54 @@
+"""Chunk-text rules shared by the KB service and the ingest pipeline.
+
+`scripts/kb-ingest.py` evaluates `is_junk` once per chunk and stores the
+result in `kb_chunks.is_junk`; `knowledge.py` falls back to evaluating
+it at query time for rows ingested before the column existed. Both
+sides must agree on the rule, so it lives here rather than in either
+caller. Keep this module dependency-free: the ingest script imports it
+without pulling in the KB service's logging setup.
+"""
+
+from __future__ import annotations
+
+import re
+
+# Navigation / boilerplate fragments from the WeChat-article part of
+# the corpus (tune as needed). apps/api/src/modules/ai-agents/
+# retrievers/medical-kb.ts carries a subset of these as a last-line
+# check on the Node side.
+JUNK_PATTERNS = [
+    r"目录",
+    r"上一篇",
+    r"下一篇",
+    r"连载",
+    r"撰文",
+    r"排版",
+    r"责任编辑",
+    r"点击阅读",
+    r"更多内容",
+    r"病友故事\s*·\s*目录",
+    r"社区简介",
+    r"我们在路上",
+    r"不是一个人",
+    r"康复医师网络",
+]
+JUNK_RE = re.compile("|".join(JUNK_PATTERNS))
+
+#: Chunks shorter than this (after normalisation) carry too little
+#: content to be worth a retrieval slot.
+MIN_CHUNK_CHARS = 30
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def norm_text(text: str) -> str:
+    """Trim and collapse whitespace runs to a single space."""
+    return _WHITESPACE_RE.sub(" ", (text or "").strip())
+
+
+def is_junk(text: str) -> bool:
+    """True for boilerplate / too-short chunks. Expects `norm_text`
+    output, which is what both the ingest and the query path pass."""
+    if not text or len(text.strip()) < MIN_CHUNK_CHARS:
+        return True
+    return bool(JUNK_RE.search(text))
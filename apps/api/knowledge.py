@@ -8,17 +8,23 @@ docs/proposals/local-rag-migration.md.
 
 from __future__ import annotations
 
+import copy
 import hashlib
 import json
 import logging
 import os
-import re
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 
 from kb_backends import VectorBackend, create_backend
-from kb_backends.base import QueryHit
+from kb_backends.base import CandidateHit, QueryHit
 from embed_models import Embedder, create_embedder
+from kb_text import JUNK_PATTERNS, JUNK_RE, is_junk, norm_text  # noqa: F401
 
 # -----------------------------
 # Logging: only to stderr (avoid breaking JSON stdout)
@@ -31,31 +37,11 @@ logging.basicConfig(
 logger = logging.getLogger("fshd_kb")
 
 # -----------------------------
-# Junk filters (tune as needed)
+# Junk filters: shared with scripts/kb-ingest.py via kb_text, which
+# stores the verdict per chunk in kb_chunks.is_junk at ingest time.
 # -----------------------------
-JUNK_PATTERNS = [
-    r"目录",
-    r"上一篇",
-    r"下一篇",
-    r"连载",
-    r"撰文",
-    r"排版",
-    r"责任编辑",
-    r"点击阅读",
-    r"更多内容",
-    r"病友故事\s*·\s*目录",
-    r"社区简介",
-    r"我们在路上",
-    r"不是一个人",
-    r"康复医师网络",
-]
-JUNK_RE = re.compile("|".join(JUNK_PATTERNS))
-
-
-def _norm_text(t: str) -> str:
-    t = (t or "").strip()
-    t = re.sub(r"\s+", " ", t)
-    return t
+_norm_text = norm_text
+_is_junk = is_junk
 
 
 def _fingerprint(text: str) -> str:
@@ -66,12 +52,6 @@ def _fingerprint(text: str) -> str:
     return hashlib.sha256(_norm_text(text).encode("utf-8")).hexdigest()[:32]
 
 
-def _is_junk(text: str) -> bool:
-    if not text or len(text.strip()) < 30:
-        return True
-    return bool(JUNK_RE.search(text))
-
-
 def _safe_int(x: Any, default: int) -> int:
     try:
         return int(x)
@@ -100,6 +80,255 @@ def _get_source(metadata: Optional[Dict[str, Any]], fallback: Optional[str] = No
     return str(source)
 
 
+def _dedup_and_rank(
+    per_query_hits: List[List[Any]], n_queries: int
+) -> Tuple[List[Any], List[int], List[int]]:
+    """Cross-query dedup + distance ranking shared by both merge paths.
+
+    Returns (hits, hit_query_i, order): the first occurrence of every
+    fingerprint in query order, the index of the query that found it,
+    and the stable distance ranking over `hits` (missing distances
+    sink). Works on QueryHit and CandidateHit alike; hits without a
+    fingerprint (Chroma single-phase) pay for a content hash.
+    """
+    hits: List[Any] = []
+    hit_query_i: List[int] = []
+    seen: set = set()
+    for qi, query_hits in enumerate(per_query_hits[:n_queries]):
+        for hit in query_hits:
+            fp = hit.fingerprint or _fingerprint(hit.content)
+            if fp in seen:
+                continue
+            seen.add(fp)
+            hits.append(hit)
+            hit_query_i.append(qi)
+
+    if not hits:
+        return [], [], []
+
+    distances = np.fromiter(
+        (h.distance if h.distance is not None else np.nan for h in hits),
+        dtype=np.float64,
+        count=len(hits),
+    )
+    distances[np.isnan(distances)] = 1e9
+    order = np.argsort(distances, kind="stable").tolist()
+    return hits, hit_query_i, order
+
+
+def _chunk_dict(
+    hit: QueryHit, text_norm: str, distance: Optional[float], queries: List[str], qi: int
+) -> Dict[str, Any]:
+    return {
+        "content": text_norm,
+        "metadata": hit.metadata or {},
+        "distance": distance,
+        "_source_file": hit.source_file,
+        "_hit_query": queries[qi],
+        "_hit_query_i": qi,
+    }
+
+
+def _merge_and_select(
+    queries: List[str],
+    per_query_hits: List[List[QueryHit]],
+    final_n: int,
+    max_per_source: int,
+) -> List[Dict[str, Any]]:
+    """Merge per-query hits into the final ranked, diversified chunk list.
+
+    Up to 6 x fetch_k candidates come back but only `final_n` survive,
+    so the per-hit work is pushed as late as possible:
+
+      * dedup runs on fingerprints in a set. Backend-supplied
+        fingerprints are used as-is; only hits without one (Chroma)
+        pay for `_norm_text` + sha256 up front;
+      * ranking is one stable NumPy argsort over the distance array
+        (missing distances sink), matching the previous stable
+        `list.sort` tie order;
+      * `_norm_text` runs only on candidates the selection loop actually
+        reaches, in rank order, until `final_n` are chosen; `_is_junk`
+        additionally only for rows without a stored `is_junk` verdict.
+
+    Deduping before the junk check is equivalent to the old
+    junk-then-dedup order because a fingerprint identifies one piece of
+    content, and junk is a property of the content.
+    """
+    hits, hit_query_i, order = _dedup_and_rank(per_query_hits, len(queries))
+
+    chosen: List[Dict[str, Any]] = []
+    per_source: Dict[str, int] = {}
+    for idx in order:
+        hit = hits[idx]
+        src = _get_source(hit.metadata, fallback=hit.source_file)
+        if per_source.get(src, 0) >= max_per_source:
+            continue
+        text_norm = _norm_text(hit.content)
+        # Trust the ingest-time verdict when the backend has one; only
+        # legacy rows (None) pay for the regex scan here.
+        junk = hit.is_junk if hit.is_junk is not None else _is_junk(text_norm)
+        if junk:
+            continue
+        chosen.append(_chunk_dict(hit, text_norm, hit.distance, queries, hit_query_i[idx]))
+        per_source[src] = per_source.get(src, 0) + 1
+        if len(chosen) >= final_n:
+            break
+    return chosen
+
+
+def _select_two_phase(
+    queries: List[str],
+    per_query_candidates: List[List[CandidateHit]],
+    final_n: int,
+    max_per_source: int,
+    hydrate: Callable[[List[str]], Dict[str, QueryHit]],
+) -> List[Dict[str, Any]]:
+    """`_merge_and_select` over body-less candidates.
+
+    Each round hydrates the next candidates, in rank order, that would
+    fit under the per-source cap if none of them turned out to be junk
+    -- normally exactly `final_n`, so one bulk fetch. The round then
+    walks rank order with the real counts; when a junk (or vanished)
+    chunk frees a slot for a candidate that wasn't hydrated, the walk
+    stops there and the next round picks it up. The output is the same
+    as fetching every body up front.
+    """
+    hits, hit_query_i, order = _dedup_and_rank(per_query_candidates, len(queries))
+    sources = [_get_source(c.metadata, fallback=c.source_file) for c in hits]
+
+    chosen: List[Dict[str, Any]] = []
+    per_source: Dict[str, int] = {}
+    pos = 0
+    while pos < len(order) and len(chosen) < final_n:
+        need = final_n - len(chosen)
+        projected = dict(per_source)
+        wanted: List[int] = []
+        scan = pos
+        while scan < len(order) and len(wanted) < need:
+            idx = order[scan]
+            if projected.get(sources[idx], 0) < max_per_source:
+                wanted.append(idx)
+                projected[sources[idx]] = projected.get(sources[idx], 0) + 1
+            scan += 1
+        if not wanted:
+            break
+
+        bodies = hydrate([hits[idx].fingerprint for idx in wanted])
+        wanted_set = set(wanted)
+        while pos < scan and len(chosen) < final_n:
+            idx = order[pos]
+            src = sources[idx]
+            if per_source.get(src, 0) >= max_per_source:
+                pos += 1
+                continue
+            if idx not in wanted_set:
+                break
+            pos += 1
+            candidate = hits[idx]
+            body = bodies.get(candidate.fingerprint)
+            if body is None:
+                # Deleted between the two phases (re-ingest); skip it.
+                continue
+            text_norm = _norm_text(body.content)
+            stored = candidate.is_junk if candidate.is_junk is not None else body.is_junk
+            junk = stored if stored is not None else _is_junk(text_norm)
+            if junk:
+                continue
+            chosen.append(
+                _chunk_dict(body, text_norm, candidate.distance, queries, hit_query_i[idx])
+            )
+            per_source[src] = per_source.get(src, 0) + 1
+    return chosen
+
+
+class RetrievalResultCache:
+    """Whole-result cache for `FSHDKnowledgeBase.search_multi`.
+
+    FAQ-style questions arrive with identical rewritten queries, and
+    the result for a given (question, queries, knobs) tuple only
+    changes when the corpus does. Entries are tagged with the backend's
+    `corpus_version()`; the version is re-read at most every
+    `version_check_seconds` (so a hit costs no database round-trip),
+    and any change drops the whole cache. `ttl_seconds` bounds how long
+    an entry lives even if the version never moves.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 300.0,
+        version_check_seconds: float = 5.0,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.version_check_seconds = max(0.0, float(version_check_seconds))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._version_checked_at: Optional[float] = None
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        raw = json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def current_version(self, backend: VectorBackend) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            checked_at = self._version_checked_at
+            if checked_at is not None and now - checked_at < self.version_check_seconds:
+                return self._version
+        try:
+            version = backend.corpus_version()
+        except Exception:
+            logger.exception("corpus_version lookup failed; bypassing result cache")
+            version = None
+        with self._lock:
+            if version != self._version and self._entries:
+                self._entries.clear()
+                self._invalidations += 1
+            self._version = version
+            self._version_checked_at = now
+        return version
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl_seconds or now - entry[0] < self.ttl_seconds):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                # Hand out a copy: callers annotate metadata in place.
+                return copy.deepcopy(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "corpus_version": self._version,
+            }
+
+
 class FSHDKnowledgeBase:
     """Backend-agnostic FSHD knowledge base orchestrator."""
 
@@ -107,9 +336,11 @@ class FSHDKnowledgeBase:
         self,
         backend: Optional[VectorBackend] = None,
         embedder: Optional[Embedder] = None,
+        result_cache: Optional[RetrievalResultCache] = None,
     ) -> None:
         self.backend = backend or create_backend()
         self.embedder = embedder or create_embedder()
+        self.result_cache = result_cache
         logger.info(
             "KB ready: backend=%s embedder=%s dim=%s",
             self.backend.id,
@@ -171,57 +402,36 @@ class FSHDKnowledgeBase:
             where,
         )
 
-        # 1) Embed all queries in a single call (faster + cache-friendly).
-        q_embs = self.embedder.embed_texts(queries)
-
-        # 2) Backend-specific recall.
-        per_query_hits: List[List[QueryHit]] = self.backend.query_multi(
-            query_embeddings=q_embs,
-            fetch_k=fetch_k,
-            where=where,
-        )
-
-        # 3) Merge, dedup, junk-filter.
-        merged: List[Dict[str, Any]] = []
-        seen_fp: set[str] = set()
-        for qi, (q, hits) in enumerate(zip(queries, per_query_hits)):
-            for hit in hits:
-                text_norm = _norm_text(hit.content)
-                if _is_junk(text_norm):
-                    continue
-                fp = hit.fingerprint or _fingerprint(text_norm)
-                if fp in seen_fp:
-                    continue
-                seen_fp.add(fp)
-                merged.append(
-                    {
-                        "content": text_norm,
-                        "metadata": hit.metadata or {},
-                        "distance": hit.distance,
-                        "_source_file": hit.source_file,
-                        "_hit_query": q,
-                        "_hit_query_i": qi,
-                    }
+        # 0) Whole-result cache. Only consulted when the backend can
+        # report a corpus version, so an ingest can never leave us
+        # serving chunks that no longer exist.
+        result_key: Optional[str] = None
+        if self.result_cache is not None:
+            corpus_version = self.result_cache.current_version(self.backend)
+            if corpus_version is not None:
+                result_key = self.result_cache.make_key(
+                    question=question,
+                    queries=queries,
+                    final_n=final_n,
+                    fetch_k=fetch_k,
+                    max_per_source=max_per_source,
+                    where=where or None,
+                    keep_debug_fields=keep_debug_fields,
+                    backend=self.backend.id,
+                    embed_model=self.embedder.model_name,
+                    corpus_version=corpus_version,
                 )
+                cached = self.result_cache.get(result_key)
+                if cached is not None:
+                    cached["metadata"]["cache_hit"] = True
+                    return cached
 
-        # 4) Rank by distance (closer first; missing distances sink).
-        def _dist_key(item: Dict[str, Any]) -> float:
-            d = item.get("distance")
-            return float(d) if d is not None else 1e9
+        # 1) Embed all queries in a single call (faster + cache-friendly).
+        q_embs = self.embedder.embed_texts(queries)
 
-        merged.sort(key=_dist_key)
-
-        # 5) Per-source diversification.
-        chosen: List[Dict[str, Any]] = []
-        per_source: Dict[str, int] = {}
-        for item in merged:
-            src = _get_source(item.get("metadata"), fallback=item.get("_source_file"))
-            if per_source.get(src, 0) >= max_per_source:
-                continue
-            chosen.append(item)
-            per_source[src] = per_source.get(src, 0) + 1
-            if len(chosen) >= final_n:
-                break
+        # 2-5) Recall, then merge / dedup / rank / junk-filter /
+        # diversify down to final_n.
+        chosen, retrieval = self._retrieve(queries, q_embs, final_n, fetch_k, max_per_source, where)
 
         # 6) Preview answer (Node side will produce the real LLM answer).
         answer = self._generate_answer_preview(question, chosen)
@@ -233,7 +443,7 @@ class FSHDKnowledgeBase:
                 c.pop("_hit_query", None)
                 c.pop("_hit_query_i", None)
 
-        return {
+        result = {
             "answer": answer,
             "chunks": chosen,
             "metadata": {
@@ -246,8 +456,62 @@ class FSHDKnowledgeBase:
                 "where": where or None,
                 "backend": self.backend.id,
                 "embed_model": self.embedder.model_name,
+                "retrieval": retrieval,
+                "cache_hit": False,
             },
         }
+        if result_key is not None:
+            self.result_cache.put(result_key, result)
+        return result
+
+    def _retrieve(
+        self,
+        queries: List[str],
+        q_embs: List[List[float]],
+        final_n: int,
+        fetch_k: int,
+        max_per_source: int,
+        where: Optional[Dict[str, Any]],
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Pick the cheapest recall path the backend supports.
+
+        Returns the chosen chunks and which path produced them:
+          * "server_merge" - the backend deduped, ranked and diversified
+            itself and returned only survivors; the Python merge is a
+            near no-op pass (plus the runtime junk check for rows
+            without a stored verdict);
+          * "two_phase" - rank on (fingerprint, source, distance) only
+            and hydrate bodies for the winners, instead of shipping
+            content + metadata for every queries x fetch_k candidate;
+          * "query_multi" - full hits for every candidate.
+        """
+        survivors = self.backend.query_diversified(
+            query_embeddings=q_embs,
+            fetch_k=fetch_k,
+            final_n=final_n,
+            max_per_source=max_per_source,
+            where=where,
+        )
+        if survivors is not None:
+            return _merge_and_select(queries, survivors, final_n, max_per_source), "server_merge"
+
+        candidates = self.backend.query_ids_multi(
+            query_embeddings=q_embs,
+            fetch_k=fetch_k,
+            where=where,
+        )
+        if candidates is not None:
+            chosen = _select_two_phase(
+                queries, candidates, final_n, max_per_source, self.backend.hydrate
+            )
+            return chosen, "two_phase"
+
+        per_query_hits = self.backend.query_multi(
+            query_embeddings=q_embs,
+            fetch_k=fetch_k,
+            where=where,
+        )
+        return _merge_and_select(queries, per_query_hits, final_n, max_per_source), "query_multi"
 
     def _generate_answer_preview(self, question: str, chunks: List[Dict[str, Any]]) -> str:
         if not chunks:
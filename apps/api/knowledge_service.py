@@ -3,14 +3,16 @@ import hmac
 import json
 import logging
 import os
+import signal
 import threading
 import traceback
 import uuid
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse
 from pathlib import Path
 
-from knowledge import FSHDKnowledgeBase
+from embed_models import create_service_embedder
+from knowledge import FSHDKnowledgeBase, RetrievalResultCache
 
 try:
     from dotenv import load_dotenv
@@ -51,6 +53,13 @@ def _safe_int(value, default):
         return default
 
 
+def _safe_float(value, default):
+    try:
+        return float(value)
+    except Exception:
+        return default
+
+
 def _now_iso():
     return __import__('datetime').datetime.now(__import__('datetime').timezone.utc).isoformat()
 
@@ -84,7 +93,10 @@ def _warmup_kb():
     global kb_instance
     try:
         logger.info('Starting knowledge base warmup')
-        instance = FSHDKnowledgeBase()
+        instance = FSHDKnowledgeBase(
+            embedder=create_service_embedder(),
+            result_cache=_build_result_cache(),
+        )
         with kb_init_lock:
             kb_instance = instance
             kb_ready_event.set()
@@ -97,6 +109,19 @@ def _warmup_kb():
         logger.exception('Knowledge base warmup failed')
 
 
+def _build_result_cache():
+    """Whole-result cache for repeated FAQ-style questions.
+    `KB_RESULT_CACHE_MAX_ENTRIES=0` disables it."""
+    max_entries = _safe_int(os.getenv('KB_RESULT_CACHE_MAX_ENTRIES', '512'), 512)
+    if max_entries <= 0:
+        return None
+    return RetrievalResultCache(
+        max_entries=max_entries,
+        ttl_seconds=_safe_float(os.getenv('KB_RESULT_CACHE_TTL_SECONDS', '300'), 300.0),
+        version_check_seconds=_safe_float(os.getenv('KB_RESULT_CACHE_VERSION_CHECK_SECONDS', '5'), 5.0),
+    )
+
+
 def _ensure_kb_warmup_started():
     global kb_warmup_thread
     with kb_init_lock:
@@ -132,6 +157,94 @@ def _get_kb():
     return kb_instance
 
 
+class _AdmissionGate:
+    """Bounded admission control for `/multi`.
+
+    The service now runs on a `ThreadingHTTPServer`, so every
+    connection gets its own thread and a slow bge-m3 encode or pgvector
+    round-trip no longer blocks the health probes or the next chat
+    request. Unbounded threads would just move the pile-up into the
+    embedder and the connection pool, though, so search work passes
+    through this gate: at most `max_concurrency` requests run at once,
+    at most `max_queue` wait for a slot for up to `queue_timeout`
+    seconds (0 = don't wait at all), and anything beyond that is
+    shed immediately with a 503 instead of sitting in a queue the Node
+    side will time out on anyway.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = max(0.0, float(queue_timeout))
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queued = 0
+        self._shed = 0
+
+    def acquire(self) -> bool:
+        """Claim a work slot. Returns False when the request must be
+        shed (queue full, or no slot freed up within `queue_timeout`)."""
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self._in_flight += 1
+            return True
+
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._shed += 1
+                return False
+            self._queued += 1
+
+        # timeout=0 doesn't block: no queueing, shed when no slot is free.
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self._queued -= 1
+            if acquired:
+                self._in_flight += 1
+            else:
+                self._shed += 1
+        return acquired
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'inFlight': self._in_flight,
+                'queued': self._queued,
+                'shed': self._shed,
+                'maxConcurrency': self.max_concurrency,
+                'maxQueue': self.max_queue,
+            }
+
+
+def _build_admission_gate() -> _AdmissionGate:
+    """Size the gate from env. The concurrency default follows
+    `KB_PG_POOL_MAX` because every in-flight search holds one pgvector
+    connection for its `query_multi` round-trip; running more workers
+    than the pool has connections just moves the wait into
+    `pool.connection()`."""
+    pool_max = _safe_int(os.getenv('KB_PG_POOL_MAX', '4'), 4)
+    max_concurrency = _safe_int(os.getenv('KB_SERVICE_MAX_CONCURRENCY', str(pool_max)), pool_max)
+    max_queue = _safe_int(os.getenv('KB_SERVICE_MAX_QUEUE', '16'), 16)
+    queue_timeout = _safe_float(os.getenv('KB_SERVICE_QUEUE_TIMEOUT_SECONDS', '30'), 30.0)
+    if max_concurrency > pool_max:
+        logger.warning(
+            'KB_SERVICE_MAX_CONCURRENCY=%d exceeds KB_PG_POOL_MAX=%d; extra workers '
+            'will wait on the pgvector pool instead of running concurrently',
+            max_concurrency,
+            pool_max,
+        )
+    return _AdmissionGate(max_concurrency, max_queue, queue_timeout)
+
+
+admission_gate = _build_admission_gate()
+
+
 #: Hard cap on request body length. The KB service only accepts a
 #: small JSON envelope (a question + a few rewritten queries + a
 #: shallow `where` filter); the legacy `int(content-length)` read
@@ -209,12 +322,14 @@ def _authorise(handler) -> bool:
 
 
 class KnowledgeServiceHandler(BaseHTTPRequestHandler):
-    def _send_json(self, status, payload):
+    def _send_json(self, status, payload, headers=None):
         body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
         try:
             self.send_response(status)
             self.send_header('Content-Type', 'application/json; charset=utf-8')
             self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
             self.end_headers()
             self.wfile.write(body)
         except (BrokenPipeError, ConnectionResetError):
@@ -238,7 +353,15 @@ class KnowledgeServiceHandler(BaseHTTPRequestHandler):
             _ensure_kb_warmup_started()
             state = _snapshot_kb_state()
             status_code = 200 if kb_ready_event.is_set() and kb_instance is not None else 503
-            payload = {'status': 'ready' if status_code == 200 else 'warming', 'state': state}
+            payload = {
+                'status': 'ready' if status_code == 200 else 'warming',
+                'state': state,
+                'load': admission_gate.snapshot(),
+            }
+            if kb_instance is not None:
+                payload['embedder'] = kb_instance.embedder.stats()
+                if kb_instance.result_cache is not None:
+                    payload['resultCache'] = kb_instance.result_cache.stats()
             self._send_json(status_code, payload)
             return
 
@@ -300,6 +423,14 @@ class KnowledgeServiceHandler(BaseHTTPRequestHandler):
         keep_debug = bool(payload.get('keep_debug_fields', False))
 
         request_id = uuid.uuid4().hex[:12]
+        if not admission_gate.acquire():
+            # Shed load instead of queueing without bound. The Node
+            # retriever treats 503 like any other KB outage (degraded
+            # answer without citations), which beats a request that
+            # waits out its own timeout behind a backlog.
+            logger.warning('knowledge service overloaded, shedding request (request_id=%s)', request_id)
+            self._send_json(503, {'error': 'kb_overloaded', 'request_id': request_id}, headers={'Retry-After': '1'})
+            return
         try:
             kb = _get_kb()
             result = kb.search_multi(
@@ -319,6 +450,8 @@ class KnowledgeServiceHandler(BaseHTTPRequestHandler):
             # string never reach the wire.
             logger.exception('knowledge service failed (request_id=%s)', request_id)
             self._send_json(500, {'error': 'kb_internal_error', 'request_id': request_id})
+        finally:
+            admission_gate.release()
 
     def log_message(self, format, *args):
         """Route BaseHTTPRequestHandler's per-request access log through
@@ -413,6 +546,10 @@ def _check_prod_token_safety(host: str, token: str, node_env: str) -> str | None
     return None
 
 
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
 if __name__ == '__main__':
     host = os.getenv('KB_SERVICE_HOST', '127.0.0.1')
     port = _safe_int(os.getenv('KB_SERVICE_PORT', '5010'), 5010)
@@ -426,15 +563,27 @@ if __name__ == '__main__':
         raise SystemExit(_safety_error)
 
     _ensure_kb_warmup_started()
-    server = HTTPServer((host, port), KnowledgeServiceHandler)
+    # One thread per connection so health probes and short searches
+    # are never stuck behind a slow one; `admission_gate` bounds how
+    # many of those threads do actual search work at a time. Daemon
+    # threads keep Ctrl-C / SIGTERM from hanging on an in-flight encode.
+    server = ThreadingHTTPServer((host, port), KnowledgeServiceHandler)
+    server.daemon_threads = True
     logger.info(
-        'Knowledge service listening on http://%s:%s (auth=%s)',
+        'Knowledge service listening on http://%s:%s (auth=%s, max_concurrency=%d, max_queue=%d)',
         host,
         port,
         'on' if _REQUIRED_TOKEN else 'off',
+        admission_gate.max_concurrency,
+        admission_gate.max_queue,
     )
+    # Container runtimes stop pods with SIGTERM; route it through the
+    # KeyboardInterrupt path so the embedder gets to flush its cache.
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         logger.info('Shutting down knowledge service')
         server.server_close()
+        if kb_instance is not None:
+            kb_instance.embedder.close()
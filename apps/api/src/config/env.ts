@@ -144,6 +144,8 @@ const envSchema = z
     OCR_PROVIDER: z.enum(['embedded', 'baidu', 'mock']).default('embedded'),
     OCR_PYTHON_BIN: z.string().default('python3'),
     OCR_PARSER_TIMEOUT_MS: z.coerce.number().int().positive().default(120000),
+    OCR_PARSER_SERVE: booleanish().default(false),
+    OCR_SERVE_WORKERS: z.coerce.number().int().min(0).default(2),
     OCR_DISABLE_PADDLE: z.preprocess(
       (value) => (value === '' ? undefined : value),
       z.string().optional(),
@@ -1,11 +1,25 @@
 import { loadAppEnv } from './config/env.js';
 import { createLogger } from './config/logger.js';
 import { createServer } from './server.js';
+import { runShutdownHooks } from './utils/shutdown.js';
+
+// How long in-flight requests get to finish after SIGTERM / SIGINT.
+const SHUTDOWN_GRACE_MS = 10_000;
 
 const env = loadAppEnv();
 const logger = createLogger(env);
 const app = createServer({ env, logger });
 
-app.listen(env.PORT, () => {
+const server = app.listen(env.PORT, () => {
   logger.info({ port: env.PORT }, 'API server started');
 });
+
+const shutdown = (signal: NodeJS.Signals) => {
+  logger.info({ signal }, 'API server shutting down');
+  server.close();
+  void runShutdownHooks().finally(() => {
+    setTimeout(() => process.exit(0), SHUTDOWN_GRACE_MS).unref();
+  });
+};
+process.once('SIGTERM', shutdown);
+process.once('SIGINT', shutdown);
@@ -14,6 +14,7 @@ import { LocalStorageProvider } from '../../services/storage/local-storage.js';
 import { MinioStorageProvider } from '../../services/storage/minio-storage.js';
 import { RoutedStorageProvider } from '../../services/storage/routed-storage.js';
 import { asyncHandler } from '../../utils/async-handler.js';
+import { onShutdown } from '../../utils/shutdown.js';
 import { AuditLogger } from '../ai-agents/audit/prompt-audit.js';
 
 export const createPatientProfileRouter = (context: RouteContext) => {
@@ -55,7 +56,13 @@ export const createPatientProfileRouter = (context: RouteContext) => {
         : new EmbeddedReportOcrProvider({
             pythonBin: context.env.OCR_PYTHON_BIN,
             timeoutMs: context.env.OCR_PARSER_TIMEOUT_MS,
+            serve: context.env.OCR_PARSER_SERVE,
+            serveWorkers: context.env.OCR_SERVE_WORKERS,
           });
+  if (ocr instanceof EmbeddedReportOcrProvider) {
+    // Ends the --serve child's stdin so it drains its workers and exits.
+    onShutdown(() => ocr.close());
+  }
 
   const aiApiKey = context.env.AI_API_KEY || context.env.OPENAI_API_KEY || '';
   const aiClient = aiApiKey
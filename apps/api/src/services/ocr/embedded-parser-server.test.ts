@@ -0,0 +1,115 @@
+import { promises as fs } from 'node:fs';
+import os from 'node:os';
+import path from 'node:path';
+import { afterAll, afterEach, beforeAll, describe, expect, it } from 'vitest';
+
+import { EmbeddedParserServer } from './embedded-parser-server.js';
+
+// Stand-in for `embedded_parser.py --serve`, run with the current node
+// binary. The request's file_path picks the behaviour:
+//   slow:<x>  answer after 100ms      hang  never answer
+//   exit      die with code 7         cancels  list the ids cancelled so far
+//   anything else is echoed back immediately.
+const FAKE_SERVER = `
+import { createInterface } from 'node:readline';
+const cancelled = [];
+const send = (message) => process.stdout.write(JSON.stringify(message) + '\\n');
+send({ event: 'ready', workers: 1 });
+createInterface({ input: process.stdin }).on('line', (line) => {
+  const request = JSON.parse(line);
+  if (request.cancel) {
+    cancelled.push(request.id);
+    send({ id: request.id, result: { error: 'embedded_report_parse_cancelled' } });
+    return;
+  }
+  const file = request.file_path;
+  if (file === 'hang') return;
+  if (file === 'exit') {
+    process.stderr.write('worker crashed: boom');
+    process.exit(7);
+  }
+  if (file === 'cancels') return send({ id: request.id, result: { cancelled } });
+  if (file.startsWith('slow:')) {
+    setTimeout(() => send({ id: request.id, result: { file } }), 100);
+    return;
+  }
+  send({ id: request.id, result: { file, pid: process.pid } });
+});
+`;
+
+let workdir: string;
+let scriptPath: string;
+const servers: EmbeddedParserServer[] = [];
+
+beforeAll(async () => {
+  workdir = await fs.mkdtemp(path.join(os.tmpdir(), 'parser-server-test-'));
+  scriptPath = path.join(workdir, 'fake-server.mjs');
+  await fs.writeFile(scriptPath, FAKE_SERVER);
+});
+
+afterEach(() => {
+  for (const server of servers.splice(0)) {
+    server.close();
+  }
+});
+
+afterAll(async () => {
+  await fs.rm(workdir, { recursive: true, force: true });
+});
+
+const makeServer = (timeoutMs = 2_000) => {
+  const server = new EmbeddedParserServer({
+    pythonBin: process.execPath,
+    scriptPath,
+    workers: 1,
+    timeoutMs,
+  });
+  servers.push(server);
+  return server;
+};
+
+const request = (filePath: string) => ({
+  filePath,
+  mimeType: 'application/pdf',
+  documentTypeHint: 'blood_routine',
+  reportName: 'report.pdf',
+});
+
+describe('EmbeddedParserServer', () => {
+  it('matches out-of-order responses to their requests by id', async () => {
+    const server = makeServer();
+    const [slow, fast] = await Promise.all([
+      server.parse(request('slow:a')),
+      server.parse(request('b')),
+    ]);
+    expect(slow).toEqual({ file: 'slow:a' });
+    expect(fast).toMatchObject({ file: 'b' });
+  });
+
+  it('rejects a timed-out request with 504 and cancels it in the server', async () => {
+    const server = makeServer(300);
+    await expect(server.parse(request('hang'))).rejects.toMatchObject({ statusCode: 504 });
+    // The late cancel ack is dropped; the server saw the cancel.
+    await expect(server.parse(request('cancels'))).resolves.toEqual({ cancelled: ['1'] });
+  });
+
+  it('rejects in-flight requests with the stderr tail when the child exits', async () => {
+    const server = makeServer();
+    const pending = server.parse(request('hang'));
+    const crashing = server.parse(request('exit'));
+    for (const result of [pending, crashing]) {
+      await expect(result).rejects.toMatchObject({
+        statusCode: 502,
+        message: expect.stringContaining('worker crashed: boom'),
+      });
+    }
+  });
+
+  it('spawns a replacement child for the next request after an exit', async () => {
+    const server = makeServer();
+    const first = (await server.parse(request('a'))) as { pid: number };
+    await expect(server.parse(request('exit'))).rejects.toMatchObject({ statusCode: 502 });
+    const second = (await server.parse(request('b'))) as { pid: number };
+    expect(second.pid).not.toBe(first.pid);
+  });
+});
@@ -0,0 +1,199 @@
+import { spawn, type ChildProcessWithoutNullStreams } from 'node:child_process';
+import { createInterface } from 'node:readline';
+import { AppError } from '../../utils/app-error.js';
+
+/**
+ * Long-lived `embedded_parser.py --serve` child.
+ *
+ * Spawning a fresh interpreter per upload re-imports PIL / pdf2image and
+ * rebuilds PaddleOCR every time, which dominates the parse latency for
+ * small reports. The serve mode keeps a pool of warm parser processes
+ * behind one stdin/stdout pipe speaking line-delimited JSON:
+ *
+ *   -> {"id", "file_path", "mime_type", "document_type_hint", "report_name"}
+ *   -> {"id", "cancel": true}               (after a request times out)
+ *   <- {"event": "ready", "workers": N}     (once, after warm-up)
+ *   <- {"id", "result": <same payload as the one-shot CLI>}
+ *
+ * Responses may arrive out of order; they are matched on `id`. A timed
+ * out request is cancelled so its worker is freed instead of finishing a
+ * report nobody is waiting for. If the child dies every in-flight
+ * request is rejected and the next request spawns a replacement; a
+ * single worker dying is reported by the server as that request's
+ * error payload.
+ */
+
+export interface EmbeddedParserRequest {
+  filePath: string;
+  mimeType: string;
+  documentTypeHint: string;
+  reportName: string;
+}
+
+interface EmbeddedParserServerConfig {
+  pythonBin: string;
+  scriptPath: string;
+  workers: number;
+  timeoutMs: number;
+}
+
+interface PendingRequest {
+  resolve: (payload: unknown) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+  child: ChildProcessWithoutNullStreams;
+}
+
+const STDERR_TAIL_BYTES = 4096;
+
+export class EmbeddedParserServer {
+  private child: ChildProcessWithoutNullStreams | null = null;
+  private ready: Promise<void> | null = null;
+  private readonly pending = new Map<string, PendingRequest>();
+  private nextId = 0;
+  private stderrTail = '';
+
+  constructor(private readonly config: EmbeddedParserServerConfig) {}
+
+  async parse(request: EmbeddedParserRequest): Promise<unknown> {
+    await this.start();
+    const child = this.child;
+    if (!child) {
+      throw new AppError('Embedded report parser server is not running', 502);
+    }
+
+    const id = String(++this.nextId);
+    return new Promise<unknown>((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        this.cancel(child, id);
+        reject(
+          new AppError(
+            `Embedded report parser timed out after ${this.config.timeoutMs}ms`,
+            504,
+          ),
+        );
+      }, this.config.timeoutMs);
+      this.pending.set(id, { resolve, reject, timer, child });
+
+      const line = JSON.stringify({
+        id,
+        file_path: request.filePath,
+        mime_type: request.mimeType,
+        document_type_hint: request.documentTypeHint,
+        report_name: request.reportName,
+      });
+      child.stdin.write(`${line}\n`, (error) => {
+        if (error) {
+          const pipeError = new AppError(
+            `Embedded report parser pipe error: ${error.message}`,
+            502,
+          );
+          this.settle(id, undefined, pipeError);
+        }
+      });
+    });
+  }
+
+  close() {
+    const child = this.child;
+    this.child = null;
+    this.ready = null;
+    if (child) {
+      // EOF lets the server drain its pool and exit on its own.
+      child.stdin.end();
+    }
+  }
+
+  private cancel(child: ChildProcessWithoutNullStreams, id: string) {
+    if (this.child !== child || !child.stdin.writable) {
+      return;
+    }
+    // Best effort: the late result (or cancel ack) is dropped by settle().
+    child.stdin.write(`${JSON.stringify({ id, cancel: true })}\n`, () => undefined);
+  }
+
+  private start(): Promise<void> {
+    if (this.ready) {
+      return this.ready;
+    }
+
+    const child = spawn(
+      this.config.pythonBin,
+      [this.config.scriptPath, '--serve', '--workers', String(this.config.workers)],
+      { cwd: process.cwd(), env: process.env, stdio: ['pipe', 'pipe', 'pipe'] },
+    );
+    this.child = child;
+    this.stderrTail = '';
+
+    const ready = new Promise<void>((resolve, reject) => {
+      const startupTimer = setTimeout(() => {
+        reject(new AppError('Embedded report parser server did not become ready', 502));
+        child.kill();
+      }, this.config.timeoutMs);
+
+      createInterface({ input: child.stdout }).on('line', (line) => {
+        let message: Record<string, unknown>;
+        try {
+          message = JSON.parse(line) as Record<string, unknown>;
+        } catch {
+          return;
+        }
+        if (message.event === 'ready') {
+          clearTimeout(startupTimer);
+          resolve();
+          return;
+        }
+        if (typeof message.id === 'string') {
+          this.settle(message.id, message.result);
+        }
+      });
+
+      child.stderr.on('data', (chunk: Buffer) => {
+        this.stderrTail = (this.stderrTail + chunk.toString('utf8')).slice(-STDERR_TAIL_BYTES);
+      });
+
+      const onExit = (detail: string) => {
+        clearTimeout(startupTimer);
+        if (this.child === child) {
+          this.child = null;
+          this.ready = null;
+        }
+        const stderr = this.stderrTail.trim();
+        const error = new AppError(
+          `Embedded report parser server exited (${detail})${stderr ? `: ${stderr}` : ''}`,
+          502,
+        );
+        reject(error);
+        for (const [id, entry] of [...this.pending.entries()]) {
+          if (entry.child === child) {
+            this.settle(id, undefined, error);
+          }
+        }
+      };
+      child.on('error', (error) => onExit(error.message));
+      child.on('exit', (code, signal) => onExit(signal ?? `code ${code}`));
+    });
+
+    this.ready = ready;
+    // A failed start must not poison later requests.
+    ready.catch(() => {
+      if (this.ready === ready) {
+        this.ready = null;
+      }
+    });
+    return ready;
+  }
+
+  private settle(id: string, payload: unknown, error?: Error) {
+    const entry = this.pending.get(id);
+    if (!entry) return;
+    this.pending.delete(id);
+    clearTimeout(entry.timer);
+    if (error) {
+      entry.reject(error);
+    } else {
+      entry.resolve(payload);
+    }
+  }
+}
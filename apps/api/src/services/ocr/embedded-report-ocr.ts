@@ -7,6 +7,7 @@ import { fileURLToPath } from 'node:url';
 import { promisify } from 'node:util';
 import type { OcrProvider, OcrResult } from './ocr-provider.js';
 import { AppError } from '../../utils/app-error.js';
+import { EmbeddedParserServer } from './embedded-parser-server.js';
 
 const execFileAsync = promisify(execFile);
 
@@ -14,6 +15,9 @@ interface EmbeddedReportOcrConfig {
   pythonBin?: string;
   timeoutMs?: number;
   scriptPath?: string;
+  /** Route uploads through a persistent `embedded_parser.py --serve` pool. */
+  serve?: boolean;
+  serveWorkers?: number;
 }
 
 interface EmbeddedParsePayload {
@@ -352,11 +356,24 @@ export class EmbeddedReportOcrProvider implements OcrProvider {
   private readonly pythonBin: string;
   private readonly timeoutMs: number;
   private readonly scriptPath: string;
+  private readonly server: EmbeddedParserServer | null;
 
   constructor(config: EmbeddedReportOcrConfig = {}) {
     this.pythonBin = config.pythonBin?.trim() || 'python3';
     this.timeoutMs = config.timeoutMs ?? 120_000;
     this.scriptPath = resolveScriptPath(config.scriptPath);
+    this.server = config.serve
+      ? new EmbeddedParserServer({
+          pythonBin: this.pythonBin,
+          scriptPath: this.scriptPath,
+          workers: config.serveWorkers ?? 2,
+          timeoutMs: this.timeoutMs,
+        })
+      : null;
+  }
+
+  close() {
+    this.server?.close();
   }
 
   async parse(input: {
@@ -374,40 +391,17 @@ export class EmbeddedReportOcrProvider implements OcrProvider {
     try {
       await writeFile(tempFile, input.buffer);
 
-      const { stdout, stderr } = await execFileAsync(
-        this.pythonBin,
-        [
-          this.scriptPath,
-          '--file-path',
-          tempFile,
-          '--mime-type',
-          input.mimeType ?? 'application/octet-stream',
-          '--document-type-hint',
-          input.documentType,
-          '--report-name',
-          input.reportName ?? input.fileName ?? `document-${input.documentType}`,
-        ],
-        {
-          cwd: process.cwd(),
-          timeout: this.timeoutMs,
-          maxBuffer: 10 * 1024 * 1024,
-          env: process.env,
-        },
-      );
-
-      const trimmed = stdout.trim();
-      if (!trimmed) {
-        throw new AppError(
-          `Embedded report parser returned empty stdout${stderr ? `: ${stderr}` : ''}`,
-          502,
-        );
-      }
-
-      let payload: EmbeddedParsePayload;
-      try {
-        payload = JSON.parse(trimmed) as EmbeddedParsePayload;
-      } catch (error) {
-        throw new AppError(`Embedded report parser returned invalid JSON: ${String(error)}`, 502);
+      const request = {
+        filePath: tempFile,
+        mimeType: input.mimeType ?? 'application/octet-stream',
+        documentTypeHint: input.documentType,
+        reportName: input.reportName ?? input.fileName ?? `document-${input.documentType}`,
+      };
+      const payload = (
+        this.server ? await this.server.parse(request) : await this.runOnce(request)
+      ) as EmbeddedParsePayload | null;
+      if (!payload || typeof payload !== 'object') {
+        throw new AppError('Embedded report parser returned an empty response', 502);
       }
 
       if (payload.error) {
@@ -441,4 +435,46 @@ export class EmbeddedReportOcrProvider implements OcrProvider {
       await rm(tempDir, { recursive: true, force: true }).catch(() => undefined);
     }
   }
+
+  private async runOnce(request: {
+    filePath: string;
+    mimeType: string;
+    documentTypeHint: string;
+    reportName: string;
+  }): Promise<EmbeddedParsePayload> {
+    const { stdout, stderr } = await execFileAsync(
+      this.pythonBin,
+      [
+        this.scriptPath,
+        '--file-path',
+        request.filePath,
+        '--mime-type',
+        request.mimeType,
+        '--document-type-hint',
+        request.documentTypeHint,
+        '--report-name',
+        request.reportName,
+      ],
+      {
+        cwd: process.cwd(),
+        timeout: this.timeoutMs,
+        maxBuffer: 10 * 1024 * 1024,
+        env: process.env,
+      },
+    );
+
+    const trimmed = stdout.trim();
+    if (!trimmed) {
+      throw new AppError(
+        `Embedded report parser returned empty stdout${stderr ? `: ${stderr}` : ''}`,
+        502,
+      );
+    }
+
+    try {
+      return JSON.parse(trimmed) as EmbeddedParsePayload;
+    } catch (error) {
+      throw new AppError(`Embedded report parser returned invalid JSON: ${String(error)}`, 502);
+    }
+  }
 }
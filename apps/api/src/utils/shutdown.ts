@@ -0,0 +1,17 @@
+/**
+ * Process-wide shutdown hooks. Long-lived resources created while the
+ * routers are built (e.g. the `embedded_parser.py --serve` child) register
+ * a close callback here; `index.ts` runs them on SIGTERM / SIGINT.
+ */
+type ShutdownHook = () => void | Promise<void>;
+
+const hooks: ShutdownHook[] = [];
+
+export const onShutdown = (hook: ShutdownHook) => {
+  hooks.push(hook);
+};
+
+export const runShutdownHooks = async () => {
+  const pending = hooks.splice(0);
+  await Promise.allSettled(pending.map(async (hook) => hook()));
+};
@@ -0,0 +1,208 @@
+"""Batch re-analysis of stored report texts.
+
+Backfilling structured fields after an extractor change (a new
+`_extract_*`, a new analyte alias) means running `analyze_fshd_report`
+over every stored OCR text again. `analyze_batch` does that across a
+process pool: records are shipped to workers in chunks, at most a few
+chunks are in flight at once so a large JSONL input is never read into
+memory whole, and results come back in input order.
+
+Each input record is a JSON object:
+
+    {"id": "...", "text": "...", "document_type_hint": "...",
+     "report_name": "...", "page_texts": ["...", ...], "multi_section": false}
+
+Only `text` is needed (`ocr_text` / `extracted_text` are accepted as
+aliases, matching what the API and `embedded_parser.py` store); `id`
+defaults to the record's position in the input. Each output record is
+
+    {"id": ..., "report_name": ..., "report_type": ..., "elapsed_ms": ...,
+     "analysis": {...}}
+
+or `{"id": ..., "error": "report_analysis_failed", "detail": ...}`.
+
+The CLI wrapper is `batch_analyze.py` next to `embedded_parser.py`.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from collections import deque
+
+from app.services.fshd_report_service import analyze_fshd_report
+
+_TEXT_KEYS = ("text", "ocr_text", "extracted_text")
+_DEFAULT_CHUNK_SIZE = 32
+
+
+def default_workers():
+    return max(1, int(os.getenv("REPORT_BATCH_WORKERS", "") or (os.cpu_count() or 1)))
+
+
+class BatchStats:
+    """Per-report-type counts and analysis time for one batch run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.reports = 0
+        self.errors = 0
+        self.by_type = {}
+
+    def record(self, result):
+        self.reports += 1
+        if "error" in result:
+            self.errors += 1
+            return
+        bucket = self.by_type.setdefault(
+            result["report_type"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        bucket["count"] += 1
+        bucket["total_ms"] += result["elapsed_ms"]
+        bucket["max_ms"] = max(bucket["max_ms"], result["elapsed_ms"])
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def as_dict(self):
+        wall = (self.finished or time.perf_counter()) - self.started
+        return {
+            "reports": self.reports,
+            "errors": self.errors,
+            "wall_seconds": round(wall, 3),
+            "reports_per_second": round(self.reports / wall, 1) if wall > 0 else 0.0,
+            "by_report_type": {
+                report_type: {
+                    "count": bucket["count"],
+                    "total_ms": round(bucket["total_ms"], 3),
+                    "mean_ms": round(bucket["total_ms"] / bucket["count"], 3),
+                    "max_ms": round(bucket["max_ms"], 3),
+                }
+                for report_type, bucket in sorted(
+                    self.by_type.items(), key=lambda item: -item[1]["total_ms"]
+                )
+            },
+        }
+
+
+def analyze_record(record, multi_section=False):
+    """Analyse one input record. Never raises: bad records and analyser
+    failures come back as an `error` result so one broken text cannot
+    stop a backfill. `multi_section` applies unless the record sets it."""
+    record_id = record.get("id") if isinstance(record, dict) else None
+    try:
+        if not isinstance(record, dict):
+            raise ValueError("record must be a JSON object")
+        if "invalid_json" in record:
+            raise ValueError(f"invalid JSON: {record['invalid_json']}")
+        text = next((record[key] for key in _TEXT_KEYS if record.get(key) is not None), None)
+        if not isinstance(text, str):
+            raise ValueError("record needs a string `text`")
+        page_texts = record.get("page_texts")
+        report_name = record.get("report_name") or None
+        record_multi_section = record.get("multi_section", multi_section)
+        if not isinstance(record_multi_section, bool):
+            raise ValueError("`multi_section` must be a JSON boolean")
+
+        started = time.perf_counter()
+        analysis = analyze_fshd_report(
+            text,
+            record.get("document_type_hint") or None,
+            report_name,
+            page_texts=page_texts if isinstance(page_texts, list) else None,
+            multi_section=record_multi_section,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    except Exception as exc:
+        return {
+            "id": record_id,
+            "error": "report_analysis_failed",
+            "detail": str(exc),
+            "traceback": traceback.format_exc(limit=6),
+        }
+
+    report_types = analysis.get("document_classification", {}).get("report_types") or ["other"]
+    return {
+        "id": record_id,
+        "report_name": report_name,
+        "report_type": report_types[0],
+        "elapsed_ms": round(elapsed_ms, 3),
+        "analysis": analysis,
+    }
+
+
+def _analyze_chunk(records, multi_section=False):
+    return [analyze_record(record, multi_section) for record in records]
+
+
+def _chunks(records, size):
+    chunk = []
+    for index, record in enumerate(records):
+        if isinstance(record, dict) and record.get("id") is None:
+            record = {**record, "id": index}
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_batch(
+    records, workers=None, chunk_size=_DEFAULT_CHUNK_SIZE, stats=None, multi_section=False
+):
+    """Yield one result per record of `records` (any iterable), in input
+    order. `workers <= 0` analyses inline in this process; pass a
+    `BatchStats` to collect per-report-type timing."""
+    workers = default_workers() if workers is None else workers
+    chunk_size = max(1, int(chunk_size))
+
+    def _emit(results):
+        for result in results:
+            if stats is not None:
+                stats.record(result)
+            yield result
+
+    if workers <= 0:
+        for chunk in _chunks(records, chunk_size):
+            yield from _emit(_analyze_chunk(chunk, multi_section))
+        if stats is not None:
+            stats.finish()
+        return
+
+    # Bounded window of chunks in flight: enough to keep every worker
+    # busy while the oldest one is being written out, without the pool's
+    # feeder thread draining the whole input up front the way imap does.
+    max_in_flight = 2 * workers
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        in_flight = deque()
+        for chunk in _chunks(records, chunk_size):
+            in_flight.append(pool.apply_async(_analyze_chunk, (chunk, multi_section)))
+            if len(in_flight) >= max_in_flight:
+                yield from _emit(in_flight.popleft().get())
+        while in_flight:
+            yield from _emit(in_flight.popleft().get())
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    if stats is not None:
+        stats.finish()
+
+
+def read_jsonl(stream):
+    """Records from a JSONL stream. A line that is not valid JSON
+    becomes a marker record, so it is reported as an error at its
+    position in the output instead of aborting the run."""
+    for number, raw in enumerate(stream, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            yield json.loads(raw)
+        except ValueError as exc:
+            yield {"id": f"line:{number}", "invalid_json": str(exc)}
+
@@ -1,5 +1,7 @@
 import re
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Pattern, Sequence, Tuple, Union
 
 
 REPORT_TYPE_LABELS: Dict[str, str] = {
@@ -448,6 +450,234 @@ STRUCTURED_KEY_ALIASES = {
 }
 
 
+LAB_ANALYTES: Dict[str, List[str]] = {
+    "ck": ["肌酸激酶", "ck"],
+    "mb": ["肌红蛋白", " myo ", " mb "],
+    "ldh": ["乳酸脱氢酶", "ldh"],
+    "ckmb": ["ckmb", "ck-mb"],
+    "creatinine": ["肌酐", "creatinine", "cr"],
+    "uric_acid": ["尿酸", "uric acid", "ua"],
+    "alt": ["alt", "谷丙转氨酶"],
+    "ast": ["ast", "谷草转氨酶"],
+    "tbil": ["总胆红素", "tbil"],
+    "dbil": ["直接胆红素", "dbil"],
+    "ibil": ["间接胆红素", "ibil"],
+    "tp": ["总蛋白", "tp"],
+    "alb": ["白蛋白", "alb"],
+    "globulin": ["球蛋白", "globulin", "glo"],
+    "a_g_ratio": ["白球比例", "a/g"],
+    "alp": ["碱性磷酸酶", "alp"],
+    "ggt": ["谷氨酰转肽酶", "谷氨酰基转移酶", "ggt"],
+    "urea": ["尿素", "urea", "bun"],
+    "glucose": ["葡萄糖", "血糖", "glu"],
+    "cholesterol": ["总胆固醇", "tcho", "cholesterol"],
+    "triglyceride": ["甘油三酯", "tg"],
+    "hdl_c": ["高密度脂蛋白", "hdl-c", "hdl"],
+    "ldl_c": ["低密度脂蛋白", "ldl-c", "ldl"],
+    "vldl_c": ["极低密度脂蛋白", "vldl-c", "vldl"],
+    "apo_a1": ["载脂蛋白a1", "apoa1", "apo-a1"],
+    "apo_b": ["载脂蛋白b", "apob", "apo-b"],
+    "lp_a": ["脂蛋白a", "lp(a)", "lpa"],
+    "phosphorus": ["无机磷", "磷", "p"],
+    "magnesium": ["镁", "mg"],
+    "co2cp": ["碳酸氢根", "co2cp"],
+    "potassium": ["钾", "k"],
+    "sodium": ["钠", "na"],
+    "chloride": ["氯", "cl"],
+    "calcium": ["钙", "ca"],
+    "il6": ["白介素6", "il-6", "il6"],
+}
+
+
+# ---------------------------------------------------------------------------
+# Precompiled pattern registry
+#
+# Extractors pass literal pattern strings; `_compiled` turns each
+# (pattern, flags) pair into a `re.Pattern` exactly once per process,
+# so the hot loops below call `Pattern.search` directly instead of
+# paying `re.search`'s cache lookup and flag coercion per line. The
+# fixed helper patterns are compiled at import.
+
+PatternLike = Union[str, Pattern[str]]
+
+_PATTERN_REGISTRY: Dict[Tuple[str, int], Pattern[str]] = {}
+
+# Literals at least one of which must occur in any match of the pattern
+# (its mandatory keyword). Lets `_SearchWindows` skip windows outright.
+_PATTERN_GATES: Dict[Pattern[str], Tuple[str, ...]] = {}
+
+
+def _compiled(pattern: PatternLike, flags: int = re.IGNORECASE) -> Pattern[str]:
+    if not isinstance(pattern, str):
+        return pattern
+    key = (pattern, int(flags))
+    compiled = _PATTERN_REGISTRY.get(key)
+    if compiled is None:
+        compiled = _PATTERN_REGISTRY[key] = re.compile(pattern, flags)
+    return compiled
+
+
+def _gated(pattern: str, *gates: str) -> Pattern[str]:
+    compiled = _compiled(pattern)
+    _PATTERN_GATES[compiled] = gates
+    return compiled
+
+
+_RE_HSPACE = re.compile(r"[ \t]+")
+_RE_BLANK_LINES = re.compile(r"\n{2,}")
+_RE_SENTENCE_SPLIT = re.compile(r"[\n.;。；]+")
+_RE_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_RE_DATE = re.compile(r"(20\d{2})[-/.年](\d{1,2})[-/.月](\d{1,2})")
+_RE_FACILITY = re.compile(r"([\u4e00-\u9fa5A-Za-z0-9()（）]+(?:医院|中心|研究所))")
+_RE_HEADER_SPLIT = re.compile(r"[:：]")
+_RE_WHITESPACE = re.compile(r"\s+")
+
+# A combined printout repeats a report title ("...检验报告单") per report
+# and names each panel on a purpose line ("检验目的: 血常规").
+_RE_SECTION_TITLE = re.compile(r"^[^:]{0,40}报告单?$")
+_RE_SECTION_PURPOSE = re.compile(r"^(?:检验目的|检验项目|检查项目|检查部位|送检项目)\s*:")
+
+_RE_LAB_VALUE = re.compile(r"([<>]?\d+(?:\.\d+)?)\s*([A-Za-z/%μµ·/\-]+)?")
+_RE_LAB_PAREN_PREFIX = re.compile(r"^\s*\([^)]+\)\s*")
+_RE_LAB_REFERENCE_RANGE = re.compile(
+    r"[<>]?\d+(?:\.\d+)?\s*[-~]\s*[<>]?\d+(?:\.\d+)?(?:\s*[A-Za-z/%μµ·/\-]+)?"
+)
+_RE_LAB_UNIT_ONLY = re.compile(r"[A-Za-z/%μµ·/\-]+")
+_RE_LAB_ARROWS = re.compile(r"[↑↓→]+")
+
+_DATE_TIME = r"(20\d{2}[-/.年]\d{1,2}[-/.月]\d{1,2}(?:[ T]\d{1,2}:\d{2})?)"
+_RE_PATIENT_NAME_LINE = _gated(r"(?:姓名|名)[: ]*([\u4e00-\u9fa5A-Za-z·]{2,24})$", "名")
+_RE_PATIENT_NAME = _compiled(r"(?:姓名|名)[: ]*([\u4e00-\u9fa5A-Za-z·]{2,24})")
+_RE_PATIENT_SEX_LINE = _gated(r"(?:性别|别)[: ]*(男|女|male|female)$", "别")
+_RE_PATIENT_SEX = _compiled(r"(?:性别|别)[: ]*(男|女|male|female)")
+_RE_PATIENT_AGE_LINE = _gated(r"(?:年龄|龄)[: ]*(\d{1,3})岁?$", "龄")
+_RE_PATIENT_AGE = _compiled(r"(?:年龄|龄)[: ]*(\d{1,3})")
+_RE_NATIONAL_ID = _compiled(r"(\d{17}[\dXx])")
+_RE_VISIT_ID_LINE = _gated(r"(?:病历号|门诊号|住院号|就诊号|检查号)[: ]*([A-Za-z0-9-]+)$", "号")
+_RE_VISIT_ID = _compiled(r"(?:病历号|门诊号|住院号|就诊号|检查号)[: ]*([A-Za-z0-9-]+)")
+_RE_BARCODE_LINE = _gated(r"(?:样品编号|样本编号|条码号|条形码号|资料编号)[: ]*([A-Za-z0-9-]+)$", "编号", "码号")
+_RE_BARCODE = _compiled(r"(?:样品编号|样本编号|条码号|条形码号|资料编号)[: ]*([A-Za-z0-9-]+)")
+_RE_DEPARTMENT_LINE = _gated(r"(?:科室|送检科室|申请科室|科别)[: ]*([^\d:：]{2,20})$", "科")
+_RE_DEPARTMENT = _compiled(r"(?:科室|送检科室|申请科室|科别)[: ]*([^\n]+)")
+_RE_DIAGNOSIS_LINE = _gated(r"(?:临床诊断|诊断)[: ]*([^\n]+)$", "诊断")
+_RE_DIAGNOSIS = _compiled(r"(?:临床诊断|诊断)[: ]*([^\n]+)")
+_RE_SPECIMEN_LINE = _gated(r"(?:标本|样本|检材|本)[: ]*([^\s:：]{1,12})$", "本", "检材")
+_RE_BED_LINE = _gated(r"(?:床号|床位)[: ]*([A-Za-z0-9-]+)$", "床")
+_RE_DOCTOR_LINE = _gated(r"(?:送检医生|申请医生|开单医生)[: ]*([^\s/]{2,20})(?:/[A-Za-z0-9-]+)?$", "医生")
+_RE_REPORT_TIMES = (
+    _compiled(r"(?:报告日期|报告时间|报告打印时间)[: ]*" + _DATE_TIME),
+    _compiled(r"(?:检查日期|检查时间)[: ]*" + _DATE_TIME),
+)
+_RE_COLLECT_TIME = _compiled(r"(?:采样时间|采集时间|送检日期)[: ]*" + _DATE_TIME)
+_RE_REQUEST_TIME = _compiled(r"(?:申请时间|开单时间)[: ]*" + _DATE_TIME)
+_RE_RECEIVE_TIME = _compiled(r"(?:接收时间|签收时间)[: ]*" + _DATE_TIME)
+
+
+class _SearchWindows:
+    """The line windows of one report (`_build_line_windows`), built once
+    and shared by the patient / encounter extractors.
+
+    `first_match` returns the same match as `_find_line_regex` over the
+    windows, but for gated patterns it locates candidate windows with a
+    `str.find` over the joined text and only runs the regex there.
+    """
+
+    def __init__(self, lines: List[str]) -> None:
+        self.windows = _build_line_windows(lines)
+        self.joined = "\n".join(self.windows)
+        self.offsets: List[int] = []
+        offset = 0
+        for window in self.windows:
+            self.offsets.append(offset)
+            offset += len(window) + 1
+
+    def _candidates(self, gates: Tuple[str, ...]) -> List[int]:
+        indexes = set()
+        for gate in gates:
+            position = self.joined.find(gate)
+            while position >= 0:
+                indexes.add(bisect_right(self.offsets, position) - 1)
+                position = self.joined.find(gate, position + 1)
+        return sorted(indexes)
+
+    def first_match(self, pattern: Pattern[str]) -> Optional[re.Match]:
+        gates = _PATTERN_GATES.get(pattern)
+        indexes = self._candidates(gates) if gates else range(len(self.windows))
+        for index in indexes:
+            match = pattern.search(self.windows[index])
+            if match:
+                return match
+        return None
+
+
+class _KeywordAutomaton:
+    """Aho–Corasick matcher: which of a fixed set of keywords occur in a
+    text, found in one left-to-right pass.
+
+    The result equals checking `keyword in text` for every keyword, but
+    the scan costs one step per character of text however many keywords
+    there are, so growing a rule table does not slow matching down.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[str]] = [frozenset()]
+        pending: List[set] = [set()]
+        for keyword in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    pending.append(set())
+                state = nxt
+            pending[state].add(keyword)
+
+        # Breadth-first so every failure target is finalised before the
+        # states that fall back to it.
+        queue = deque(self._goto[0].values())
+        outputs: List[FrozenSet[str]] = [frozenset()] * len(self._goto)
+        outputs[0] = frozenset(pending[0])
+        while queue:
+            state = queue.popleft()
+            outputs[state] = frozenset(pending[state] | outputs[self._fail[state]])
+            for char, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                queue.append(nxt)
+        self._out = outputs
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        found: set = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0) if state else root.get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return frozenset(found)
+
+
+def _lab_tokens(keywords: Iterable[str]) -> List[str]:
+    return [keyword.lower().strip() for keyword in keywords if keyword and keyword.strip()]
+
+
+_LAB_TOKENS: Dict[str, List[str]] = {name: _lab_tokens(keywords) for name, keywords in LAB_ANALYTES.items()}
+_LAB_SCANNER = _KeywordAutomaton(token for tokens in _LAB_TOKENS.values() for token in tokens)
+
+
 def _normalize_text(text: str) -> str:
     normalized = text or ""
     replacements = {
@@ -469,8 +699,8 @@ def _normalize_text(text: str) -> str:
     for before, after in replacements.items():
         normalized = normalized.replace(before, after)
     normalized = normalized.replace("\r", "\n")
-    normalized = re.sub(r"[ \t]+", " ", normalized)
-    normalized = re.sub(r"\n{2,}", "\n", normalized)
+    normalized = _RE_HSPACE.sub(" ", normalized)
+    normalized = _RE_BLANK_LINES.sub("\n", normalized)
     return normalized.strip()
 
 
@@ -496,7 +726,7 @@ def _build_line_windows(lines: List[str], max_window: int = 2) -> List[str]:
 
 
 def _extract_sentences(text: str) -> List[str]:
-    chunks = re.split(r"[\n.;。；]+", _normalize_text(text))
+    chunks = _RE_SENTENCE_SPLIT.split(_normalize_text(text))
     return [chunk.strip() for chunk in chunks if chunk.strip()]
 
 
@@ -506,7 +736,7 @@ def _safe_float(value: Any) -> Optional[float]:
     text = str(value).strip().replace(",", "")
     if not text:
         return None
-    match = re.search(r"-?\d+(?:\.\d+)?", text)
+    match = _RE_NUMBER.search(text)
     if not match:
         return None
     try:
@@ -516,7 +746,7 @@ def _safe_float(value: Any) -> Optional[float]:
 
 
 def _extract_date(text: str) -> Optional[str]:
-    match = re.search(r"(20\d{2})[-/.年](\d{1,2})[-/.月](\d{1,2})", text)
+    match = _RE_DATE.search(text)
     if not match:
         return None
     year, month, day = match.groups()
@@ -532,25 +762,30 @@ def _find_best_line(lines: Iterable[str], keywords: Iterable[str]) -> Optional[s
     return None
 
 
-def _find_regex(text: str, patterns: Iterable[str], flags: int = re.IGNORECASE) -> Tuple[Optional[re.Match], Optional[str]]:
+def _find_regex(
+    text: str, patterns: Iterable[PatternLike], flags: int = re.IGNORECASE
+) -> Tuple[Optional[re.Match], Optional[PatternLike]]:
     for pattern in patterns:
-        match = re.search(pattern, text, flags)
+        match = _compiled(pattern, flags).search(text)
         if match:
             return match, pattern
     return None, None
 
 
 def _find_line_regex(
-    lines: Iterable[str], patterns: Iterable[str], flags: int = re.IGNORECASE
-) -> Tuple[Optional[re.Match], Optional[str]]:
+    lines: Iterable[str], patterns: Iterable[PatternLike], flags: int = re.IGNORECASE
+) -> Tuple[Optional[re.Match], Optional[PatternLike]]:
+    originals = list(patterns)
+    compiled = [_compiled(pattern, flags) for pattern in originals]
     for line in lines:
-        match, pattern = _find_regex(line, patterns, flags)
-        if match:
-            return match, pattern
+        for original, pattern in zip(originals, compiled):
+            match = pattern.search(line)
+            if match:
+                return match, original
     return None, None
 
 
-def _extract_named_number(text: str, patterns: Iterable[str], unit: Optional[str] = None) -> Tuple[Optional[str], Optional[float], Optional[str]]:
+def _extract_named_number(text: str, patterns: Iterable[PatternLike], unit: Optional[str] = None) -> Tuple[Optional[str], Optional[float], Optional[str]]:
     match, _ = _find_regex(text, patterns)
     if not match:
         return None, None, None
@@ -563,7 +798,7 @@ def _extract_named_number(text: str, patterns: Iterable[str], unit: Optional[str
     return raw_value, _safe_float(raw_value), detected_unit
 
 
-def _extract_named_text(text: str, patterns: Iterable[str]) -> Optional[str]:
+def _extract_named_text(text: str, patterns: Iterable[PatternLike]) -> Optional[str]:
     match, _ = _find_regex(text, patterns)
     if not match:
         return None
@@ -737,14 +972,42 @@ def _canonical_side(text: str) -> str:
     return "unspecified"
 
 
+_MUSCLE_TOKENS: List[Tuple[str, str, Tuple[str, ...]]] = [
+    (canonical_name, meta["region"], tuple(keyword.lower() for keyword in meta["keywords"]))
+    for canonical_name, meta in MUSCLE_KEYWORDS.items()
+]
+_MUSCLE_SCANNER = _KeywordAutomaton(token for _, _, tokens in _MUSCLE_TOKENS for token in tokens)
+
+
 def _muscle_from_sentence(sentence: str) -> Optional[Tuple[str, str]]:
-    lowered = sentence.lower()
-    for canonical_name, meta in MUSCLE_KEYWORDS.items():
-        if any(keyword.lower() in lowered for keyword in meta["keywords"]):
-            return canonical_name, meta["region"]
+    present = _MUSCLE_SCANNER.scan(sentence.lower())
+    if not present:
+        return None
+    for canonical_name, region, tokens in _MUSCLE_TOKENS:
+        if any(token in present for token in tokens):
+            return canonical_name, region
     return None
 
 
+class _ReportRuleIndex:
+    """`REPORT_TYPE_RULES` compiled for `_classify_report`: one keyword
+    automaton over every rule keyword, and for each (lower-cased) keyword
+    the rules it scores as `(report_type, position, keyword, weight)`."""
+
+    def __init__(self, rules: Dict[str, List[Tuple[str, int]]]) -> None:
+        self.order: Dict[str, int] = {report_type: index for index, report_type in enumerate(rules)}
+        self.by_keyword: Dict[str, List[Tuple[str, int, str, int]]] = {}
+        for report_type, type_rules in rules.items():
+            for position, (keyword, weight) in enumerate(type_rules):
+                self.by_keyword.setdefault(keyword.lower(), []).append((report_type, position, keyword, weight))
+        self.automaton = _KeywordAutomaton(self.by_keyword)
+        # `"" in text` is always true; keep that quirk of the old check.
+        self.always_present: FrozenSet[str] = frozenset([""]) if "" in self.by_keyword else frozenset()
+
+
+_REPORT_RULES = _ReportRuleIndex(REPORT_TYPE_RULES)
+
+
 def _classify_report(
     text: str,
     document_type_hint: Optional[str] = None,
@@ -765,13 +1028,20 @@ def _classify_report(
     }
     normalized_hint = hint_mapping.get((document_type_hint or "").strip().lower(), "")
 
-    for report_type, rules in REPORT_TYPE_RULES.items():
-        score = 0
-        matched: List[str] = []
-        for keyword, weight in rules:
-            if keyword.lower() in normalized:
-                score += weight
-                matched.append(keyword)
+    # One automaton pass finds every rule keyword present; only the
+    # report types that actually matched are scored, in table order so
+    # ties still resolve to the earlier type.
+    hits: Dict[str, List[Tuple[int, str, int]]] = {}
+    for keyword in _REPORT_RULES.automaton.scan(normalized) | _REPORT_RULES.always_present:
+        for report_type, position, original, weight in _REPORT_RULES.by_keyword[keyword]:
+            hits.setdefault(report_type, []).append((position, original, weight))
+    if normalized_hint in _REPORT_RULES.order:
+        hits.setdefault(normalized_hint, [])
+
+    for report_type in sorted(hits, key=_REPORT_RULES.order.__getitem__):
+        entries = sorted(hits[report_type])
+        score = sum(weight for _, _, weight in entries)
+        matched = [original for _, original, _ in entries]
         if normalized_hint and report_type == normalized_hint:
             score += 2
             matched.append(f"hint:{document_type_hint}")
@@ -797,9 +1067,10 @@ def _classify_report(
     return best_type, round(confidence, 2), reasons.get(best_type, [])
 
 
-def _extract_patient_info(lines: List[str]) -> Dict[str, Any]:
+def _extract_patient_info(lines: List[str], windows: Optional[_SearchWindows] = None) -> Dict[str, Any]:
     text = "\n".join(lines)
-    search_lines = _build_line_windows(lines)
+    if windows is None:
+        windows = _SearchWindows(lines)
     patient_name = None
     sex = None
     age = None
@@ -807,47 +1078,38 @@ def _extract_patient_info(lines: List[str]) -> Dict[str, Any]:
     visit_id = None
     barcode = None
 
-    name_match, _ = _find_line_regex(
-        search_lines,
-        [r"(?:姓名|名)[: ]*([\u4e00-\u9fa5A-Za-z·]{2,24})$"],
-    )
+    name_match = windows.first_match(_RE_PATIENT_NAME_LINE)
     if not name_match:
-        name_match, _ = _find_regex(text, [r"(?:姓名|名)[: ]*([\u4e00-\u9fa5A-Za-z·]{2,24})"])
+        name_match, _ = _find_regex(text, [_RE_PATIENT_NAME])
     if name_match:
         patient_name = name_match.group(1).strip()
 
-    sex_match, _ = _find_line_regex(search_lines, [r"(?:性别|别)[: ]*(男|女|male|female)$"])
+    sex_match = windows.first_match(_RE_PATIENT_SEX_LINE)
     if not sex_match:
-        sex_match, _ = _find_regex(text, [r"(?:性别|别)[: ]*(男|女|male|female)"])
+        sex_match, _ = _find_regex(text, [_RE_PATIENT_SEX])
     if sex_match:
         raw_sex = sex_match.group(1).strip().lower()
         sex = "male" if raw_sex in {"男", "male"} else "female" if raw_sex in {"女", "female"} else raw_sex
 
-    age_match, _ = _find_line_regex(search_lines, [r"(?:年龄|龄)[: ]*(\d{1,3})岁?$"])
+    age_match = windows.first_match(_RE_PATIENT_AGE_LINE)
     if not age_match:
-        age_match, _ = _find_regex(text, [r"(?:年龄|龄)[: ]*(\d{1,3})"])
+        age_match, _ = _find_regex(text, [_RE_PATIENT_AGE])
     if age_match:
         age = int(age_match.group(1))
 
-    patient_id_match, _ = _find_regex(text, [r"(\d{17}[\dXx])"])
+    patient_id_match, _ = _find_regex(text, [_RE_NATIONAL_ID])
     if patient_id_match:
         patient_id = patient_id_match.group(1)
 
-    visit_match, _ = _find_line_regex(
-        search_lines,
-        [r"(?:病历号|门诊号|住院号|就诊号|检查号)[: ]*([A-Za-z0-9-]+)$"],
-    )
+    visit_match = windows.first_match(_RE_VISIT_ID_LINE)
     if not visit_match:
-        visit_match, _ = _find_regex(text, [r"(?:病历号|门诊号|住院号|就诊号|检查号)[: ]*([A-Za-z0-9-]+)"])
+        visit_match, _ = _find_regex(text, [_RE_VISIT_ID])
     if visit_match:
         visit_id = visit_match.group(1)
 
-    barcode_match, _ = _find_line_regex(
-        search_lines,
-        [r"(?:样品编号|样本编号|条码号|条形码号|资料编号)[: ]*([A-Za-z0-9-]+)$"],
-    )
+    barcode_match = windows.first_match(_RE_BARCODE_LINE)
     if not barcode_match:
-        barcode_match, _ = _find_regex(text, [r"(?:样品编号|样本编号|条码号|条形码号|资料编号)[: ]*([A-Za-z0-9-]+)"])
+        barcode_match, _ = _find_regex(text, [_RE_BARCODE])
     if barcode_match:
         barcode = barcode_match.group(1)
 
@@ -863,9 +1125,10 @@ def _extract_patient_info(lines: List[str]) -> Dict[str, Any]:
     }
 
 
-def _extract_encounter_info(lines: List[str]) -> Dict[str, Any]:
+def _extract_encounter_info(lines: List[str], windows: Optional[_SearchWindows] = None) -> Dict[str, Any]:
     text = "\n".join(lines)
-    search_lines = _build_line_windows(lines)
+    if windows is None:
+        windows = _SearchWindows(lines)
     facility = None
     department = None
     clinical_diagnosis = None
@@ -878,7 +1141,7 @@ def _extract_encounter_info(lines: List[str]) -> Dict[str, Any]:
     ordering_doctor = None
 
     for line in lines[:8]:
-        facility_match = re.search(r"([\u4e00-\u9fa5A-Za-z0-9()（）]+(?:医院|中心|研究所))", line)
+        facility_match = _RE_FACILITY.search(line)
         if facility_match:
             facility = facility_match.group(1).strip()
             break
@@ -886,59 +1149,43 @@ def _extract_encounter_info(lines: List[str]) -> Dict[str, Any]:
             facility = line.strip()
             break
 
-    department_match, _ = _find_line_regex(
-        search_lines,
-        [r"(?:科室|送检科室|申请科室|科别)[: ]*([^\d:：]{2,20})$"],
-    )
+    department_match = windows.first_match(_RE_DEPARTMENT_LINE)
     if not department_match:
-        department_match, _ = _find_regex(text, [r"(?:科室|送检科室|申请科室|科别)[: ]*([^\n]+)"])
+        department_match, _ = _find_regex(text, [_RE_DEPARTMENT])
     if department_match:
         department = department_match.group(1).strip()
 
-    diagnosis_match, _ = _find_line_regex(search_lines, [r"(?:临床诊断|诊断)[: ]*([^\n]+)$"])
+    diagnosis_match = windows.first_match(_RE_DIAGNOSIS_LINE)
     if not diagnosis_match:
-        diagnosis_match, _ = _find_regex(text, [r"(?:临床诊断|诊断)[: ]*([^\n]+)"])
+        diagnosis_match, _ = _find_regex(text, [_RE_DIAGNOSIS])
     if diagnosis_match:
         clinical_diagnosis = diagnosis_match.group(1).strip()
 
-    specimen_match, _ = _find_line_regex(
-        search_lines,
-        [r"(?:标本|样本|检材|本)[: ]*([^\s:：]{1,12})$"],
-    )
+    specimen_match = windows.first_match(_RE_SPECIMEN_LINE)
     if specimen_match:
         specimen = specimen_match.group(1).strip()
 
-    bed_match, _ = _find_line_regex(search_lines, [r"(?:床号|床位)[: ]*([A-Za-z0-9-]+)$"])
+    bed_match = windows.first_match(_RE_BED_LINE)
     if bed_match:
         bed_no = bed_match.group(1).strip()
 
-    doctor_match, _ = _find_line_regex(
-        search_lines,
-        [r"(?:送检医生|申请医生|开单医生)[: ]*([^\s/]{2,20})(?:/[A-Za-z0-9-]+)?$"],
-    )
+    doctor_match = windows.first_match(_RE_DOCTOR_LINE)
     if doctor_match:
         ordering_doctor = doctor_match.group(1).strip()
 
-    time_patterns = [
-        r"(?:报告日期|报告时间|报告打印时间)[: ]*(20\d{2}[-/.年]\d{1,2}[-/.月]\d{1,2}(?:[ T]\d{1,2}:\d{2})?)",
-        r"(?:检查日期|检查时间)[: ]*(20\d{2}[-/.年]\d{1,2}[-/.月]\d{1,2}(?:[ T]\d{1,2}:\d{2})?)",
-    ]
-    report_match, _ = _find_regex(text, time_patterns)
+    report_match, _ = _find_regex(text, _RE_REPORT_TIMES)
     if report_match:
         report_time = report_match.group(1)
 
-    collect_match, _ = _find_regex(text, [r"(?:采样时间|采集时间|送检日期)[: ]*(20\d{2}[-/.年]\d{1,2}[-/.月]\d{1,2}(?:[ T]\d{1,2}:\d{2})?)"])
+    collect_match, _ = _find_regex(text, [_RE_COLLECT_TIME])
     if collect_match:
         collect_time = collect_match.group(1)
 
-    request_match, _ = _find_regex(text, [r"(?:申请时间|开单时间)[: ]*(20\d{2}[-/.年]\d{1,2}[-/.月]\d{1,2}(?:[ T]\d{1,2}:\d{2})?)"])
+    request_match, _ = _find_regex(text, [_RE_REQUEST_TIME])
     if request_match:
         request_time = request_match.group(1)
 
-    receive_match, _ = _find_regex(
-        text,
-        [r"(?:接收时间|签收时间)[: ]*(20\d{2}[-/.年]\d{1,2}[-/.月]\d{1,2}(?:[ T]\d{1,2}:\d{2})?)"],
-    )
+    receive_match, _ = _find_regex(text, [_RE_RECEIVE_TIME])
     if receive_match:
         receive_time = receive_match.group(1)
 
@@ -973,7 +1220,7 @@ def _extract_block_after_header(
             continue
         if not capture and any(keyword in stripped for keyword in start_keywords):
             capture = True
-            inline = re.split(r"[:：]", stripped, maxsplit=1)
+            inline = _RE_HEADER_SPLIT.split(stripped, maxsplit=1)
             if len(inline) == 2 and inline[1].strip():
                 parts.append(inline[1].strip())
             continue
@@ -1942,44 +2189,47 @@ def _extract_abdominal_ultrasound(lines: List[str], fields: List[Dict[str, Any]]
     }
 
 
-def _extract_lab_value(lines: List[str], keywords: Iterable[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-    keyword_tokens = [keyword.lower().strip() for keyword in keywords if keyword and keyword.strip()]
+def _lab_numeric_value(line: str) -> Tuple[Optional[str], Optional[str]]:
+    match = _RE_LAB_VALUE.search(line)
+    if not match:
+        return None, None
+    return match.group(1), (match.group(2) or "").strip() or None
+
 
-    def extract_numeric_value(line: str) -> Tuple[Optional[str], Optional[str]]:
-        match = re.search(r"([<>]?\d+(?:\.\d+)?)\s*([A-Za-z/%μµ·/\-]+)?", line)
-        if not match:
-            return None, None
-        return match.group(1), (match.group(2) or "").strip() or None
+def _lab_search_segment(line: str, matched: Optional[str]) -> str:
+    """Text after the analyte keyword, minus a leading `(ABBR)`."""
+    if not matched:
+        return line
+    keyword_pos = line.lower().find(matched)
+    segment = line[keyword_pos + len(matched) :] if keyword_pos >= 0 else line
+    return _RE_LAB_PAREN_PREFIX.sub("", segment)
 
-    def search_segment(line: str) -> str:
-        lowered_line = line.lower()
-        matched = next((keyword for keyword in keyword_tokens if keyword in lowered_line), None)
-        if not matched:
-            return line
-        keyword_pos = lowered_line.find(matched)
-        segment = line[keyword_pos + len(matched) :] if keyword_pos >= 0 else line
-        segment = re.sub(r"^\s*\([^)]+\)\s*", "", segment)
-        return segment
-
-    def is_reference_range(line: str) -> bool:
-        return bool(
-            re.fullmatch(
-                r"[<>]?\d+(?:\.\d+)?\s*[-~]\s*[<>]?\d+(?:\.\d+)?(?:\s*[A-Za-z/%μµ·/\-]+)?",
-                line.strip(),
-            )
-        )
 
-    def is_unit_only(line: str) -> bool:
-        return bool(re.fullmatch(r"[A-Za-z/%μµ·/\-]+", line.strip()))
+def _is_lab_reference_range(line: str) -> bool:
+    return bool(_RE_LAB_REFERENCE_RANGE.fullmatch(line.strip()))
+
+
+def _is_lab_unit_only(line: str) -> bool:
+    return bool(_RE_LAB_UNIT_ONLY.fullmatch(line.strip()))
 
-    for index, line in enumerate(lines):
-        lowered = line.lower()
-        matched_keyword = next((keyword for keyword in keyword_tokens if keyword in lowered), None)
-        if not matched_keyword:
-            continue
 
-        raw_value, unit = extract_numeric_value(search_segment(line))
-        if raw_value is not None and not is_reference_range(line):
+def _first_token(tokens: Sequence[str], present: FrozenSet[str]) -> Optional[str]:
+    return next((token for token in tokens if token in present), None)
+
+
+def _lab_value_from_hits(
+    lines: List[str],
+    tokens: Sequence[str],
+    hit_indexes: Iterable[int],
+    line_tokens: Sequence[FrozenSet[str]],
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Read one analyte's value starting from the lines its keywords
+    were found on (`hit_indexes`, ascending). `line_tokens[i]` is the
+    set of lab keywords present in `lines[i]`, lower-cased."""
+    for index in hit_indexes:
+        line = lines[index]
+        raw_value, unit = _lab_numeric_value(_lab_search_segment(line, _first_token(tokens, line_tokens[index])))
+        if raw_value is not None and not _is_lab_reference_range(line):
             return raw_value, unit, line
 
         source_parts = [line]
@@ -1992,19 +2242,21 @@ def _extract_lab_value(lines: List[str], keywords: Iterable[str]) -> Tuple[Optio
                 continue
             source_parts.append(candidate)
 
-            if re.fullmatch(r"[↑↓→]+", candidate):
+            if _RE_LAB_ARROWS.fullmatch(candidate):
                 continue
 
             if raw_value is None:
-                candidate_value, candidate_unit = extract_numeric_value(search_segment(candidate))
-                if candidate_value is not None and not is_reference_range(candidate):
+                candidate_value, candidate_unit = _lab_numeric_value(
+                    _lab_search_segment(candidate, _first_token(tokens, line_tokens[next_index]))
+                )
+                if candidate_value is not None and not _is_lab_reference_range(candidate):
                     raw_value = candidate_value
                     unit = candidate_unit or unit
                     if unit:
                         return raw_value, unit, " ".join(source_parts)
                     continue
 
-            if raw_value is not None and unit is None and is_unit_only(candidate):
+            if raw_value is not None and unit is None and _is_lab_unit_only(candidate):
                 unit = candidate
                 return raw_value, unit, " ".join(source_parts)
 
@@ -2014,47 +2266,21 @@ def _extract_lab_value(lines: List[str], keywords: Iterable[str]) -> Tuple[Optio
 
 
 def _extract_labs(lines: List[str], fields: List[Dict[str, Any]], normalized_summary: Dict[str, Any]) -> None:
-    analytes = {
-        "ck": ["肌酸激酶", "ck"],
-        "mb": ["肌红蛋白", " myo ", " mb "],
-        "ldh": ["乳酸脱氢酶", "ldh"],
-        "ckmb": ["ckmb", "ck-mb"],
-        "creatinine": ["肌酐", "creatinine", "cr"],
-        "uric_acid": ["尿酸", "uric acid", "ua"],
-        "alt": ["alt", "谷丙转氨酶"],
-        "ast": ["ast", "谷草转氨酶"],
-        "tbil": ["总胆红素", "tbil"],
-        "dbil": ["直接胆红素", "dbil"],
-        "ibil": ["间接胆红素", "ibil"],
-        "tp": ["总蛋白", "tp"],
-        "alb": ["白蛋白", "alb"],
-        "globulin": ["球蛋白", "globulin", "glo"],
-        "a_g_ratio": ["白球比例", "a/g"],
-        "alp": ["碱性磷酸酶", "alp"],
-        "ggt": ["谷氨酰转肽酶", "谷氨酰基转移酶", "ggt"],
-        "urea": ["尿素", "urea", "bun"],
-        "glucose": ["葡萄糖", "血糖", "glu"],
-        "cholesterol": ["总胆固醇", "tcho", "cholesterol"],
-        "triglyceride": ["甘油三酯", "tg"],
-        "hdl_c": ["高密度脂蛋白", "hdl-c", "hdl"],
-        "ldl_c": ["低密度脂蛋白", "ldl-c", "ldl"],
-        "vldl_c": ["极低密度脂蛋白", "vldl-c", "vldl"],
-        "apo_a1": ["载脂蛋白a1", "apoa1", "apo-a1"],
-        "apo_b": ["载脂蛋白b", "apob", "apo-b"],
-        "lp_a": ["脂蛋白a", "lp(a)", "lpa"],
-        "phosphorus": ["无机磷", "磷", "p"],
-        "magnesium": ["镁", "mg"],
-        "co2cp": ["碳酸氢根", "co2cp"],
-        "potassium": ["钾", "k"],
-        "sodium": ["钠", "na"],
-        "chloride": ["氯", "cl"],
-        "calcium": ["钙", "ca"],
-        "il6": ["白介素6", "il-6", "il6"],
-    }
     panel: Dict[str, Any] = normalized_summary.get("lab_panel", {})
 
-    for field_name, keywords in analytes.items():
-        raw_value, unit, source_line = _extract_lab_value(lines, keywords)
+    # One keyword scan per line covers all analytes; each analyte then
+    # only revisits the lines its own keywords were found on.
+    line_tokens = [_LAB_SCANNER.scan(line.lower()) for line in lines]
+    hits_by_token: Dict[str, List[int]] = {}
+    for index, present in enumerate(line_tokens):
+        for token in present:
+            hits_by_token.setdefault(token, []).append(index)
+
+    for field_name, tokens in _LAB_TOKENS.items():
+        hit_indexes = sorted({index for token in tokens for index in hits_by_token.get(token, ())})
+        if not hit_indexes:
+            continue
+        raw_value, unit, source_line = _lab_value_from_hits(lines, tokens, hit_indexes, line_tokens)
         if raw_value is None:
             continue
         numeric_value = _safe_float(raw_value)
@@ -2120,9 +2346,12 @@ def _build_observations(structured_fields: List[Dict[str, Any]]) -> List[Dict[st
                 "source_evidence": {
                     "raw_snippet": field.get("source_text"),
                     "line_hint": "structured field",
+                    "source_page": field.get("source_page"),
                 },
             }
         )
+        if "source_section" in field:
+            observations[-1]["source_evidence"]["source_section"] = field["source_section"]
     return observations
 
 
@@ -2207,11 +2436,169 @@ def _legacy_aliases(normalized_summary: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _compact(text: str) -> str:
+    return _RE_WHITESPACE.sub("", _normalize_text(text))
+
+
+def _page_of_snippet(snippet: Optional[str], compact_pages: List[str]) -> Optional[int]:
+    """1-based page whose text contains `snippet`, or None. Snippets
+    merged from a line window can straddle a page break, so fall back
+    to the snippet's first line."""
+    if not snippet:
+        return None
+    candidates = [_compact(snippet)]
+    first_line = _normalize_text(snippet).split("\n", 1)[0]
+    candidates.append(_compact(first_line))
+    for candidate in candidates:
+        if not candidate:
+            continue
+        for number, page in enumerate(compact_pages, start=1):
+            if candidate in page:
+                return number
+    return None
+
+
+def _assign_source_pages(structured_fields: List[Dict[str, Any]], page_texts: List[str]) -> int:
+    """Fill `source_page` from `source_text`. Returns how many fields
+    could not be placed on a page."""
+    compact_pages = [_compact(page) for page in page_texts]
+    unresolved = 0
+    for field in structured_fields:
+        page = _page_of_snippet(field.get("source_text"), compact_pages)
+        field["source_page"] = page
+        if page is None:
+            unresolved += 1
+    return unresolved
+
+
+_TABLE_REPORT_TYPES = frozenset(
+    {
+        "genetic_report",
+        "pulmonary_function",
+        "diaphragm_ultrasound",
+        "ecg",
+        "echocardiography",
+        "biochemistry",
+        "muscle_enzyme",
+        "blood_routine",
+        "thyroid_function",
+        "coagulation",
+        "urinalysis",
+    }
+)
+
+_LAB_REPORT_TYPES = frozenset({"muscle_enzyme", "biochemistry", "other"})
+
+_Extractor = Callable[[List[str], List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]], None]
+
+# Every extractor under one (lines, fields, findings, summary) signature;
+# the ones that produce no findings ignore that argument.
+_EXTRACTORS: Dict[str, _Extractor] = {
+    "genetic_report": _extract_genetic,
+    "medical_summary": lambda lines, fields, findings, summary: _extract_medical_summary(lines, fields, summary),
+    "physical_exam": lambda lines, fields, findings, summary: _extract_physical_exam(lines, fields, summary),
+    "muscle_mri": _extract_mri,
+    "pulmonary_function": _extract_pulmonary,
+    "diaphragm_ultrasound": _extract_diaphragm_ultrasound,
+    "ecg": _extract_ecg,
+    "echocardiography": _extract_echo,
+    "blood_routine": lambda lines, fields, findings, summary: _extract_blood_routine(lines, fields, summary),
+    "thyroid_function": lambda lines, fields, findings, summary: _extract_thyroid_function(lines, fields, summary),
+    "coagulation": lambda lines, fields, findings, summary: _extract_coagulation(lines, fields, summary),
+    "urinalysis": lambda lines, fields, findings, summary: _extract_urinalysis(lines, fields, summary),
+    "infection_screening": lambda lines, fields, findings, summary: _extract_infection_screening(lines, fields, summary),
+    "stool_test": lambda lines, fields, findings, summary: _extract_stool_test(lines, fields, summary),
+    "abdominal_ultrasound": _extract_abdominal_ultrasound,
+}
+
+
+def _run_extractors(
+    report_type: str,
+    lines: List[str],
+    fields: List[Dict[str, Any]],
+    findings: List[Dict[str, Any]],
+    normalized_summary: Dict[str, Any],
+) -> None:
+    extractor = _EXTRACTORS.get(report_type)
+    if extractor is not None:
+        extractor(lines, fields, findings, normalized_summary)
+    if report_type in _LAB_REPORT_TYPES:
+        _extract_labs(lines, fields, normalized_summary)
+
+
+def _section_spans(lines: List[str]) -> List[Tuple[int, int]]:
+    """Cut points of a combined printout as `[start, end)` line ranges.
+
+    A report title opens a new section once the current one has content;
+    a purpose line opens one only when the current section already had a
+    purpose line, so "title / patient header / 检验目的" stays together.
+    """
+    bounds = [0]
+    has_body = False
+    has_purpose = False
+    for index, line in enumerate(lines):
+        if _RE_SECTION_TITLE.match(line):
+            if has_body:
+                bounds.append(index)
+                has_body = has_purpose = False
+            continue
+        if _RE_SECTION_PURPOSE.match(line):
+            if has_purpose:
+                bounds.append(index)
+            has_purpose = True
+        has_body = True
+    bounds.append(len(lines))
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _split_report_sections(lines: List[str]) -> List[Dict[str, Any]]:
+    """Classify each span on its own and merge neighbours: unclassified
+    spans (a continuation page, a trailing signature block) join the
+    section before them, or the next one when they lead the document,
+    and adjacent spans of the same type become one section."""
+    sections: List[Dict[str, Any]] = []
+    leading_start: Optional[int] = None
+    for start, end in _section_spans(lines):
+        report_type, confidence, reasons = _classify_report("\n".join(lines[start:end]))
+        if report_type == "other":
+            if sections:
+                sections[-1]["end_line"] = end
+            elif leading_start is None:
+                leading_start = start
+            continue
+        if leading_start is not None:
+            start, leading_start = leading_start, None
+        if sections and sections[-1]["report_type"] == report_type:
+            sections[-1]["end_line"] = end
+            continue
+        sections.append(
+            {
+                "report_type": report_type,
+                "confidence": confidence,
+                "classification_reasons": reasons,
+                "start_line": start,
+                "end_line": end,
+            }
+        )
+    return sections
+
+
 def analyze_fshd_report(
     ocr_text: str,
     document_type_hint: Optional[str] = None,
     report_name: Optional[str] = None,
+    page_texts: Optional[List[str]] = None,
+    multi_section: bool = False,
 ) -> Dict[str, Any]:
+    """Classify and structure one report. `page_texts` (the per-page
+    text `ocr_text` was joined from) enables `source_page` on fields.
+
+    With `multi_section`, a combined printout (biochemistry + blood
+    routine + thyroid on one PDF) is split into report sections, each
+    section runs its own extractor over the shared line list, and every
+    field / finding carries `source_section`. `fshd.report_type` stays
+    the document-level classification when a section has that type;
+    otherwise the first section's type, confidence and reasons are used."""
     normalized_text = _normalize_text(ocr_text)
     lines = _extract_lines(normalized_text)
     report_type, report_confidence, classification_reasons = _classify_report(
@@ -2224,52 +2611,73 @@ def analyze_fshd_report(
     findings: List[Dict[str, Any]] = []
     normalized_summary: Dict[str, Any] = {}
 
-    if report_type == "genetic_report":
-        _extract_genetic(lines, structured_fields, findings, normalized_summary)
-    elif report_type == "medical_summary":
-        _extract_medical_summary(lines, structured_fields, normalized_summary)
-    elif report_type == "physical_exam":
-        _extract_physical_exam(lines, structured_fields, normalized_summary)
-    elif report_type == "muscle_mri":
-        _extract_mri(lines, structured_fields, findings, normalized_summary)
-    elif report_type == "pulmonary_function":
-        _extract_pulmonary(lines, structured_fields, findings, normalized_summary)
-    elif report_type == "diaphragm_ultrasound":
-        _extract_diaphragm_ultrasound(lines, structured_fields, findings, normalized_summary)
-    elif report_type == "ecg":
-        _extract_ecg(lines, structured_fields, findings, normalized_summary)
-    elif report_type == "echocardiography":
-        _extract_echo(lines, structured_fields, findings, normalized_summary)
-    elif report_type == "blood_routine":
-        _extract_blood_routine(lines, structured_fields, normalized_summary)
-    elif report_type == "thyroid_function":
-        _extract_thyroid_function(lines, structured_fields, normalized_summary)
-    elif report_type == "coagulation":
-        _extract_coagulation(lines, structured_fields, normalized_summary)
-    elif report_type == "urinalysis":
-        _extract_urinalysis(lines, structured_fields, normalized_summary)
-    elif report_type == "infection_screening":
-        _extract_infection_screening(lines, structured_fields, normalized_summary)
-    elif report_type == "stool_test":
-        _extract_stool_test(lines, structured_fields, normalized_summary)
-    elif report_type == "abdominal_ultrasound":
-        _extract_abdominal_ultrasound(lines, structured_fields, findings, normalized_summary)
-
-    if report_type in {
-        "muscle_enzyme",
-        "biochemistry",
-        "other",
-    }:
-        _extract_labs(lines, structured_fields, normalized_summary)
+    sections: List[Dict[str, Any]] = []
+    if multi_section:
+        sections = _split_report_sections(lines)
+        if len(sections) <= 1:
+            sections = [
+                {
+                    "report_type": report_type,
+                    "confidence": report_confidence,
+                    "classification_reasons": classification_reasons,
+                    "start_line": 0,
+                    "end_line": len(lines),
+                }
+            ]
+        for index, section in enumerate(sections):
+            section_fields: List[Dict[str, Any]] = []
+            section_findings: List[Dict[str, Any]] = []
+            _run_extractors(
+                section["report_type"],
+                lines[section["start_line"] : section["end_line"]],
+                section_fields,
+                section_findings,
+                normalized_summary,
+            )
+            provenance = {"index": index, "report_type": section["report_type"]}
+            for item in section_fields + section_findings:
+                item["source_section"] = dict(provenance)
+            section["index"] = index
+            section["report_type_label"] = REPORT_TYPE_LABELS.get(section["report_type"], section["report_type"])
+            section["field_count"] = len(section_fields)
+            structured_fields.extend(section_fields)
+            findings.extend(section_findings)
+        report_types = _dedupe_preserve_order(section["report_type"] for section in sections)
+        if report_type in report_types:
+            report_types.remove(report_type)
+            report_types.insert(0, report_type)
+        else:
+            lead = sections[0]
+            report_type = lead["report_type"]
+            report_confidence = lead["confidence"]
+            classification_reasons = lead["classification_reasons"]
+    else:
+        _run_extractors(report_type, lines, structured_fields, findings, normalized_summary)
+        report_types = [report_type]
+
+    if page_texts:
+        unresolved_pages = _assign_source_pages(structured_fields, page_texts)
+        if unresolved_pages:
+            page_warning = (
+                f"source_page unresolved for {unresolved_pages} field(s); "
+                "source_text is preserved for review."
+            )
+        else:
+            page_warning = None
+    else:
+        page_warning = "source_page unavailable in embedded OCR mode; source_text is preserved for review."
 
     observations = _build_observations(structured_fields)
     latest_summary = _build_latest_summary(observations)
-    patient_info = _extract_patient_info(lines)
-    encounter_info = _extract_encounter_info(lines)
+    windows = _SearchWindows(lines)
+    patient_info = _extract_patient_info(lines, windows)
+    encounter_info = _extract_encounter_info(lines, windows)
     legacy = _legacy_aliases(normalized_summary)
 
     missing_fields = []
-    critical_fields = CRITICAL_FIELDS.get(report_type, [])
+    critical_fields = _dedupe_preserve_order(
+        field_name for section_type in report_types for field_name in CRITICAL_FIELDS.get(section_type, [])
+    )
     extracted_field_names = {item.get("field_name") for item in structured_fields}
     for field_name in critical_fields:
         if field_name not in extracted_field_names:
@@ -2284,9 +2692,7 @@ def analyze_fshd_report(
     quality_control = {
         "missing_critical_fields": missing_fields,
         "possible_ocr_errors": [],
-        "normalization_warnings": [
-            "source_page unavailable in embedded OCR mode; source_text is preserved for review."
-        ],
+        "normalization_warnings": [page_warning] if page_warning else [],
     }
 
     fshd_payload = {
@@ -2299,27 +2705,16 @@ def analyze_fshd_report(
         "review_queue": low_confidence_fields,
         "field_count": len(structured_fields),
     }
+    if multi_section:
+        fshd_payload["sections"] = sections
 
     result: Dict[str, Any] = {
         "schema_version": "fshd_structured_v1",
         "document_classification": {
-            "report_types": [report_type],
+            "report_types": report_types,
             "confidence": report_confidence,
             "language": ["zh"],
-            "has_tables": report_type
-            in {
-                "genetic_report",
-                "pulmonary_function",
-                "diaphragm_ultrasound",
-                "ecg",
-                "echocardiography",
-                "biochemistry",
-                "muscle_enzyme",
-                "blood_routine",
-                "thyroid_function",
-                "coagulation",
-                "urinalysis",
-            },
+            "has_tables": any(section_type in _TABLE_REPORT_TYPES for section_type in report_types),
             "notes": None,
         },
         "patient_info": patient_info,
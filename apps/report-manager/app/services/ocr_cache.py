@@ -0,0 +1,414 @@
+"""Content-addressed cache of OCR text and report analyses.
+
+Patients re-upload the same lab sheet (retries, a second device), and
+every upload used to pay the full PaddleOCR / Tesseract pass again.
+Entries are keyed by the sha256 of the file bytes plus the OCR engine
+and its version, so an identical file OCRed by the same engine is read
+back instead of recomputed, and an engine upgrade naturally misses.
+
+The store is a single SQLite file under `OCR_CACHE_DIR`. SQLite gives
+us cross-process locking for free, which matters because the
+`embedded_parser.py --serve` pool runs several parser processes
+against the same directory. Total payload size is bounded by
+`OCR_CACHE_MAX_BYTES`; the least recently read entries are evicted.
+
+Cached text is patient data just like the uploaded file itself: keep
+`OCR_CACHE_DIR` on the same protected volume. Report and account
+deletion don't know the file digest, so retention is bounded by age
+instead: an entry expires `OCR_CACHE_MAX_AGE_HOURS` after it was
+written, however often it is read. Expired entries are never served
+and are deleted on the next read, write or sweep (the `--serve`
+process sweeps periodically, so an idle instance drops them too).
+
+    python -m app.services.ocr_cache stats
+    python -m app.services.ocr_cache expire
+    python -m app.services.ocr_cache purge --all
+    python -m app.services.ocr_cache purge --older-than-days 30
+    python -m app.services.ocr_cache purge --sha256 <file digest>
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Bump when extract_pages_from_file changes what it returns for the same
+# file (routing thresholds, page joining, ...). Part of every text key.
+OCR_PIPELINE_VERSION = 2
+
+_DB_NAME = "ocr_cache.sqlite3"
+_DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_DEFAULT_MAX_AGE_HOURS = 24
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    content_sha TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS entries_content_sha ON entries (content_sha);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_engine_id = None
+_analyzer_id = None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ocr_engine_id():
+    """`pipeline|paddle=<version or off>|tesseract=<version>`, computed
+    once per process. Package metadata is read instead of importing
+    Paddle so building a key never pays the model import."""
+    global _engine_id
+    if _engine_id is None:
+        from importlib import metadata
+
+        from app.services import ocr_service
+
+        if ocr_service._paddle_disabled():
+            paddle = "off"
+        else:
+            try:
+                paddle = metadata.version("paddleocr")
+            except metadata.PackageNotFoundError:
+                paddle = "off"
+        try:
+            tesseract = str(ocr_service.pytesseract.get_tesseract_version())
+        except Exception:
+            tesseract = "unknown"
+        _engine_id = f"v{OCR_PIPELINE_VERSION}|paddle={paddle}|tesseract={tesseract}"
+    return _engine_id
+
+
+def analyzer_id():
+    """Digest of the report analyser's source, so any change to the
+    extraction rules invalidates cached analyses without a manual bump."""
+    global _analyzer_id
+    if _analyzer_id is None:
+        from app.services import fshd_report_service
+
+        with open(fshd_report_service.__file__, "rb") as handle:
+            _analyzer_id = hashlib.sha256(handle.read()).hexdigest()[:16]
+    return _analyzer_id
+
+
+def _derive_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """Size-bounded LRU store of OCR pages and analyses on local disk.
+
+    Safe to share between processes (SQLite locking) and threads (one
+    connection per process, guarded by a lock). The connection is
+    reopened after a fork so pool workers never share a handle.
+    """
+
+    def __init__(
+        self,
+        root,
+        max_bytes=_DEFAULT_MAX_BYTES,
+        cache_analysis=True,
+        max_age_seconds=_DEFAULT_MAX_AGE_HOURS * 3600,
+    ):
+        self.root = root
+        self.path = os.path.join(root, _DB_NAME)
+        self.max_bytes = max(0, int(max_bytes))
+        # 0 keeps entries until evicted or purged.
+        self.max_age_seconds = max(0.0, float(max_age_seconds))
+        self.cache_analysis = cache_analysis
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    # ------------------------------------------------------------------ keys
+
+    def text_key(self, content_sha, mime_type):
+        return _derive_key("text", content_sha, mime_type or "", ocr_engine_id())
+
+    def analysis_key(self, content_sha, mime_type, document_type_hint, report_name, multi_section=False):
+        parts = [
+            "analysis",
+            self.text_key(content_sha, mime_type),
+            document_type_hint or "",
+            report_name or "",
+            analyzer_id(),
+        ]
+        if multi_section:
+            # Only the new mode adds a part, so existing keys stay valid.
+            parts.append("multi_section")
+        return _derive_key(*parts)
+
+    # -------------------------------------------------------------- get / put
+
+    def get_pages(self, content_sha, mime_type):
+        payload = self._get(self.text_key(content_sha, mime_type), "text")
+        return payload if isinstance(payload, list) else None
+
+    def put_pages(self, content_sha, mime_type, pages):
+        self._put(self.text_key(content_sha, mime_type), "text", content_sha, pages)
+
+    def get_analysis(self, content_sha, mime_type, document_type_hint, report_name, multi_section=False):
+        if not self.cache_analysis:
+            return None
+        key = self.analysis_key(content_sha, mime_type, document_type_hint, report_name, multi_section)
+        payload = self._get(key, "analysis")
+        return payload if isinstance(payload, dict) else None
+
+    def put_analysis(
+        self, content_sha, mime_type, document_type_hint, report_name, analysis, multi_section=False
+    ):
+        if not self.cache_analysis:
+            return
+        key = self.analysis_key(content_sha, mime_type, document_type_hint, report_name, multi_section)
+        self._put(key, "analysis", content_sha, analysis)
+
+    def _get(self, key, kind):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                row = conn.execute(
+                    "SELECT payload, created_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._is_expired(row[1], now):
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._bump(conn, "expired")
+                    row = None
+                if row is None:
+                    self._bump(conn, f"{kind}_misses")
+                    return None
+                conn.execute(
+                    "UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                    (now, key),
+                )
+                self._bump(conn, f"{kind}_hits")
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def _put(self, key, kind, content_sha, payload):
+        encoded = json.dumps(payload, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries "
+                    "(key, kind, content_sha, payload, size, created_at, last_access, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (key, kind, content_sha, encoded, size, now, now),
+                )
+                self._expire(conn, now)
+                self._evict(conn)
+
+    def _is_expired(self, created_at, now):
+        return bool(self.max_age_seconds) and created_at < now - self.max_age_seconds
+
+    def _expire(self, conn, now):
+        if not self.max_age_seconds:
+            return 0
+        removed = conn.execute(
+            "DELETE FROM entries WHERE created_at < ?", (now - self.max_age_seconds,)
+        ).rowcount
+        self._bump(conn, "expired", removed)
+        return removed
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._bump(conn, "evictions", evicted)
+
+    @staticmethod
+    def _bump(conn, name, amount=1):
+        if amount:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount),
+            )
+
+    # ------------------------------------------------------------ maintenance
+
+    def stats(self):
+        with self._lock:
+            conn = self._connect()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            by_kind = {
+                kind: {"entries": count, "bytes": size}
+                for kind, count, size in conn.execute(
+                    "SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY kind"
+                ).fetchall()
+            }
+        snapshot = {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "entries": sum(item["entries"] for item in by_kind.values()),
+            "bytes": sum(item["bytes"] for item in by_kind.values()),
+            "max_age_seconds": self.max_age_seconds,
+            "evictions": counters.get("evictions", 0),
+            "expired": counters.get("expired", 0),
+        }
+        for kind in ("text", "analysis"):
+            hits = counters.get(f"{kind}_hits", 0)
+            misses = counters.get(f"{kind}_misses", 0)
+            lookups = hits + misses
+            snapshot[kind] = {
+                **by_kind.get(kind, {"entries": 0, "bytes": 0}),
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+        return snapshot
+
+    def expire(self):
+        """Delete every entry past `max_age_seconds`. Returns how many
+        were removed."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return self._expire(conn, time.time())
+
+    def purge(self, older_than_seconds=None, content_sha=None):
+        """Delete entries (all of them when no filter is given). Returns
+        how many were removed."""
+        clauses, params = [], []
+        if older_than_seconds is not None:
+            clauses.append("last_access < ?")
+            params.append(time.time() - older_than_seconds)
+        if content_sha:
+            clauses.append("content_sha = ?")
+            params.append(content_sha)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                removed = conn.execute(f"DELETE FROM entries{where}", params).rowcount
+                if not clauses:
+                    conn.execute("DELETE FROM counters")
+            conn.execute("VACUUM")
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(self.root, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache configured from the environment, or None when
+    `OCR_CACHE_DIR` is unset."""
+    global _default_cache
+    root = os.getenv("OCR_CACHE_DIR", "").strip()
+    if not root:
+        return None
+    if _default_cache is None or _default_cache.root != root:
+        _default_cache = OcrCache(
+            root,
+            max_bytes=int(os.getenv("OCR_CACHE_MAX_BYTES", "") or _DEFAULT_MAX_BYTES),
+            cache_analysis=os.getenv("OCR_CACHE_ANALYSIS", "true").strip().lower()
+            not in {"0", "false", "no", "n", "off"},
+            max_age_seconds=_env_max_age_hours() * 3600,
+        )
+    return _default_cache
+
+
+def _env_max_age_hours():
+    try:
+        return max(0.0, float(os.getenv("OCR_CACHE_MAX_AGE_HOURS", "") or _DEFAULT_MAX_AGE_HOURS))
+    except ValueError:
+        return _DEFAULT_MAX_AGE_HOURS
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Inspect or purge the report OCR cache")
+    parser.add_argument("--cache-dir", default=os.getenv("OCR_CACHE_DIR", ""))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Print entry counts, size and hit/miss counters as JSON")
+    sub.add_parser("expire", help="Delete entries older than OCR_CACHE_MAX_AGE_HOURS")
+    purge = sub.add_parser("purge", help="Delete cache entries")
+    purge.add_argument("--all", action="store_true", help="Delete every entry and reset counters")
+    purge.add_argument("--older-than-days", type=float, help="Delete entries not read for N days")
+    purge.add_argument("--sha256", help="Delete entries for one file digest")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.cache_dir:
+        parser.error("--cache-dir or OCR_CACHE_DIR is required")
+    cache = OcrCache(args.cache_dir, max_age_seconds=_env_max_age_hours() * 3600)
+
+    if args.command == "stats":
+        sys.stdout.write(json.dumps(cache.stats(), indent=2) + "\n")
+        return 0
+
+    if args.command == "expire":
+        sys.stdout.write(json.dumps({"removed": cache.expire()}) + "\n")
+        return 0
+
+    if not (args.all or args.older_than_days is not None or args.sha256):
+        parser.error("purge needs --all, --older-than-days or --sha256")
+    removed = cache.purge(
+        older_than_seconds=None if args.older_than_days is None else args.older_than_days * 86400,
+        content_sha=args.sha256,
+    )
+    sys.stdout.write(json.dumps({"removed": removed}) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,8 +3,9 @@ from PIL import Image
 import pytesseract
 import os
 import sys
-import tempfile
-from pdf2image import convert_from_path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pdf2image import convert_from_path, pdfinfo_from_path
 import traceback
 
 PaddleOCR = None
@@ -21,6 +22,22 @@ def _paddle_disabled() -> bool:
 
 SUPPORTED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/jpg"}
 
+# Scanned-PDF OCR runs this many pages at once. Tesseract is a separate
+# process per call, so threads already give process-level parallelism
+# without pickling 25 MB page images across a process boundary (and
+# still work inside the daemonic `embedded_parser.py --serve` workers,
+# which may not fork a pool of their own).
+_OCR_PAGE_WORKERS = max(1, int(os.getenv("OCR_PAGE_WORKERS", "") or min(4, os.cpu_count() or 1)))
+
+# Pages rasterised per pdf2image call; together with the in-flight cap
+# below this bounds how many 300 dpi page images are alive at once.
+_OCR_RASTER_BATCH = _OCR_PAGE_WORKERS
+_OCR_MAX_IN_FLIGHT = 2 * _OCR_PAGE_WORKERS
+
+# A PDF page with fewer non-whitespace characters than this in its text
+# layer is treated as a scan and OCRed; typed pages keep their layer.
+_MIN_TEXT_LAYER_CHARS = 60
+
 _paddle_ocr = None
 _paddle_logged = False
 _tesseract_logged = False
@@ -132,64 +149,139 @@ def _paddle_image_to_string(image):
         _log_ocr_message(traceback.format_exc())
         return ""
 
-def extract_text_from_pdf(pdf_path):
+def extract_pages_from_pdf(pdf_path):
     """
-    Extract text from a PDF file using PyPDF2 for text-based PDFs and pytesseract for image-based PDFs
+    Extract per-page text from a PDF, in page order.
+
+    Each page keeps its PyPDF2 text layer when it has one; only pages
+    without a usable layer (scanned sheets inside an otherwise typed
+    document) are rasterised and OCRed.
     """
-    text = ""
-    
-    # 尝试使用PyPDF2提取文本
+    pages = []
+
+    # 尝试使用PyPDF2逐页提取文本层
     try:
         with open(pdf_path, 'rb') as file:
             reader = PyPDF2.PdfReader(file)
-            num_pages = len(reader.pages)
-            
-            for page_num in range(num_pages):
-                page = reader.pages[page_num]
-                text += page.extract_text() or ""
+            for page in reader.pages:
+                try:
+                    pages.append(page.extract_text() or "")
+                except Exception as e:
+                    _log_ocr_message(f"PyPDF2 page extraction error: {e}")
+                    pages.append("")
     except Exception as e:
         _log_ocr_message(f"PyPDF2 extraction error: {e}")
-    
-    # 如果PyPDF2提取的文本较少，尝试使用OCR
-    if len(text.strip()) < 100:
-        try:
-            # 将PDF转换为图像
-            images = convert_from_path(pdf_path, dpi=300)
-
-            # 使用PaddleOCR优先，其次使用Tesseract提取图像中的文本
-            # 用 TemporaryDirectory() 把所有页的临时图像放在隔离目录里：
-            # 旧的实现固定文件名 (temp_image_{i}.png) 在系统 tmp 根目录下，
-            # 两个并发 OCR 请求拿到同一个 i 时会互相覆盖，PIL 句柄也可能
-            # 复用错文件。隔离目录 + with 语句让多个 worker 安全并行，并
-            # 在异常路径也保证目录被清掉。
-            ocr_text = ""
-            with tempfile.TemporaryDirectory(prefix="ocr_pdf_") as tmpdir:
-                for i, image in enumerate(images):
-                    paddle_text = _paddle_image_to_string(image)
-                    if paddle_text:
-                        ocr_text += paddle_text + "\n"
-                        continue
-                    global _tesseract_logged
-                    if not _tesseract_logged:
-                        _log_ocr_message("OCR engine: Tesseract (fallback)")
-                        _tesseract_logged = True
-                    temp_image_path = os.path.join(tmpdir, f"page_{i}.png")
-                    image.save(temp_image_path, 'PNG')
-                    # 旧实现用 Image.open(path) 但没 close —— 在长批
-                    # 文档 / 低 ulimit 平台 (Windows / 容器) 上会累积
-                    # 文件描述符直到 OS 拒绝新的 open。用 with 让 PIL
-                    # 句柄随作用域释放。
-                    with Image.open(temp_image_path) as page_image:
-                        ocr_text += pytesseract.image_to_string(
-                            page_image,
-                            lang="chi_sim+eng",
-                        )
-
-            text = ocr_text
-        except Exception as e:
-            _log_ocr_message(f"OCR extraction error: {e}")
+        pages = []
+
+    # 只对没有可用文本层的页面做 OCR
+    try:
+        if not pages:
+            page_count = int(pdfinfo_from_path(pdf_path).get("Pages") or 0)
+            pages = [""] * page_count
+        scanned = [number for number, text in enumerate(pages, start=1) if not _has_text_layer(text)]
+        for number, ocr_text in _ocr_pdf_pages(pdf_path, scanned):
+            if ocr_text.strip():
+                pages[number - 1] = ocr_text
+    except Exception as e:
+        _log_ocr_message(f"OCR extraction error: {e}")
+
+    return pages
+
+
+def extract_text_from_pdf(pdf_path):
+    """
+    Extract text from a PDF file using PyPDF2 for text-based pages and OCR for scanned pages
+    """
+    return join_pages(extract_pages_from_pdf(pdf_path))
+
+
+def join_pages(pages):
+    return "\n".join(page.rstrip("\n") for page in pages)
+
+
+def _has_text_layer(text):
+    return len("".join((text or "").split())) >= _MIN_TEXT_LAYER_CHARS
+
+
+def _tesseract_image_to_string(image):
+    global _tesseract_logged
+    if not _tesseract_logged:
+        _log_ocr_message("OCR engine: Tesseract (fallback)")
+        _tesseract_logged = True
+    return pytesseract.image_to_string(image, lang="chi_sim+eng")
+
+
+def _contiguous_runs(pages):
+    """[1, 2, 3, 7, 9, 10] -> [(1, 3), (7, 7), (9, 10)]."""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+def _iter_pdf_images(pdf_path, page_numbers):
+    """Yield `(page_number, image)` at 300 dpi lazily, rasterising
+    `_OCR_RASTER_BATCH` pages at a time (one pdf2image call per
+    contiguous run) instead of the whole PDF up front."""
+    for start in range(0, len(page_numbers), _OCR_RASTER_BATCH):
+        batch = page_numbers[start : start + _OCR_RASTER_BATCH]
+        for first, last in _contiguous_runs(batch):
+            images = convert_from_path(
+                pdf_path,
+                dpi=300,
+                first_page=first,
+                last_page=last,
+                thread_count=min(_OCR_PAGE_WORKERS, last - first + 1),
+            )
+            for number in range(first, last + 1):
+                if not images:
+                    break
+                yield number, images.pop(0)
+
+
+def _ocr_pdf_pages(pdf_path, page_numbers):
+    """OCR the given 1-based pages, yielding `(page_number, text)` in order.
+
+    PaddleOCR (when enabled) runs on the calling thread, where its model
+    lives; pages it returns nothing for go to Tesseract on a bounded
+    thread pool. At most `_OCR_MAX_IN_FLIGHT` pages are queued, so peak
+    memory is a handful of page images rather than the whole document.
+    """
+    page_numbers = sorted(set(page_numbers))
+    if not page_numbers:
+        return
+
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=_OCR_PAGE_WORKERS) as pool:
+        for number, image in _iter_pdf_images(pdf_path, page_numbers):
+            paddle_text = _paddle_image_to_string(image)
+            if paddle_text:
+                in_flight.append((number, paddle_text + "\n"))
+            else:
+                in_flight.append((number, pool.submit(_tesseract_image_to_string, image)))
+            del image
+            while len(in_flight) >= _OCR_MAX_IN_FLIGHT:
+                yield _page_result(in_flight.popleft())
+        while in_flight:
+            yield _page_result(in_flight.popleft())
+
+
+def _page_result(item):
+    number, text = item
+    return number, text if isinstance(text, str) else text.result()
+
+
+def extract_pages_from_file(file_path, content_type):
+    """
+    Extract per-page text from a PDF or image file (an image is one page).
+    """
+    if content_type in SUPPORTED_IMAGE_TYPES:
+        return [extract_text_from_file(file_path, content_type)]
+    return extract_pages_from_pdf(file_path)
 
-    return text
 
 def extract_text_from_file(file_path, content_type):
     """
@@ -207,11 +299,7 @@ def extract_text_from_file(file_path, content_type):
                 paddle_text = _paddle_image_to_string(image)
                 if paddle_text:
                     return paddle_text
-                global _tesseract_logged
-                if not _tesseract_logged:
-                    _log_ocr_message("OCR engine: Tesseract (fallback)")
-                    _tesseract_logged = True
-                return pytesseract.image_to_string(image, lang="chi_sim+eng")
+                return _tesseract_image_to_string(image)
         except Exception as e:
             _log_ocr_message(f"Image OCR error: {e}")
             return ""
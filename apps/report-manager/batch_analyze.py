@@ -0,0 +1,64 @@
+import argparse
+import json
+import sys
+
+from app.services.batch_analysis import BatchStats, analyze_batch, default_workers, read_jsonl
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Re-run analyze_fshd_report over a JSONL file of stored report texts"
+    )
+    parser.add_argument("--input", default="-", help="JSONL records to analyse (- = stdin)")
+    parser.add_argument("--output", default="-", help="Where to write JSONL results (- = stdout)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="Analyser processes (0 = analyse in this process); env REPORT_BATCH_WORKERS",
+    )
+    parser.add_argument("--chunk-size", type=int, default=32, help="Records sent to a worker at a time")
+    parser.add_argument(
+        "--multi-section",
+        action="store_true",
+        help="Extract every report section of combined printouts (records may override)",
+    )
+    parser.add_argument(
+        "--stats",
+        help="Write the per-report-type timing summary to this file instead of stderr",
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    stats = BatchStats()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for result in analyze_batch(
+            read_jsonl(source),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            stats=stats,
+            multi_section=args.multi_section,
+        ):
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    summary = json.dumps(stats.as_dict(), ensure_ascii=False, indent=2)
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as handle:
+            handle.write(summary + "\n")
+    else:
+        sys.stderr.write(summary + "\n")
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
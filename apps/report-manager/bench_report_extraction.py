@@ -0,0 +1,265 @@
+"""Throughput benchmark for analyze_fshd_report.
+
+Builds a seeded corpus of synthetic OCR texts covering every report
+type the analyser knows (lab sheets, imaging, genetics, PFT, ECG ...),
+with random values, patient/encounter headers and optional filler
+lines to mimic multi-page scans, then reports reports/sec.
+
+    python bench_report_extraction.py
+    python bench_report_extraction.py --reports 400 --filler-lines 0,200
+    python bench_report_extraction.py --dump before.json   # compare outputs across changes
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+
+from app.services.fshd_report_service import analyze_fshd_report
+
+_HEADER = """福建医科大学附属第一医院检验报告单
+姓名: {name} 性别: {sex} 年龄: {age}岁
+病历号: {visit} 床号: {bed} 科室: 神经内科
+送检医生: 林医生/{doctor} 标本: 血清
+临床诊断: 面肩肱型肌营养不良症
+采样时间: 2024-0{month}-1{day} 08:30 接收时间: 2024-0{month}-1{day} 09:10
+报告日期: 2024-0{month}-1{day} 15:42
+"""
+
+_BODIES = [
+    (
+        "Blood Routine Examination.jpeg",
+        """检验目的: 血常规
+白细胞计数(WBC) {f1} 3.5-9.5
+红细胞计数(RBC) {f2} 4.3-5.8
+血红蛋白量(HGB) {i1} 130-175
+血小板计数(PLT) {i2} 125-350
+中性粒细胞百分比(NEUT%) {p1} 40-75
+""",
+    ),
+    (
+        "routine biochemistry test.jpeg",
+        """检验目的: 生化全套检查
+谷丙转氨酶(ALT) {i1} 9-50
+谷草转氨酶(AST) {i2} 15-40
+肌酸激酶(CK) {i3} ↑ 50-310
+乳酸脱氢酶(LDH) {i1} 120-250
+总胆红素(TBIL) {f1} 0-21
+直接胆红素(DBIL) {f2} 0-6.8
+总蛋白(TP) {i2} 65-85
+白蛋白(ALB) {f3} 40-55
+尿素(UREA) {f1} 3.10-8.0
+肌酐(CREA) {f3} 57-97
+尿酸(UA) {i3} 208-428
+葡萄糖(GLU) {f2} 3.90-6.10
+总胆固醇(TCHO) {f1} 3.0-5.18
+甘油三酯(TG) {f2} 0-1.7
+高密度脂蛋白(HDL-C) {f2} 1.0-1.9
+低密度脂蛋白(LDL-C) {f1} 0-3.37
+钾(K) {f1} 3.5-5.3
+钠(NA) {i3} 137-147
+氯(CL) {i2} 99-110
+钙(CA) {f2} 2.11-2.52
+""",
+    ),
+    (
+        "Mb.jpeg",
+        """检验目的: 血清肌红蛋白(Mb)
+肌红蛋白(MYO) {f3} ↑ 0-110 ug/L
+肌酸激酶同工酶(CK-MB) {f1} 0-25 U/L
+""",
+    ),
+    (
+        "FT3、FT4.jpeg",
+        """检验目的: FT3、FT4、STSH
+游离T3(FT3) {f1} 3.5-6.59
+游离T4(FT4) {f3} 11.5-22.7
+超敏促甲状腺素(TSH3) {f2} 0.55-4.78
+""",
+    ),
+    (
+        "Whole Set Test for Coagulation.jpeg",
+        """检验目的: 凝血全套
+凝血酶原时间(PT) {f3} 11.0-14.5
+国际标准化比值(PT-INR) {f2}
+活化部分凝血活酶时间(APTT) {f3} 26.0-45.0
+纤维蛋白原(Fg) {f2} 2.0-4.0
+凝血酶时间(TT) {f3} 14.1-20.1
+""",
+    ),
+    (
+        "urinalysis.jpeg",
+        """检验目的: 尿沉渣定量+尿常规
+颜色 黄色
+透明度 澄清
+葡萄糖(GLU) 阴性
+蛋白质(PRO) 阴性
+潜血(OB) 阴性
+白细胞 {f1}
+红细胞(RBC) {f2}
+""",
+    ),
+    (
+        "HBV Test.jpeg",
+        """检验目的: 乙肝两对半定量+HIV.
+乙型肝炎病毒表面抗原(HBsAg) 0.00(-) <0.05
+抗乙型肝炎病毒表面抗体(Anti-HBs) {f2}(-) <10
+乙型肝炎病毒e抗原(HBeAg) 0.56(-) <1.0
+抗乙型肝炎病毒核心抗体(Anti-HBc) 0.10(-) <1.0
+人类免疫缺陷病毒抗原抗体联合检测(HIV) 0.06(-) <1.0
+""",
+    ),
+    (
+        "Pulmonay Ventilation Test.jpeg",
+        """通气弥散残气检查报告
+FVC [L] 5.55 {f1} {p1}
+FEV1 [L] 4.65 {f2} {p1}
+FEV1/FVC [%] 83.20 87.72 105.4
+TLC-SB [L] 7.54 5.54 73.4
+DLCO-SB [mmol/min/kPa] 12.65 10.27 81.2
+结论:
+中度限制性通气功能障碍，正常肺弥散功能（一口气弥散法）。
+""",
+    ),
+    (
+        "ECG.jpeg",
+        """心电图报告
+心率: {i2} bpm P-R间期: 180 ms QRS时限: 88 ms QT/QTc: 358/386 ms
+心电图诊断:
+窦性心律不齐
+不完全性右束支传导阻滞
+""",
+    ),
+    (
+        "Color Ultrasound for Heart.jpeg",
+        """彩色超声诊断报告单
+检查部位: 心脏彩色多普勒超声
+HR: {i2}bpm AoD: 2.81cm LAD: 2.93cm LVDd: 4.58cm
+FS: 37.42% EF: {p1}%
+检查所见:
+左房未见明显增大，左室内径正常，整体收缩功能正常。
+检查提示:
+房室大小及LVEF值正常范围
+""",
+    ),
+    (
+        "Color Ultrasound for Diaphragm.jpeg",
+        """彩色超声诊断报告单
+检查部位: 膈肌彩超
+活动度(cm) QB DB VS 膈肌厚度(mm) E-E E-I D-I
+右侧膈肌 1.47 5.32 1.67 1.9 2.8 7.1
+左侧膈肌 1.28 4.81 2.12 1.9 2.3 4.8
+检查提示:
+双侧膈肌运动及增厚率未见明显异常声像
+""",
+    ),
+    (
+        "Muscle MRI Scan.jpeg",
+        """磁共振检查报告单
+检查项目: 双侧小腿肌肉MRI平扫
+影像所见:
+右侧小腿腓肠肌内侧头、右侧胫前肌肌腹片状短T1长T2信号影，左侧腓肠肌内侧头、胫骨前肌与趾长伸肌肌腹片絮状长T1长T2信号影。
+印象:
+右侧腓肠肌内侧头、双侧胫骨前肌与趾长伸肌脂肪浸润。
+""",
+    ),
+    (
+        "genetic report.pdf",
+        """FSHD 基因检测报告
+检测方法: 光学图谱 / Southern blot
+EcoRI 片段长度: {f1}kb
+D4Z4 重复数: {i4}
+4qA 允许性单倍型
+结论: 符合 FSHD1 分子诊断
+""",
+    ),
+    (
+        "HP.jpeg",
+        """13C呼气试验检验报告
+Basal 0.0
+30-Minutes {f3}
+检测结果:DOB={f3} 阳性+
+""",
+    ),
+]
+
+_FILLER = [
+    "备注: 本报告仅对所检标本负责，如有疑问请于三日内咨询。",
+    "检验者: 张三 审核者: 李四",
+    "参考区间依据本院实验室建立的人群数据。",
+    "页码 {n}",
+]
+
+
+def build_corpus(count, filler_lines, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(count):
+        report_name, body = _BODIES[index % len(_BODIES)]
+        values = {
+            "f1": f"{rng.uniform(1, 9):.2f}",
+            "f2": f"{rng.uniform(0.5, 3):.2f}",
+            "f3": f"{rng.uniform(10, 60):.1f}",
+            "i1": rng.randint(20, 180),
+            "i2": rng.randint(50, 140),
+            "i3": rng.randint(100, 900),
+            "i4": rng.randint(2, 9),
+            "p1": f"{rng.uniform(40, 95):.1f}",
+        }
+        header = _HEADER.format(
+            name=rng.choice(["陈明", "王芳", "李建国", "张伟"]),
+            sex=rng.choice(["男", "女"]),
+            age=rng.randint(8, 70),
+            visit=rng.randint(100000, 999999),
+            bed=rng.randint(1, 60),
+            doctor=rng.randint(1000, 9999),
+            month=rng.randint(1, 9),
+            day=rng.randint(0, 9),
+        )
+        filler = "\n".join(
+            _FILLER[i % len(_FILLER)].format(n=i // len(_FILLER) + 1) for i in range(filler_lines)
+        )
+        corpus.append((header + body.format(**values) + filler, report_name))
+    return corpus
+
+
+def _run(corpus):
+    return [analyze_fshd_report(text, "other", name) for text, name in corpus]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analyze_fshd_report throughput")
+    parser.add_argument("--reports", type=int, default=280, help="Synthetic reports per corpus")
+    parser.add_argument("--filler-lines", default="0,120", help="Comma-separated filler line counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--dump", help="Write every analysis to this JSON file")
+    args = parser.parse_args()
+
+    dumped = {}
+    print(f"  {'filler':>6} {'reports/s':>10} {'ms/report':>10}  digest")
+    for filler in [int(value) for value in args.filler_lines.split(",") if value.strip()]:
+        corpus = build_corpus(args.reports, filler, args.seed)
+        results = _run(corpus)  # warm-up, and the outputs we fingerprint
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            _run(corpus)
+            best = min(best, time.perf_counter() - started)
+        encoded = json.dumps(results, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:12]
+        print(
+            f"  {filler:>6} {len(corpus) / best:>10.1f} {best * 1000 / len(corpus):>10.3f}  {digest}"
+        )
+        dumped[str(filler)] = results
+
+    if args.dump:
+        with open(args.dump, "w", encoding="utf-8") as handle:
+            json.dump(dumped, handle, ensure_ascii=False, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,464 @@
 import argparse
 import json
+import collections
+import multiprocessing
+import multiprocessing.connection
 import os
 import sys
+import threading
 import traceback
 
 from app.services.fshd_report_service import analyze_fshd_report
-from app.services.ocr_service import extract_text_from_file
+from app.services.ocr_cache import OcrCache, default_cache, file_sha256
+from app.services.ocr_service import extract_pages_from_file, join_pages
+
+PROVIDER = "embedded_report_pipeline_v1"
+
+
+def _env_flag(name):
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Embedded OCR + FSHD report parser")
-    parser.add_argument("--file-path", required=True)
+    parser.add_argument("--file-path")
     parser.add_argument("--mime-type", default="application/octet-stream")
     parser.add_argument("--document-type-hint", default="")
     parser.add_argument("--report-name", default="")
+    parser.add_argument(
+        "--multi-section",
+        action="store_true",
+        default=_env_flag("REPORT_MULTI_SECTION"),
+        help="Split combined printouts into report sections and extract each one",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Stay resident and answer line-delimited JSON requests on stdin",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("OCR_SERVE_WORKERS", "2") or 2),
+        help="Parser processes in --serve mode (0 = parse in the serving process)",
+    )
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        default=int(os.getenv("OCR_SERVE_MAX_TASKS_PER_WORKER", "200") or 0),
+        help="Recycle a --serve worker after this many reports (0 = never)",
+    )
     return parser
 
 
-def main() -> int:
-    parser = build_parser()
-    args = parser.parse_args()
-
+def parse_report(
+    file_path,
+    mime_type="application/octet-stream",
+    document_type_hint="",
+    report_name="",
+    multi_section=False,
+):
+    """OCR + analyse one report file. Returns the payload the API
+    expects; failures come back as an `error` payload, never raise."""
     try:
-        if not os.path.exists(args.file_path):
-            raise FileNotFoundError(f"Input file not found: {args.file_path}")
-
-        extracted_text = extract_text_from_file(args.file_path, args.mime_type)
-        analysis = analyze_fshd_report(
-            extracted_text,
-            args.document_type_hint or None,
-            args.report_name or os.path.basename(args.file_path),
+        if not file_path or not os.path.exists(file_path):
+            raise FileNotFoundError(f"Input file not found: {file_path}")
+
+        name = report_name or os.path.basename(file_path)
+        cache = default_cache()
+        content_sha = file_sha256(file_path) if cache is not None else None
+
+        pages = _cache_call(cache, "get_pages", content_sha, mime_type)
+        if pages is None:
+            pages = extract_pages_from_file(file_path, mime_type)
+            # An empty result is more likely a transient OCR failure
+            # than a blank report; don't pin it.
+            if any(page.strip() for page in pages):
+                _cache_call(cache, "put_pages", content_sha, mime_type, pages)
+        extracted_text = join_pages(pages)
+
+        analysis = _cache_call(
+            cache, "get_analysis", content_sha, mime_type, document_type_hint, name, multi_section
         )
+        if analysis is None:
+            analysis = analyze_fshd_report(
+                extracted_text,
+                document_type_hint or None,
+                name,
+                page_texts=pages,
+                multi_section=multi_section,
+            )
+            if extracted_text.strip():
+                _cache_call(
+                    cache,
+                    "put_analysis",
+                    content_sha,
+                    mime_type,
+                    document_type_hint,
+                    name,
+                    analysis,
+                    multi_section,
+                )
 
-        payload = {
-            "provider": "embedded_report_pipeline_v1",
-            "report_name": args.report_name or os.path.basename(args.file_path),
-            "mime_type": args.mime_type,
-            "document_type_hint": args.document_type_hint or None,
+        return {
+            "provider": PROVIDER,
+            "report_name": name,
+            "mime_type": mime_type,
+            "document_type_hint": document_type_hint or None,
             "extracted_text": extracted_text,
+            "page_count": len(pages),
             "analysis": analysis,
         }
-        sys.stdout.write(json.dumps(payload, ensure_ascii=False))
-        return 0
     except Exception as exc:
-        payload = {
+        return {
             "error": "embedded_report_parse_failed",
             "detail": str(exc),
             "traceback": traceback.format_exc(limit=6),
         }
-        sys.stdout.write(json.dumps(payload, ensure_ascii=False))
-        return 1
+
+
+def _cache_call(cache, method, *args):
+    """Call an OcrCache method, treating a disabled or broken cache as a
+    miss: the cache must never be the reason an upload fails."""
+    if cache is None:
+        return None
+    try:
+        return getattr(cache, method)(*args)
+    except Exception as exc:
+        print(f"OCR cache {method} failed: {exc}", file=sys.stderr)
+        return None
+
+
+# --------------------------------------------------------------------- serve
+#
+# Protocol (one JSON object per line, UTF-8):
+#   stdin : {"id": "...", "file_path": "...", "mime_type": "...",
+#            "document_type_hint": "...", "report_name": "...",
+#            "multi_section": false}
+#           {"id": "...", "cancel": true}   caller gave up on a request
+#   stdout: {"event": "ready", "workers": N}            once, after warm-up
+#           {"id": "...", "result": <parse_report payload>}
+# Responses are written as each report finishes, so they can come back
+# out of order; `id` is echoed verbatim for correlation. Every accepted
+# request gets exactly one response: a worker that dies mid-report
+# answers with `embedded_report_worker_died`, a cancelled one with
+# `embedded_report_parse_cancelled`. EOF on stdin drains in-flight work
+# and exits.
+
+_CANCELLED = {"error": "embedded_report_parse_cancelled", "detail": "cancelled by caller"}
+
+
+def _warm_worker():
+    """Pool initializer: build PaddleOCR once per worker process so no
+    upload pays the model construction (a no-op when Paddle is disabled
+    or unavailable)."""
+    from app.services.ocr_service import _get_paddle_ocr, _log_ocr_message
+
+    try:
+        _get_paddle_ocr()
+    except Exception as exc:
+        # The request path retries and falls back to Tesseract, so a
+        # failed warm-up must not take the worker down with it.
+        _log_ocr_message(f"PaddleOCR warm-up failed: {exc}")
+
+
+def _start_cache_sweeper(stop):
+    """Expire old OCR cache entries on a timer, so patient data ages out
+    even when no upload touches the cache. Uses its own OcrCache so a
+    sweep holding the lock can never be inherited by a forked worker."""
+    cache = default_cache()
+    if cache is None or not cache.max_age_seconds:
+        return
+    sweeper = OcrCache(cache.root, max_bytes=cache.max_bytes, max_age_seconds=cache.max_age_seconds)
+    interval = max(60.0, min(3600.0, cache.max_age_seconds / 4))
+
+    def _run():
+        _cache_call(sweeper, "expire")
+        while not stop.wait(interval):
+            _cache_call(sweeper, "expire")
+
+    threading.Thread(target=_run, name="ocr-cache-sweeper", daemon=True).start()
+
+
+def _handle_request(request, multi_section=False):
+    request_multi_section = request.get("multi_section", multi_section)
+    if not isinstance(request_multi_section, bool):
+        # bool("false") is True; only a JSON boolean means what it says.
+        return {"error": "invalid_request", "detail": "multi_section must be a JSON boolean"}
+    return parse_report(
+        request.get("file_path"),
+        request.get("mime_type") or "application/octet-stream",
+        request.get("document_type_hint") or "",
+        request.get("report_name") or "",
+        request_multi_section,
+    )
+
+
+def _worker_main(conn, multi_section):
+    """Body of one --serve worker process: parse requests from `conn`
+    one at a time until told to stop."""
+    _warm_worker()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        try:
+            result = _handle_request(request, multi_section)
+        except Exception as exc:
+            result = {"error": "embedded_report_parse_failed", "detail": str(exc)}
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, ctx, multi_section):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, multi_section), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.request_id = None
+        self.busy = False
+        self.tasks = 0
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class _WorkerPool:
+    """Parser processes that each take one report at a time.
+
+    multiprocessing.Pool drops a job when its worker dies (OOM, a crash
+    inside Paddle / Tesseract): neither callback fires and the caller
+    waits out its own timeout. Here every worker has its own pipe and
+    process sentinel, so a death fails exactly the request it was
+    running and a replacement is started. Cancelling a running request
+    stops it the same way, so an abandoned report doesn't hold a worker.
+    """
+
+    def __init__(self, size, max_tasks_per_worker, multi_section, write):
+        self._ctx = multiprocessing.get_context()
+        self._multi_section = multi_section
+        self._max_tasks = max_tasks_per_worker or 0
+        self._write = write
+        self._backlog = collections.deque()
+        self._workers = [_Worker(self._ctx, multi_section) for _ in range(size)]
+
+    def run(self, inbox):
+        """Dispatch requests arriving on `inbox` (a Connection yielding
+        request dicts, then None at EOF) until it is drained."""
+        accepting = True
+        while accepting or self._backlog or any(w.busy for w in self._workers):
+            self._dispatch()
+            waitables = [w.process.sentinel for w in self._workers]
+            waitables += [w.conn for w in self._workers if w.busy]
+            if accepting:
+                waitables.append(inbox)
+            for ready in multiprocessing.connection.wait(waitables):
+                if ready is inbox:
+                    try:
+                        request = inbox.recv()
+                    except EOFError:
+                        request = None
+                    if request is None:
+                        accepting = False
+                    elif request.get("cancel"):
+                        self._cancel(request.get("id"))
+                    else:
+                        self._backlog.append(request)
+                    continue
+                worker = self._find(ready)
+                if worker is None:
+                    continue  # already replaced via its other handle
+                if ready is worker.conn:
+                    try:
+                        result = worker.conn.recv()
+                    except (EOFError, OSError):
+                        self._replace(worker, self._died(worker))
+                        continue
+                    self._finish(worker, result)
+                else:
+                    self._replace(worker, self._died(worker))
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop(kill=worker.busy)
+        self._workers = []
+
+    def _dispatch(self):
+        for worker in self._workers:
+            if not self._backlog:
+                return
+            if worker.busy:
+                continue
+            request = self._backlog.popleft()
+            try:
+                worker.conn.send(request)
+            except OSError:
+                # Died while idle; its sentinel will trigger a replacement.
+                self._backlog.appendleft(request)
+                continue
+            worker.busy = True
+            worker.request_id = request.get("id")
+
+    def _finish(self, worker, result):
+        self._write({"id": worker.request_id, "result": result})
+        worker.busy = False
+        worker.request_id = None
+        worker.tasks += 1
+        if self._max_tasks and worker.tasks >= self._max_tasks:
+            # Recycle to cap slow leaks in the OCR stack.
+            self._replace(worker, None)
+
+    def _cancel(self, request_id):
+        for request in list(self._backlog):
+            if request.get("id") == request_id:
+                self._backlog.remove(request)
+                self._write({"id": request_id, "result": dict(_CANCELLED)})
+                return
+        for worker in self._workers:
+            if worker.busy and worker.request_id == request_id:
+                worker.stop(kill=True)
+                self._replace(worker, dict(_CANCELLED), stopped=True)
+                return
+
+    def _died(self, worker):
+        worker.process.join(1)
+        return {
+            "error": "embedded_report_worker_died",
+            "detail": f"parser worker exited with code {worker.process.exitcode}",
+        }
+
+    def _replace(self, worker, result, stopped=False):
+        """Swap `worker` for a fresh process, answering its in-flight
+        request (if any) with `result`."""
+        if worker.busy and result is not None:
+            self._write({"id": worker.request_id, "result": result})
+        if not stopped:
+            worker.stop(kill=worker.process.is_alive() and worker.busy)
+        self._workers[self._workers.index(worker)] = _Worker(self._ctx, self._multi_section)
+
+    def _find(self, handle):
+        for worker in self._workers:
+            if handle is worker.conn or handle == worker.process.sentinel:
+                return worker
+        return None
+
+
+def _read_requests(in_stream, deliver, write):
+    """Hand each request line to `deliver` (then None at EOF), answering
+    malformed lines directly."""
+    try:
+        for raw in in_stream:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                request = json.loads(raw)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as exc:
+                write({"id": None, "result": {"error": "invalid_request", "detail": str(exc)}})
+                continue
+            deliver(request)
+    finally:
+        deliver(None)
+
+
+def serve(workers=2, max_tasks_per_worker=200, in_stream=None, out_stream=None, multi_section=False):
+    """Answer requests from `in_stream` until EOF. `workers` processes
+    each keep OCR state warm; with `workers <= 0` requests are parsed
+    inline, one at a time. `multi_section` is the default for requests
+    that don't set it."""
+    if out_stream is None:
+        # Keep the protocol channel private: the real stdout fd becomes
+        # the protocol stream and fd 1 is pointed at stderr, so stray
+        # prints from Paddle / tesseract wrappers (here or in forked
+        # workers) can't corrupt a response line.
+        out_stream = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+        sys.stdout.flush()
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        sys.stdout = sys.stderr
+    if in_stream is None:
+        in_stream = sys.stdin
+
+    write_lock = threading.Lock()
+
+    def _write(message):
+        line = json.dumps(message, ensure_ascii=False)
+        with write_lock:
+            out_stream.write(line + "\n")
+            out_stream.flush()
+
+    pool = None
+    if workers > 0:
+        pool = _WorkerPool(workers, max_tasks_per_worker, multi_section, _write)
+    else:
+        _warm_worker()
+    _write({"event": "ready", "workers": max(0, workers)})
+    stop_sweeper = threading.Event()
+    _start_cache_sweeper(stop_sweeper)
+
+    try:
+        if pool is None:
+
+            def _inline(request):
+                # A cancel always arrives after its request has finished.
+                if request is not None and not request.get("cancel"):
+                    _write({"id": request.get("id"), "result": _handle_request(request, multi_section)})
+
+            _read_requests(in_stream, _inline, _write)
+        else:
+            # stdin is read on a thread so the dispatch loop can wait on
+            # new requests and worker results / deaths at once.
+            inbox, outbox = multiprocessing.Pipe(duplex=False)
+            threading.Thread(
+                target=_read_requests, args=(in_stream, outbox.send, _write), daemon=True
+            ).start()
+            pool.run(inbox)
+    finally:
+        stop_sweeper.set()
+        if pool is not None:
+            pool.close()
+    return 0
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(
+            workers=args.workers,
+            max_tasks_per_worker=args.max_tasks_per_worker,
+            multi_section=args.multi_section,
+        )
+    if not args.file_path:
+        parser.error("--file-path is required unless --serve is given")
+
+    payload = parse_report(
+        args.file_path,
+        args.mime_type,
+        args.document_type_hint,
+        args.report_name,
+        args.multi_section,
+    )
+    sys.stdout.write(json.dumps(payload, ensure_ascii=False))
+    return 1 if payload.get("error") else 0
 
 
 if __name__ == "__main__":
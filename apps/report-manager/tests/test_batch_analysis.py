@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import batch_analyze
+from app.services import batch_analysis
+from app.services.fshd_report_service import analyze_fshd_report
+from bench_report_extraction import build_corpus
+
+
+def _records(count=30):
+    return [
+        {"id": f"r{index}", "text": text, "document_type_hint": "other", "report_name": name}
+        for index, (text, name) in enumerate(build_corpus(count, 5, seed=3))
+    ]
+
+
+class BatchAnalysisTest(unittest.TestCase):
+    def test_pool_results_match_sequential_analysis_in_input_order(self):
+        records = _records()
+        stats = batch_analysis.BatchStats()
+        results = list(batch_analysis.analyze_batch(iter(records), workers=2, chunk_size=4, stats=stats))
+
+        self.assertEqual([result["id"] for result in results], [record["id"] for record in records])
+        for record, result in zip(records, results):
+            expected = analyze_fshd_report(record["text"], "other", record["report_name"])
+            self.assertEqual(result["analysis"], expected)
+            self.assertEqual(
+                result["report_type"], expected["document_classification"]["report_types"][0]
+            )
+
+        summary = stats.as_dict()
+        self.assertEqual(summary["reports"], len(records))
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(
+            sum(bucket["count"] for bucket in summary["by_report_type"].values()), len(records)
+        )
+
+    def test_inline_mode_reports_bad_records_without_stopping(self):
+        lines = io.StringIO(
+            "\n".join(
+                [
+                    json.dumps({"text": "检验目的: 血常规", "report_name": "blood.jpeg"}),
+                    "{not json",
+                    json.dumps({"id": "no-text"}),
+                    json.dumps(["not", "an", "object"]),
+                    "",
+                    json.dumps({"id": "pft", "ocr_text": "通气弥散残气检查报告"}),
+                ]
+            )
+        )
+        stats = batch_analysis.BatchStats()
+        results = list(
+            batch_analysis.analyze_batch(batch_analysis.read_jsonl(lines), workers=0, stats=stats)
+        )
+
+        self.assertEqual([result["id"] for result in results], [0, "line:2", "no-text", None, "pft"])
+        self.assertEqual(results[0]["report_type"], "blood_routine")
+        self.assertIn("invalid JSON", results[1]["detail"])
+        self.assertEqual(results[2]["error"], "report_analysis_failed")
+        self.assertEqual(results[3]["error"], "report_analysis_failed")
+        self.assertNotIn("error", results[4])
+        self.assertEqual((stats.reports, stats.errors), (5, 3))
+
+    def test_multi_section_must_be_a_json_boolean(self):
+        record = {"id": "r", "text": "检验目的: 血常规", "multi_section": "false"}
+        result = batch_analysis.analyze_record(record, multi_section=False)
+        self.assertEqual(result["error"], "report_analysis_failed")
+        self.assertIn("multi_section", result["detail"])
+
+        record["multi_section"] = False
+        result = batch_analysis.analyze_record(record, multi_section=True)
+        self.assertNotIn("sections", result["analysis"]["fshd"])
+
+    def test_cli_writes_jsonl_results_and_timing_summary(self):
+        records = _records(6)
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "in.jsonl")
+            output = os.path.join(root, "out.jsonl")
+            summary_path = os.path.join(root, "stats.json")
+            with open(source, "w", encoding="utf-8") as handle:
+                handle.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+            code = batch_analyze.main(
+                ["--input", source, "--output", output, "--workers", "0", "--stats", summary_path]
+            )
+
+            with open(output, encoding="utf-8") as handle:
+                results = [json.loads(line) for line in handle]
+            with open(summary_path, encoding="utf-8") as handle:
+                summary = json.load(handle)
+
+        self.assertEqual(code, 0)
+        self.assertEqual([result["id"] for result in results], [record["id"] for record in records])
+        self.assertEqual(summary["reports"], 6)
+        for bucket in summary["by_report_type"].values():
+            self.assertGreaterEqual(bucket["max_ms"], bucket["mean_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import embedded_parser
+
+
+def _serve(lines, workers=0):
+    out = io.StringIO()
+    with mock.patch.dict(os.environ, {"OCR_DISABLE_PADDLE": "1"}):
+        embedded_parser.serve(
+            workers=workers,
+            in_stream=io.StringIO("".join(line + "\n" for line in lines)),
+            out_stream=out,
+        )
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def _scripted_handle(request, multi_section=False):
+    """Stand-in for _handle_request in forked workers: `crash` kills the
+    worker outright, `hang` never finishes."""
+    if request.get("file_path") == "crash":
+        os._exit(3)
+    if request.get("file_path") == "hang":
+        time.sleep(60)
+    return {"report_name": request.get("file_path")}
+
+
+_needs_fork = unittest.skipUnless(
+    multiprocessing.get_start_method() == "fork", "patched handler only reaches forked workers"
+)
+
+
+class EmbeddedParserServeTest(unittest.TestCase):
+    def test_parse_report_matches_cli_payload_shape(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as handle:
+            with mock.patch.object(
+                embedded_parser, "extract_pages_from_file", return_value=["检验目的: 血常规"]
+            ):
+                payload = embedded_parser.parse_report(handle.name, "application/pdf", "", "blood.pdf")
+        self.assertEqual(payload["provider"], embedded_parser.PROVIDER)
+        self.assertEqual(payload["report_name"], "blood.pdf")
+        self.assertIsNone(payload["document_type_hint"])
+        self.assertEqual(payload["extracted_text"], "检验目的: 血常规")
+        self.assertEqual(payload["page_count"], 1)
+        self.assertIn("fshd", payload["analysis"])
+
+    def test_serve_inline_answers_each_request_with_its_id(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as handle:
+            with mock.patch.object(embedded_parser, "extract_pages_from_file", return_value=["报告"]):
+                messages = _serve(
+                    [
+                        json.dumps({"id": "a", "file_path": handle.name, "report_name": "a.pdf"}),
+                        "",
+                        "not json",
+                        json.dumps({"id": "b", "file_path": "/nonexistent/report.pdf"}),
+                    ]
+                )
+        self.assertEqual(messages[0], {"event": "ready", "workers": 0})
+        by_id = {message["id"]: message["result"] for message in messages[1:]}
+        self.assertEqual(by_id["a"]["report_name"], "a.pdf")
+        self.assertEqual(by_id[None]["error"], "invalid_request")
+        self.assertEqual(by_id["b"]["error"], "embedded_report_parse_failed")
+
+    def test_serve_rejects_non_boolean_multi_section(self):
+        with mock.patch.object(embedded_parser, "parse_report") as parse:
+            messages = _serve([json.dumps({"id": "a", "file_path": "x.pdf", "multi_section": "false"})])
+        self.assertEqual(messages[1]["result"]["error"], "invalid_request")
+        parse.assert_not_called()
+
+    def test_serve_pool_drains_in_flight_requests_on_eof(self):
+        requests = [
+            json.dumps({"id": str(i), "file_path": f"/nonexistent/{i}.pdf"}) for i in range(5)
+        ]
+        messages = _serve(requests, workers=2)
+        self.assertEqual(messages[0], {"event": "ready", "workers": 2})
+        results = {message["id"]: message["result"] for message in messages[1:]}
+        self.assertEqual(sorted(results), [str(i) for i in range(5)])
+        for result in results.values():
+            self.assertEqual(result["error"], "embedded_report_parse_failed")
+            self.assertIn("Input file not found", result["detail"])
+
+    @_needs_fork
+    def test_serve_pool_answers_and_replaces_a_dead_worker(self):
+        requests = [json.dumps({"id": "1", "file_path": "crash"}), json.dumps({"id": "2", "file_path": "ok"})]
+        with mock.patch.object(embedded_parser, "_handle_request", _scripted_handle):
+            messages = _serve(requests, workers=1)
+        results = {message["id"]: message["result"] for message in messages[1:]}
+        self.assertEqual(results["1"]["error"], "embedded_report_worker_died")
+        self.assertIn("code 3", results["1"]["detail"])
+        self.assertEqual(results["2"], {"report_name": "ok"})
+
+    @_needs_fork
+    def test_serve_pool_cancel_frees_the_worker(self):
+        requests = [
+            json.dumps({"id": "slow", "file_path": "hang"}),
+            json.dumps({"id": "slow", "cancel": True}),
+            json.dumps({"id": "next", "file_path": "ok"}),
+        ]
+        started = time.monotonic()
+        with mock.patch.object(embedded_parser, "_handle_request", _scripted_handle):
+            messages = _serve(requests, workers=1)
+        self.assertLess(time.monotonic() - started, 30)
+        results = {message["id"]: message["result"] for message in messages[1:]}
+        self.assertEqual(results["slow"]["error"], "embedded_report_parse_cancelled")
+        self.assertEqual(results["next"], {"report_name": "ok"})
+
+
+if __name__ == "__main__":
+    unittest.main()
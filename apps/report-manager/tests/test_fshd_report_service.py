@@ -1,5 +1,8 @@
+import random
 import unittest
+from unittest import mock
 
+from app.services import fshd_report_service
 from app.services.fshd_report_service import analyze_fshd_report
 
 
@@ -282,5 +285,185 @@ class FshdReportServiceCoverageTest(unittest.TestCase):
         self.assertEqual(panel["stool_occult_blood"], "阴性(-)")
 
 
+class SourcePageTest(unittest.TestCase):
+    PAGES = [
+        "福建医科大学附属第一医院\n出院小结\n",
+        "福建医科大学附属第一医院检验报告单\n检验目的: 血常规\n白细胞计数(WBC) 6.69 3.5-9.5\n",
+        "血红蛋白量(HGB) 155 130-175\n血小板计数(PLT) 249 125-350\n",
+    ]
+
+    def test_fields_get_page_numbers(self):
+        result = analyze_fshd_report("\n".join(self.PAGES), "other", "blood.pdf", page_texts=self.PAGES)
+        pages = {item["field_name"]: item["source_page"] for item in result["fshd"]["structured_fields"]}
+        self.assertEqual(pages["wbc"], 2)
+        self.assertEqual(pages["hgb"], 3)
+        self.assertEqual(pages["plt"], 3)
+        self.assertNotIn(
+            "source_page unavailable in embedded OCR mode; source_text is preserved for review.",
+            result["quality_control"]["normalization_warnings"],
+        )
+
+    def test_without_pages_source_page_stays_unavailable(self):
+        result = analyze_fshd_report("\n".join(self.PAGES), "other", "blood.pdf")
+        self.assertTrue(
+            all(item["source_page"] is None for item in result["fshd"]["structured_fields"])
+        )
+        self.assertEqual(len(result["quality_control"]["normalization_warnings"]), 1)
+
+
+class MultiSectionTest(unittest.TestCase):
+    HEADER = "福建医科大学附属第一医院检验报告单\n姓名: 陈明 性别: 男 年龄: 32岁\n"
+    SECTIONS = [
+        (
+            "biochemistry",
+            "检验目的: 生化全套检查\n谷丙转氨酶(ALT) 35 9-50\n肌酸激酶(CK) 812 ↑ 50-310\n"
+            "肌酐(CREA) 61 57-97\n总胆固醇(TCHO) 4.1 3.0-5.18\n甘油三酯(TG) 1.2 0-1.7\n",
+        ),
+        (
+            "blood_routine",
+            "检验目的: 血常规\n白细胞计数(WBC) 6.69 3.5-9.5\n血红蛋白量(HGB) 155 130-175\n"
+            "血小板计数(PLT) 249 125-350\n",
+        ),
+        (
+            "thyroid_function",
+            "检验目的: FT3、FT4、STSH\n游离T3(FT3) 4.8 3.5-6.59\n游离T4(FT4) 15.2 11.5-22.7\n"
+            "超敏促甲状腺素(TSH3) 1.9 0.55-4.78\n",
+        ),
+    ]
+
+    def _combined(self):
+        return "".join(self.HEADER + body for _, body in self.SECTIONS)
+
+    def test_combined_printout_runs_every_section_extractor(self):
+        result = analyze_fshd_report(self._combined(), None, "combined.pdf", multi_section=True)
+        expected_types = [report_type for report_type, _ in self.SECTIONS]
+
+        self.assertEqual(result["document_classification"]["report_types"], expected_types)
+        sections = result["fshd"]["sections"]
+        self.assertEqual([section["report_type"] for section in sections], expected_types)
+
+        fields = result["fshd"]["structured_fields"]
+        for index, (report_type, body) in enumerate(self.SECTIONS):
+            single = analyze_fshd_report(self.HEADER + body, None, "single.pdf")
+            self.assertEqual(single["fshd"]["report_type"], report_type)
+            section_fields = [field for field in fields if field["source_section"]["index"] == index]
+            self.assertEqual(
+                [(field["field_name"], field["field_value"]) for field in section_fields],
+                [(field["field_name"], field["field_value"]) for field in single["fshd"]["structured_fields"]],
+            )
+            self.assertEqual(sections[index]["field_count"], len(section_fields))
+            self.assertTrue(all(field["source_section"]["report_type"] == report_type for field in section_fields))
+
+        self.assertTrue(
+            all("source_section" in item["source_evidence"] for item in result["observations"])
+        )
+        self.assertEqual(result["patient_info"]["name"], "陈明")
+
+    def test_single_report_matches_default_mode(self):
+        text = self.HEADER + self.SECTIONS[1][1]
+        default = analyze_fshd_report(text, "blood_panel", "blood.jpeg")
+        multi = analyze_fshd_report(text, "blood_panel", "blood.jpeg", multi_section=True)
+
+        self.assertEqual(len(multi["fshd"].pop("sections")), 1)
+        for field in multi["fshd"]["structured_fields"]:
+            self.assertEqual(field.pop("source_section"), {"index": 0, "report_type": "blood_routine"})
+        for item in multi["observations"]:
+            item["source_evidence"].pop("source_section")
+        self.assertEqual(multi, default)
+
+    def test_unmatched_document_type_takes_lead_section_classification(self):
+        real_classify = fshd_report_service._classify_report
+
+        def classify(text, document_type_hint=None, report_name=None):
+            if report_name == "combined.pdf":
+                return "muscle_enzyme", 0.55, ["肌酸激酶"]
+            return real_classify(text, document_type_hint, report_name)
+
+        with mock.patch.object(fshd_report_service, "_classify_report", side_effect=classify):
+            result = analyze_fshd_report(self._combined(), None, "combined.pdf", multi_section=True)
+
+        lead = result["fshd"]["sections"][0]
+        self.assertEqual(result["fshd"]["report_type"], "biochemistry")
+        self.assertEqual(result["fshd"]["report_type_confidence"], lead["confidence"])
+        self.assertEqual(result["fshd"]["classification_reasons"], lead["classification_reasons"])
+        self.assertEqual(result["document_classification"]["confidence"], lead["confidence"])
+
+    def test_default_mode_ignores_other_sections(self):
+        result = analyze_fshd_report(self._combined(), None, "combined.pdf")
+        self.assertEqual(len(result["document_classification"]["report_types"]), 1)
+        self.assertNotIn("sections", result["fshd"])
+        self.assertTrue(all("source_section" not in field for field in result["fshd"]["structured_fields"]))
+
+
+class ExtractionEngineTest(unittest.TestCase):
+    def test_keyword_automaton_matches_substring_checks(self):
+        keywords = ["ck", "ckmb", "ck-mb", "hdl", "hdl-c", "vldl", "ldl", "p", "磷", "无机磷", "a/g"]
+        scanner = fshd_report_service._KeywordAutomaton(keywords)
+        rng = random.Random(3)
+        alphabet = "ckmbhdlv-pa/g 无机磷x"
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 24)))
+            self.assertEqual(scanner.scan(text), {k for k in keywords if k in text}, text)
+
+    def test_classify_report_matches_rule_loop(self):
+        def legacy(text, hint, name):
+            normalized = fshd_report_service._normalized_search_text(f"{name}\n{text}" if name else text)
+            mapped = {"mri": "muscle_mri", "genetic_report": "genetic_report", "blood_panel": "biochemistry", "other": "other"}.get(
+                (hint or "").strip().lower(), ""
+            )
+            scores, reasons = {}, {}
+            for report_type, rules in fshd_report_service.REPORT_TYPE_RULES.items():
+                score, matched = 0, []
+                for keyword, weight in rules:
+                    if keyword.lower() in normalized:
+                        score += weight
+                        matched.append(keyword)
+                if mapped and report_type == mapped:
+                    score += 2
+                    matched.append(f"hint:{hint}")
+                if score > 0:
+                    scores[report_type] = score
+                    reasons[report_type] = matched
+            return scores, reasons
+
+        keywords = [keyword for rules in fshd_report_service.REPORT_TYPE_RULES.values() for keyword, _ in rules]
+        rng = random.Random(11)
+        for _ in range(300):
+            text = " ".join(rng.choice(keywords + ["噪声", "xx", "\n"]) for _ in range(rng.randint(0, 6)))
+            hint = rng.choice([None, "", "mri", "blood_panel", "genetic_report", "other", " MRI "])
+            name = rng.choice([None, "", rng.choice(keywords)])
+            scores, reasons = legacy(text, hint, name)
+            report_type, confidence, matched = fshd_report_service._classify_report(text, hint, name)
+            if not scores:
+                self.assertEqual((report_type, confidence), ("other", 0.45))
+                continue
+            best = max(scores, key=scores.get)
+            if best == "biochemistry" and scores.get("muscle_enzyme", 0) >= scores[best] - 1:
+                best = "muscle_enzyme"
+            self.assertEqual(report_type, best, text)
+            self.assertEqual(matched, reasons[best], text)
+
+    def test_search_windows_match_plain_line_scan(self):
+        rng = random.Random(5)
+        fragments = ["姓名:", "王芳", "性", "别: 女", "年龄: 34岁", "病历号: A-77", "科室: 神经内科", "床号: 12", "诊", "断: FSHD", "本: 血清", "x"]
+        patterns = [
+            fshd_report_service._RE_PATIENT_NAME_LINE,
+            fshd_report_service._RE_PATIENT_SEX_LINE,
+            fshd_report_service._RE_DIAGNOSIS_LINE,
+            fshd_report_service._RE_SPECIMEN_LINE,
+            fshd_report_service._RE_BED_LINE,
+        ]
+        for _ in range(200):
+            lines = ["".join(rng.sample(fragments, rng.randint(1, 3))) for _ in range(rng.randint(1, 8))]
+            windows = fshd_report_service._SearchWindows(lines)
+            for pattern in patterns:
+                expected, _ = fshd_report_service._find_line_regex(windows.windows, [pattern])
+                actual = windows.first_match(pattern)
+                self.assertEqual(
+                    expected.group(0) if expected else None,
+                    actual.group(0) if actual else None,
+                )
+
+
 if __name__ == "__main__":
     unittest.main()
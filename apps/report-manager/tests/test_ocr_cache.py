@@ -0,0 +1,125 @@
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import embedded_parser
+from app.services import ocr_cache
+from app.services.ocr_cache import OcrCache
+
+
+class OcrCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        patcher = mock.patch.object(ocr_cache, "_engine_id", "v2|paddle=off|tesseract=5.3.0")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_pages_round_trip_and_count_hits(self):
+        cache = OcrCache(self.root)
+        self.assertIsNone(cache.get_pages("a" * 64, "application/pdf"))
+        cache.put_pages("a" * 64, "application/pdf", ["第一页", "第二页"])
+        self.assertEqual(cache.get_pages("a" * 64, "application/pdf"), ["第一页", "第二页"])
+        stats = cache.stats()
+        self.assertEqual(stats["text"]["hits"], 1)
+        self.assertEqual(stats["text"]["misses"], 1)
+        self.assertEqual(stats["text"]["entries"], 1)
+
+    def test_engine_change_misses(self):
+        cache = OcrCache(self.root)
+        cache.put_pages("a" * 64, "application/pdf", ["旧引擎"])
+        with mock.patch.object(ocr_cache, "_engine_id", "v2|paddle=2.7.3|tesseract=5.3.0"):
+            self.assertIsNone(cache.get_pages("a" * 64, "application/pdf"))
+
+    def test_multi_section_analysis_is_cached_separately(self):
+        cache = OcrCache(self.root)
+        cache.put_analysis("a" * 64, "application/pdf", "", "a.pdf", {"mode": "single"})
+        cache.put_analysis("a" * 64, "application/pdf", "", "a.pdf", {"mode": "multi"}, True)
+        self.assertEqual(cache.get_analysis("a" * 64, "application/pdf", "", "a.pdf"), {"mode": "single"})
+        self.assertEqual(
+            cache.get_analysis("a" * 64, "application/pdf", "", "a.pdf", True), {"mode": "multi"}
+        )
+
+    def test_evicts_least_recently_read(self):
+        cache = OcrCache(self.root, max_bytes=60)
+        cache.put_pages("a" * 64, "application/pdf", ["x" * 20])
+        time.sleep(0.01)
+        cache.put_pages("b" * 64, "application/pdf", ["y" * 20])
+        time.sleep(0.01)
+        cache.get_pages("a" * 64, "application/pdf")
+        time.sleep(0.01)
+        cache.put_pages("c" * 64, "application/pdf", ["z" * 20])
+        self.assertIsNotNone(cache.get_pages("a" * 64, "application/pdf"))
+        self.assertIsNone(cache.get_pages("b" * 64, "application/pdf"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_purge_by_digest_and_cli(self):
+        cache = OcrCache(self.root)
+        cache.put_pages("a" * 64, "application/pdf", ["a"])
+        cache.put_analysis("a" * 64, "application/pdf", "", "a.pdf", {"fshd": {}})
+        cache.put_pages("b" * 64, "application/pdf", ["b"])
+        self.assertEqual(cache.purge(content_sha="a" * 64), 2)
+        self.assertIsNotNone(cache.get_pages("b" * 64, "application/pdf"))
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            ocr_cache.main(["--cache-dir", self.root, "purge", "--all"])
+        self.assertEqual(json.loads(out.getvalue()), {"removed": 1})
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_deleted_report_entries_expire_and_are_removed(self):
+        """Deletion never reaches the cache, so a removed report's text
+        and analysis must be gone once they are older than the max age,
+        even if nothing reads them again."""
+        cache = OcrCache(self.root, max_age_seconds=3600)
+        cache.put_pages("a" * 64, "application/pdf", ["姓名: 张三 身份证号: 110101"])
+        cache.put_analysis("a" * 64, "application/pdf", "", "a.pdf", {"diagnosis": "FSHD1"})
+        self.assertIsNotNone(cache.get_pages("a" * 64, "application/pdf"))
+
+        later = time.time() + 3601
+        with mock.patch.object(ocr_cache.time, "time", return_value=later):
+            self.assertIsNone(cache.get_pages("a" * 64, "application/pdf"))
+            self.assertEqual(cache.expire(), 1)
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 0)
+        self.assertEqual(stats["expired"], 2)
+        with sqlite3.connect(cache.path) as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM entries WHERE payload LIKE '%张三%' OR payload LIKE '%FSHD1%'")
+            self.assertEqual(rows.fetchone()[0], 0)
+
+    def test_writes_sweep_expired_entries(self):
+        cache = OcrCache(self.root, max_age_seconds=3600)
+        cache.put_pages("a" * 64, "application/pdf", ["旧报告"])
+        with mock.patch.object(ocr_cache.time, "time", return_value=time.time() + 3601):
+            cache.put_pages("b" * 64, "application/pdf", ["新报告"])
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_parse_report_skips_ocr_and_analysis_on_repeat_upload(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as handle:
+            handle.write(b"%PDF-1.4 same bytes")
+            handle.flush()
+            with mock.patch.dict(os.environ, {"OCR_CACHE_DIR": self.root}), mock.patch.object(
+                embedded_parser, "extract_pages_from_file", return_value=["检验目的: 血常规"]
+            ) as extract, mock.patch.object(
+                embedded_parser, "analyze_fshd_report", return_value={"fshd": {"report_type": "blood_routine"}}
+            ) as analyze:
+                first = embedded_parser.parse_report(handle.name, "application/pdf", "", "blood.pdf")
+                second = embedded_parser.parse_report(handle.name, "application/pdf", "", "blood.pdf")
+                stats = ocr_cache.default_cache().stats()
+        self.assertEqual(first, second)
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(analyze.call_count, 1)
+        self.assertEqual(stats["text"]["hits"], 1)
+        self.assertEqual(stats["analysis"]["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import threading
+import unittest
+from unittest import mock
+
+from app.services import ocr_service
+
+
+class _FakePage:
+    def __init__(self, number):
+        self.number = number
+
+
+class OcrPdfPagesTest(unittest.TestCase):
+    def setUp(self):
+        self.raster_calls = []
+        self.alive = 0
+        self.peak_alive = 0
+        self.lock = threading.Lock()
+
+    def _convert(self, path, dpi, first_page, last_page, thread_count):
+        self.raster_calls.append((first_page, last_page))
+        with self.lock:
+            self.alive += last_page - first_page + 1
+            self.peak_alive = max(self.peak_alive, self.alive)
+        return [_FakePage(n) for n in range(first_page, last_page + 1)]
+
+    def _tesseract(self, image, lang):
+        with self.lock:
+            self.alive -= 1
+        return f"page {image.number}\n"
+
+    def _run(self, page_count, paddle=lambda image: ""):
+        with mock.patch.object(ocr_service, "convert_from_path", self._convert), mock.patch.object(
+            ocr_service.pytesseract, "image_to_string", self._tesseract
+        ), mock.patch.object(ocr_service, "_paddle_image_to_string", paddle), mock.patch.object(
+            ocr_service, "_OCR_PAGE_WORKERS", 2
+        ), mock.patch.object(ocr_service, "_OCR_RASTER_BATCH", 2), mock.patch.object(
+            ocr_service, "_OCR_MAX_IN_FLIGHT", 4
+        ):
+            return [text for _, text in ocr_service._ocr_pdf_pages("scan.pdf", range(1, page_count + 1))]
+
+    def test_pages_come_back_in_order(self):
+        pages = self._run(30)
+        self.assertEqual(pages, [f"page {n}\n" for n in range(1, 31)])
+        self.assertEqual(self.raster_calls[:2], [(1, 2), (3, 4)])
+        self.assertEqual(len(self.raster_calls), 15)
+
+    def test_rasterises_lazily(self):
+        self._run(30)
+        # in-flight cap plus at most one freshly rasterised batch
+        self.assertLessEqual(self.peak_alive, 6)
+
+    def test_paddle_text_skips_tesseract(self):
+        pages = self._run(3, paddle=lambda image: "paddle" if image.number == 2 else "")
+        self.assertEqual(pages, ["page 1\n", "paddle\n", "page 3\n"])
+
+
+class _FakeTextPage:
+    def __init__(self, text):
+        self.text = text
+
+    def extract_text(self):
+        return self.text
+
+
+class PerPageRoutingTest(unittest.TestCase):
+    TYPED = "福建医科大学附属第一医院 出院小结 " * 4
+
+    def _extract(self, layer_texts, ocr_pages):
+        ocr_calls = []
+
+        def fake_ocr(path, page_numbers):
+            ocr_calls.append(list(page_numbers))
+            for number in page_numbers:
+                yield number, ocr_pages.get(number, "")
+
+        reader = mock.Mock(pages=[_FakeTextPage(text) for text in layer_texts])
+        with mock.patch("builtins.open", mock.mock_open(read_data=b"")), mock.patch.object(
+            ocr_service.PyPDF2, "PdfReader", return_value=reader
+        ), mock.patch.object(ocr_service, "_ocr_pdf_pages", fake_ocr):
+            pages = ocr_service.extract_pages_from_pdf("mixed.pdf")
+        return pages, ocr_calls
+
+    def test_only_pages_without_text_layer_are_ocred(self):
+        pages, ocr_calls = self._extract(
+            [self.TYPED, "", self.TYPED, "  3  "],
+            {2: "肌酸激酶 CK 812 U/L\n", 4: "肌红蛋白 MB 95\n"},
+        )
+        self.assertEqual(ocr_calls, [[2, 4]])
+        self.assertEqual(pages, [self.TYPED, "肌酸激酶 CK 812 U/L\n", self.TYPED, "肌红蛋白 MB 95\n"])
+
+    def test_empty_ocr_keeps_text_layer(self):
+        pages, _ = self._extract(["第1页"], {})
+        self.assertEqual(pages, ["第1页"])
+
+    def test_fully_typed_pdf_skips_ocr(self):
+        _, ocr_calls = self._extract([self.TYPED, self.TYPED], {})
+        self.assertEqual(ocr_calls, [[]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+-- 015_kb_corpus_version.sql
+-- Monotonic version counter for the medical KB corpus.
+--
+-- The KB service caches whole `search_multi` results (see
+-- apps/api/knowledge.py RetrievalResultCache) and needs a cheap way to
+-- notice that the corpus changed underneath it. Every statement that
+-- writes kb_chunks -- kb-ingest upserts and stale-cleanup, --prune,
+-- the Chroma import, a manual psql fix -- bumps the single row here
+-- through a statement-level trigger, so no writer can forget to
+-- invalidate. Readers poll one tiny row instead of max(updated_at)
+-- over the whole table (which also misses DELETEs).
+
+CREATE TABLE IF NOT EXISTS kb_corpus_version (
+  id          SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version     BIGINT NOT NULL DEFAULT 0,
+  updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO kb_corpus_version (id, version)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION kb_bump_corpus_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE kb_corpus_version
+  SET version = version + 1,
+      updated_at = NOW()
+  WHERE id = 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS kb_chunks_bump_corpus_version ON kb_chunks;
+CREATE TRIGGER kb_chunks_bump_corpus_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON kb_chunks
+FOR EACH STATEMENT
+EXECUTE PROCEDURE kb_bump_corpus_version();
@@ -0,0 +1,3 @@
+DROP TRIGGER IF EXISTS kb_chunks_bump_corpus_version ON kb_chunks;
+DROP FUNCTION IF EXISTS kb_bump_corpus_version();
+DROP TABLE IF EXISTS kb_corpus_version;
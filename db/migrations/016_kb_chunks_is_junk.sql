@@ -0,0 +1,16 @@
+-- 016_kb_chunks_is_junk.sql
+-- Ingest-time junk verdict per chunk.
+--
+-- Whether a chunk is navigation / boilerplate / too short is a static
+-- property of its content (rule: apps/api/kb_text.py). kb-ingest now
+-- evaluates it once per chunk and stores it here, so the pgvector
+-- query can drop junk inside the LATERAL subquery -- where it would
+-- otherwise eat into fetch_k -- instead of the KB service re-running
+-- the regex on every retrieved row of every request.
+--
+-- NULL means "not evaluated" (rows ingested before this migration).
+-- The query filter is `is_junk IS NOT TRUE`, so those rows stay
+-- retrievable and keep the runtime check until their file is next
+-- re-ingested.
+
+ALTER TABLE kb_chunks ADD COLUMN IF NOT EXISTS is_junk BOOLEAN;
@@ -0,0 +1 @@
+ALTER TABLE kb_chunks DROP COLUMN IF EXISTS is_junk;
@@ -0,0 +1,30 @@
+-- kb_quantized_binary.sql  (opt-in, NOT applied by `npm run db:migrate`)
+-- Binary-quantized coarse-search index for KB_PG_QUANTIZED=binary
+-- (pgvector >= 0.7).
+--
+-- Apply by hand only on deployments that set KB_PG_QUANTIZED=binary:
+--
+--   psql "$DATABASE_URL" -f db/optional/kb_quantized_binary.sql
+--
+-- One sign bit per dimension, ranked by Hamming distance: 1/32 of 006's
+-- index size, but coarser, so it needs a larger KB_PG_RESCORE_FACTOR
+-- than halfvec. PgVectorBackend re-ranks the candidates with the exact
+-- `embedding <=> query` distance read from the heap. The expression
+-- must match _COARSE_ORDER_SQL["binary"] in
+-- apps/api/kb_backends/pgvector.py.
+--
+-- Measure recall first: `npm run kb:bench -- quantized`. The memory win
+-- only lands once 006's full-precision index is dropped:
+--
+--   DROP INDEX CONCURRENTLY IF EXISTS kb_chunks_embedding_hnsw;
+--
+-- After that, KB_PG_QUANTIZED=off has no ANN index to use and every
+-- search becomes an exact sequential scan over kb_chunks (the backend
+-- logs a warning at startup). Recreate 006's kb_chunks_embedding_hnsw
+-- before switching back to off.
+--
+-- CONCURRENTLY keeps kb_chunks writable during the build; it cannot run
+-- inside a transaction, so don't wrap this file in BEGIN / COMMIT.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kb_chunks_embedding_bit_hnsw
+  ON kb_chunks USING hnsw ((binary_quantize(embedding)::bit(1024)) bit_hamming_ops);
@@ -0,0 +1 @@
+DROP INDEX CONCURRENTLY IF EXISTS kb_chunks_embedding_bit_hnsw;
@@ -0,0 +1,29 @@
+-- kb_quantized_halfvec.sql  (opt-in, NOT applied by `npm run db:migrate`)
+-- Float16 coarse-search index for KB_PG_QUANTIZED=halfvec (pgvector >= 0.7).
+--
+-- Apply by hand only on deployments that set KB_PG_QUANTIZED=halfvec:
+--
+--   psql "$DATABASE_URL" -f db/optional/kb_quantized_halfvec.sql
+--
+-- PgVectorBackend walks this index, takes KB_PG_RESCORE_FACTOR x fetch_k
+-- candidates and re-ranks them with the exact `embedding <=> query`
+-- distance read from the heap, so results keep full-precision ordering.
+-- It is an expression index: the table gains no column, and the index
+-- holds 2 bytes/dim instead of 006's 4. The expression must match
+-- _COARSE_ORDER_SQL["halfvec"] in apps/api/kb_backends/pgvector.py.
+--
+-- Measure recall first: `npm run kb:bench -- quantized`. The memory win
+-- only lands once 006's full-precision index is dropped:
+--
+--   DROP INDEX CONCURRENTLY IF EXISTS kb_chunks_embedding_hnsw;
+--
+-- After that, KB_PG_QUANTIZED=off has no ANN index to use and every
+-- search becomes an exact sequential scan over kb_chunks (the backend
+-- logs a warning at startup). Recreate 006's kb_chunks_embedding_hnsw
+-- before switching back to off.
+--
+-- CONCURRENTLY keeps kb_chunks writable during the build; it cannot run
+-- inside a transaction, so don't wrap this file in BEGIN / COMMIT.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kb_chunks_embedding_half_hnsw
+  ON kb_chunks USING hnsw ((embedding::halfvec(1024)) halfvec_cosine_ops);
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the KB retrieval / ingest hot paths.
+
+Each subcommand times one stage in isolation on synthetic data so a
+change to that stage can be compared against the implementation it
+replaced without a database, a model download or a real corpus.
+
+Examples
+--------
+  python scripts/kb-bench.py merge
+  python scripts/kb-bench.py merge --fetch-k 80,400 --queries 6 --repeat 200
+  DATABASE_URL=postgres://... python scripts/kb-bench.py upsert --chunks 12000
+  python scripts/kb-bench.py pdf --pages 100,400
+  DATABASE_URL=postgres://... python scripts/kb-bench.py quantized --rescore 2,4,8
+
+`upsert` is the exception: it needs DATABASE_URL and writes to a
+scratch copy of kb_chunks (`kb_bench_chunks`), dropped afterwards.
+`quantized` also needs DATABASE_URL, but only reads the live kb_chunks
+(with db/optional/kb_quantized_<mode>.sql applied) so recall is measured on real vectors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+sys.path.insert(0, str(ROOT / "apps" / "api"))
+
+import knowledge  # noqa: E402
+from kb_backends.base import QueryHit  # noqa: E402
+
+
+def _time_it(fn: Callable[[], Any], repeat: int) -> float:
+    """Best-of-`repeat` wall time in milliseconds. Best-of rather than
+    mean so a GC pause or a noisy neighbour doesn't skew the ratio."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+# --------------------------------------------------------------------- merge
+
+_SENTENCE = "面肩肱型肌营养不良症（FSHD）患者的肩胛带无力通常不对称，需要长期随访评估。"
+
+
+def _synthetic_hits(n_queries: int, fetch_k: int, seed: int) -> List[List[QueryHit]]:
+    """Shape the hits like a real pgvector response: every query sees
+    a heavily overlapping candidate set from ~40 source files, chunks
+    are a few hundred characters, and every hit carries the ingest
+    fingerprint."""
+    rng = random.Random(seed)
+    pool_size = max(fetch_k * 2, 100)
+    pool = []
+    for i in range(pool_size):
+        source = f"category/source-{i % 40}.pdf"
+        content = f"[page {i}]\n" + _SENTENCE * rng.randint(4, 12)
+        fingerprint = hashlib.sha256(f"{source}:{i}".encode()).hexdigest()[:32]
+        pool.append((content, source, fingerprint))
+
+    out: List[List[QueryHit]] = []
+    for _ in range(n_queries):
+        picked = rng.sample(pool, fetch_k)
+        hits = [
+            QueryHit(
+                content=content,
+                metadata={"source_file": source, "category": "category"},
+                distance=rng.uniform(0.2, 0.9),
+                fingerprint=fingerprint,
+                source_file=source,
+            )
+            for content, source, fingerprint in picked
+        ]
+        hits.sort(key=lambda h: h.distance)
+        out.append(hits)
+    return out
+
+
+def _legacy_merge(
+    queries: List[str],
+    per_query_hits: List[List[QueryHit]],
+    final_n: int,
+    max_per_source: int,
+) -> List[Dict[str, Any]]:
+    """Steps 3-5 of search_multi as they were before the batched merge:
+    normalise + junk-scan + hash every hit, sort dicts, diversify."""
+    merged: List[Dict[str, Any]] = []
+    seen_fp: set[str] = set()
+    for qi, (q, hits) in enumerate(zip(queries, per_query_hits)):
+        for hit in hits:
+            text_norm = knowledge._norm_text(hit.content)
+            if knowledge._is_junk(text_norm):
+                continue
+            fp = hit.fingerprint or knowledge._fingerprint(text_norm)
+            if fp in seen_fp:
+                continue
+            seen_fp.add(fp)
+            merged.append(
+                {
+                    "content": text_norm,
+                    "metadata": hit.metadata or {},
+                    "distance": hit.distance,
+                    "_source_file": hit.source_file,
+                    "_hit_query": q,
+                    "_hit_query_i": qi,
+                }
+            )
+
+    def _dist_key(item: Dict[str, Any]) -> float:
+        d = item.get("distance")
+        return float(d) if d is not None else 1e9
+
+    merged.sort(key=_dist_key)
+
+    chosen: List[Dict[str, Any]] = []
+    per_source: Dict[str, int] = {}
+    for item in merged:
+        src = knowledge._get_source(item.get("metadata"), fallback=item.get("_source_file"))
+        if per_source.get(src, 0) >= max_per_source:
+            continue
+        chosen.append(item)
+        per_source[src] = per_source.get(src, 0) + 1
+        if len(chosen) >= final_n:
+            break
+    return chosen
+
+
+def bench_merge(args: argparse.Namespace) -> int:
+    fetch_ks = [int(x) for x in args.fetch_k.split(",") if x.strip()]
+    queries = [f"q{i}" for i in range(args.queries)]
+
+    print(f"merge/dedup/rank: queries={args.queries} final_n={args.final_n} "
+          f"max_per_source={args.max_per_source} repeat={args.repeat}")
+    print(f"  {'fetch_k':>8} {'hits':>6} {'legacy ms':>10} {'batched ms':>11} {'speedup':>8}")
+    for fetch_k in fetch_ks:
+        hits = _synthetic_hits(args.queries, fetch_k, seed=fetch_k)
+        legacy = _legacy_merge(queries, hits, args.final_n, args.max_per_source)
+        batched = knowledge._merge_and_select(queries, hits, args.final_n, args.max_per_source)
+        if legacy != batched:
+            print(f"  fetch_k={fetch_k}: batched merge diverged from legacy output", file=sys.stderr)
+            return 1
+
+        legacy_ms = _time_it(
+            lambda: _legacy_merge(queries, hits, args.final_n, args.max_per_source),
+            args.repeat,
+        )
+        batched_ms = _time_it(
+            lambda: knowledge._merge_and_select(queries, hits, args.final_n, args.max_per_source),
+            args.repeat,
+        )
+        print(
+            f"  {fetch_k:>8} {args.queries * fetch_k:>6} {legacy_ms:>10.3f} "
+            f"{batched_ms:>11.3f} {legacy_ms / batched_ms:>7.1f}x"
+        )
+    return 0
+
+
+# -------------------------------------------------------------------- upsert
+
+_BENCH_TABLE = "kb_bench_chunks"
+
+
+def _synthetic_chunks(n: int, dim: int, seed: int) -> List[Any]:
+    from kb_backends.base import BackendChunk
+
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(n):
+        source = f"category/source-{i // 40}.pdf"
+        chunks.append(
+            BackendChunk(
+                content=f"[page {i}]\n" + _SENTENCE * rng.randint(4, 12),
+                fingerprint=hashlib.sha256(f"bench:{i}".encode()).hexdigest()[:32],
+                source_file=source,
+                source_fingerprint=hashlib.sha256(source.encode()).hexdigest()[:32],
+                chunk_index=i % 40,
+                embedding=[rng.uniform(-1.0, 1.0) for _ in range(dim)],
+                metadata={"source_file": source, "category": "category", "title": f"doc {i // 40}"},
+                embed_model="bench",
+                is_junk=False,
+            )
+        )
+    return chunks
+
+
+def bench_upsert(args: argparse.Namespace) -> int:
+    import psycopg
+
+    from kb_backends.pgvector import EXPECTED_EMBED_DIM, UPSERT_MODES, PgVectorBackend
+
+    dsn = os.getenv("DATABASE_URL", "").strip()
+    if not dsn:
+        print("upsert benchmark needs DATABASE_URL", file=sys.stderr)
+        return 2
+
+    chunks = _synthetic_chunks(args.chunks, EXPECTED_EMBED_DIM, seed=args.chunks)
+    batches = [chunks[i : i + args.batch_size] for i in range(0, len(chunks), args.batch_size)]
+
+    print(f"upsert: chunks={args.chunks} batch_size={args.batch_size} table={_BENCH_TABLE}")
+    print(f"  {'mode':>6} {'insert s':>9} {'update s':>9} {'chunks/s':>9}")
+    try:
+        for mode in UPSERT_MODES:
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                conn.execute(f"DROP TABLE IF EXISTS {_BENCH_TABLE}")
+                # Indexes included: HNSW maintenance is part of the
+                # real upsert cost and identical for both modes.
+                conn.execute(
+                    f"CREATE TABLE {_BENCH_TABLE} (LIKE kb_chunks "
+                    f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES)"
+                )
+            backend = PgVectorBackend(
+                connection_string=dsn, table_name=_BENCH_TABLE, upsert_mode=mode
+            )
+            try:
+                timings = []
+                # Pass 1 inserts fresh rows, pass 2 hits ON CONFLICT.
+                for _ in range(2):
+                    started = time.perf_counter()
+                    for batch in batches:
+                        backend.upsert(batch)
+                    timings.append(time.perf_counter() - started)
+            finally:
+                backend.close()
+            print(
+                f"  {mode:>6} {timings[0]:>9.2f} {timings[1]:>9.2f} "
+                f"{args.chunks / timings[0]:>9.0f}"
+            )
+    finally:
+        with psycopg.connect(dsn, autocommit=True) as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_BENCH_TABLE}")
+    return 0
+
+
+# ----------------------------------------------------------------- quantized
+
+def bench_quantized(args: argparse.Namespace) -> int:
+    """Recall and latency of PgVectorBackend's quantized coarse search
+    (db/optional/kb_quantized_<mode>.sql) against exact brute force over kb_chunks.
+
+    Queries are stored chunk vectors plus Gaussian noise, so they land
+    near real content without needing the embedding model. Recall is
+    |returned ∩ exact top fetch_k| / fetch_k, averaged over queries;
+    the unquantized HNSW path is measured the same way as the baseline.
+    """
+    import numpy as np
+    import psycopg
+    from pgvector.psycopg import register_vector
+
+    from kb_backends.pgvector import QUANTIZED_MODES, PgVectorBackend
+
+    dsn = os.getenv("DATABASE_URL", "").strip()
+    if not dsn:
+        print("quantized benchmark needs DATABASE_URL", file=sys.stderr)
+        return 2
+
+    with psycopg.connect(dsn) as conn:
+        register_vector(conn)
+        has_junk = (
+            conn.execute(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'kb_chunks' AND column_name = 'is_junk'"
+            ).fetchone()
+            is not None
+        )
+        rows = conn.execute(
+            "SELECT fingerprint, embedding FROM kb_chunks WHERE embedding IS NOT NULL "
+            + ("AND is_junk IS NOT TRUE" if has_junk else "")
+        ).fetchall()
+        index_sizes = conn.execute(
+            "SELECT indexname, pg_relation_size(indexname::regclass) FROM pg_indexes "
+            "WHERE tablename = 'kb_chunks' AND indexname LIKE 'kb_chunks_embedding%' "
+            "ORDER BY indexname"
+        ).fetchall()
+    if len(rows) < args.fetch_k:
+        print(f"kb_chunks has only {len(rows)} searchable rows", file=sys.stderr)
+        return 2
+
+    fingerprints = [row[0] for row in rows]
+    corpus = np.stack([np.asarray(row[1], dtype=np.float32) for row in rows])
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    rng = np.random.default_rng(args.seed)
+    picks = rng.choice(len(rows), size=min(args.queries, len(rows)), replace=False)
+    queries = corpus[picks] + rng.normal(scale=args.noise, size=(len(picks), corpus.shape[1]))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    exact = np.argsort(-(queries @ corpus.T), axis=1)[:, : args.fetch_k]
+    truth = [{fingerprints[i] for i in row} for row in exact]
+
+    factors = [int(x) for x in args.rescore.split(",") if x.strip()]
+    runs = [("off", 1)] + [
+        (mode, factor) for mode in QUANTIZED_MODES if mode != "off" for factor in factors
+    ]
+    print(
+        f"quantized: rows={len(rows)} queries={len(picks)} per_call={args.per_call} "
+        f"fetch_k={args.fetch_k} noise={args.noise}"
+    )
+    print(f"  {'mode':>8} {'rescore':>8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, factor in runs:
+        backend = PgVectorBackend(connection_string=dsn, quantized=mode, rescore_factor=factor)
+        try:
+            if backend.quantized != mode:
+                print(f"  {mode:>8} {'-':>8}  skipped (db/optional/kb_quantized_{mode}.sql not applied)")
+                continue
+            latencies = []
+            recalls = []
+            for start in range(0, len(picks), args.per_call):
+                batch = queries[start : start + args.per_call]
+                started = time.perf_counter()
+                results = backend.query_ids_multi(batch.tolist(), fetch_k=args.fetch_k)
+                latencies.append((time.perf_counter() - started) * 1000.0)
+                for offset, candidates in enumerate(results):
+                    got = {candidate.fingerprint for candidate in candidates}
+                    recalls.append(len(got & truth[start + offset]) / args.fetch_k)
+        finally:
+            backend.close()
+        print(
+            f"  {mode:>8} {factor if mode != 'off' else '-':>8} {np.mean(recalls):>7.3f} "
+            f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f}"
+        )
+
+    print("  index sizes:")
+    for name, size in index_sizes:
+        print(f"    {name:<32} {size / (1024 * 1024):>8.1f} MiB")
+    return 0
+
+
+# ----------------------------------------------------------------------- pdf
+
+def _synthetic_pdf(path: Path, pages: int, lines_per_page: int = 40) -> None:
+    """Write a minimal born-digital PDF: `pages` pages of Helvetica
+    text, one content stream per page, with a correct xref table so
+    pdfminer takes the normal (non-repair) code path."""
+    objects: List[bytes] = []
+    page_ids: List[int] = []
+    # 1 = catalog, 2 = page tree, 3 = font; pages start at 4.
+    font_id = 3
+    for p in range(pages):
+        lines = [
+            f"Page {p + 1} line {i}: facioscapulohumeral muscular dystrophy follow-up notes."
+            for i in range(lines_per_page)
+        ]
+        body = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        content_id = 4 + 2 * p + 1
+        page_ids.append(4 + 2 * p)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        )
+        objects.append(
+            b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream"
+        )
+    header = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids ["
+            + " ".join(f"{pid} 0 R" for pid in page_ids)
+            + f"] /Count {pages} >>"
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(header + objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref_at = len(out)
+    out += f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def _legacy_pdf_text_layer(path: Path) -> Tuple[List[str], int]:
+    """PdfParser's text-layer pass before the single-pass extractor:
+    count pages, then one `extract_text_to_fp(page_numbers=[i])` per
+    page (each re-parsing the file), then `_page_count` once more."""
+    from io import StringIO
+
+    from pdfminer.high_level import extract_text_to_fp
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    def _count() -> int:
+        with path.open("rb") as fh:
+            return sum(1 for _ in PDFPage.create_pages(PDFDocument(PDFParser(fh))))
+
+    laparams = LAParams()
+    texts = []
+    for index in range(_count()):
+        buf = StringIO()
+        with path.open("rb") as fh:
+            extract_text_to_fp(fh, buf, laparams=laparams, page_numbers=[index], output_type="text")
+        texts.append(buf.getvalue().strip())
+    return texts, _count()
+
+
+def bench_pdf(args: argparse.Namespace) -> int:
+    import tempfile
+
+    sys.path.insert(0, str(HERE))
+    from kb_parsers import pdf_parser
+
+    def single_pass() -> Tuple[List[str], int]:
+        sections = pdf_parser._parse_text_layer(pdf_path)
+        return [s.text for s in sections], len(sections)
+
+    page_counts = [int(x) for x in args.pages.split(",") if x.strip()]
+    print(f"pdf text layer: repeat={args.repeat}")
+    print(f"  {'pages':>6} {'legacy s':>9} {'single s':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            pdf_path = Path(tmp) / f"synthetic-{pages}.pdf"
+            _synthetic_pdf(pdf_path, pages, args.lines)
+            if _legacy_pdf_text_layer(pdf_path) != single_pass():
+                print(f"  pages={pages}: single-pass text diverged from legacy", file=sys.stderr)
+                return 1
+            legacy_s = _time_it(lambda: _legacy_pdf_text_layer(pdf_path), args.repeat) / 1000.0
+            single_s = _time_it(single_pass, args.repeat) / 1000.0
+            print(f"  {pages:>6} {legacy_s:>9.2f} {single_s:>9.2f} {legacy_s / single_s:>7.1f}x")
+    return 0
+
+
+# ---------------------------------------------------------------------- main
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="KB micro-benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    merge = sub.add_parser("merge", help="search_multi merge/dedup/rank stage")
+    merge.add_argument("--fetch-k", default="80,400", help="Comma-separated fetch_k values")
+    merge.add_argument("--queries", type=int, default=6, help="Rewritten queries per ask")
+    merge.add_argument("--final-n", type=int, default=knowledge.DEFAULT_FINAL_N)
+    merge.add_argument("--max-per-source", type=int, default=knowledge.DEFAULT_MAX_PER_SOURCE)
+    merge.add_argument("--repeat", type=int, default=50)
+    merge.set_defaults(func=bench_merge)
+
+    upsert = sub.add_parser("upsert", help="PgVectorBackend.upsert, copy vs row (needs DATABASE_URL)")
+    upsert.add_argument("--chunks", type=int, default=2000)
+    upsert.add_argument(
+        "--batch-size", type=int, default=int(os.getenv("KB_INGEST_BATCH_SIZE", "32"))
+    )
+    upsert.set_defaults(func=bench_upsert)
+
+    quantized = sub.add_parser(
+        "quantized",
+        help="PgVectorBackend quantized coarse search + rescoring, recall/latency (needs DATABASE_URL)",
+    )
+    quantized.add_argument("--queries", type=int, default=300)
+    quantized.add_argument("--per-call", type=int, default=6, help="Queries per query_ids_multi call")
+    quantized.add_argument("--fetch-k", type=int, default=80)
+    quantized.add_argument("--rescore", default="2,4,8", help="Comma-separated rescore factors")
+    quantized.add_argument("--noise", type=float, default=0.02, help="Query perturbation stddev")
+    quantized.add_argument("--seed", type=int, default=0)
+    quantized.set_defaults(func=bench_quantized)
+
+    pdf = sub.add_parser("pdf", help="PdfParser text-layer extraction, legacy vs single pass")
+    pdf.add_argument("--pages", default="50,200", help="Comma-separated synthetic page counts")
+    pdf.add_argument("--lines", type=int, default=40, help="Text lines per synthetic page")
+    pdf.add_argument("--repeat", type=int, default=1)
+    pdf.set_defaults(func=bench_pdf)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Inspect, export and import the persistent chunk-embedding store.
+
+The store (KB_EMBED_STORE_PATH, see apps/api/embed_models/store.py)
+holds every embedding kb-ingest and kb-import-from-chroma computed,
+keyed by content hash and embed model. Exporting it from a warm
+environment and importing it into a cold one lets the cold side
+rebuild its KB without running the embedding model.
+
+Examples
+--------
+  python scripts/kb-embed-store.py stats
+  python scripts/kb-embed-store.py export kb-embeddings.npz
+  python scripts/kb-embed-store.py import kb-embeddings.npz
+  python scripts/kb-embed-store.py --store /data/embed-store import kb-embeddings.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+sys.path.insert(0, str(ROOT / "apps" / "api"))
+
+from embed_models.store import EmbeddingStore, export_store, import_store  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the persistent KB embedding store")
+    parser.add_argument(
+        "--store",
+        default=os.getenv("KB_EMBED_STORE_PATH", "").strip(),
+        help="Store root directory (default: KB_EMBED_STORE_PATH)",
+    )
+    parser.add_argument(
+        "--model",
+        default=os.getenv("KB_EMBED_MODEL", "BAAI/bge-m3").strip(),
+        help="Embed model whose rows to show/export (default: KB_EMBED_MODEL)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Row count, dimension and dtype of the model's store")
+    export_cmd = commands.add_parser("export", help="Write the model's rows to one .npz file")
+    export_cmd.add_argument("path")
+    import_cmd = commands.add_parser(
+        "import", help="Merge an exported .npz file (any model) into the store"
+    )
+    import_cmd.add_argument("path")
+    import_cmd.add_argument(
+        "--dtype",
+        choices=("float32", "float16"),
+        help="Storage dtype if the store does not exist yet (default: the file's)",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.store:
+        parser.error("no store directory: pass --store or set KB_EMBED_STORE_PATH")
+
+    if args.command == "import":
+        store, added = import_store(args.store, args.path, dtype=args.dtype)
+        print(f"Imported {added} new embeddings for {store.model_name} ({len(store)} stored)")
+        return 0
+
+    store = EmbeddingStore(args.store, args.model)
+    if args.command == "stats":
+        stats = store.stats()
+        print(f"Embedding store for {store.model_name}")
+        print(f"  path      : {stats['path']}")
+        print(f"  rows      : {stats['rows']}")
+        print(f"  dimension : {stats['dimension']}")
+        print(f"  dtype     : {stats['dtype']}")
+        return 0
+
+    rows = export_store(store, args.path)
+    print(f"Exported {rows} embeddings for {store.model_name} -> {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
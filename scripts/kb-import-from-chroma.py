@@ -3,7 +3,9 @@
 
 Pages through every document in CHROMA_COLLECTION, re-embeds it with
 the configured local embedder (KB_EMBED_MODEL, default BAAI/bge-m3),
-and upserts the result into the pgvector backend.
+and upserts the result into the pgvector backend. With
+KB_EMBED_STORE_PATH set, vectors already in the embedding store are
+reused instead of recomputed.
 
 Run this once when switching KB_BACKEND from chroma_cloud to pgvector.
 It is safe to re-run: chunks are keyed by a stable fingerprint, so
@@ -33,7 +35,8 @@ sys.path.insert(0, str(ROOT / "apps" / "api"))
 from kb_backends.chroma_cloud import ChromaCloudBackend  # noqa: E402
 from kb_backends.pgvector import PgVectorBackend  # noqa: E402
 from kb_backends.base import BackendChunk  # noqa: E402
-from embed_models import create_embedder  # noqa: E402
+from embed_models import create_ingest_embedder  # noqa: E402
+from kb_text import is_junk  # noqa: E402
 
 DEFAULT_BATCH_SIZE = int(os.getenv("KB_INGEST_BATCH_SIZE", "32"))
 
@@ -135,9 +138,10 @@ def import_from_chroma(
             source_key = _source_key(metadata, fallback=f"chroma_import/{str(doc_id)}")
             chunk_index = _safe_chunk_index(metadata, default=idx)
 
+            normalized = _normalize_for_hash(content)
             pending.append(
                 BackendChunk(
-                    content=_normalize_for_hash(content),
+                    content=normalized,
                     fingerprint=fp,
                     source_file=source_key,
                     source_fingerprint="chroma_import",
@@ -149,6 +153,9 @@ def import_from_chroma(
                         "chroma_id": str(doc_id),
                     },
                     embed_model=embedder.model_name,
+                    # --keep-junk imports everything; the flag still lets
+                    # the query path filter boilerplate server-side.
+                    is_junk=is_junk(normalized),
                 )
             )
 
@@ -218,7 +225,7 @@ def main() -> int:
 
     chroma = ChromaCloudBackend()
     pgvector_backend = PgVectorBackend()
-    embedder = create_embedder()
+    embedder = create_ingest_embedder()
 
     stats = import_from_chroma(
         chroma=chroma,
@@ -234,8 +241,13 @@ def main() -> int:
     print("Summary:")
     for key in ("fetched", "skipped_junk", "skipped_empty", "upserted", "batches"):
         print(f"  {key:<16}: {stats[key]}")
+    store_stats = embedder.stats().get("embedding_store")
+    if store_stats:
+        print(f"  {'store hits':<16}: {store_stats['hits']}")
+        print(f"  {'store added':<16}: {store_stats['appended']}")
 
     pgvector_backend.close()
+    embedder.close()
     return 0
 
 
@@ -5,11 +5,16 @@ Walks every supported source file under the content root (markdown,
 PDF, docx, image, html) and runs each through the matching parser in
 `scripts.kb_parsers`. Each parser returns one or more `ParsedSection`s
 which are then chunked, embedded with the configured Embedder, and
-upserted via the VectorBackend.
+upserted via the VectorBackend. Parsing, embedding and upserting run
+as concurrent stages joined by bounded queues, so chunks stream into
+the backend as files are parsed instead of after the whole corpus.
 
 The pipeline is idempotent: a per-file fingerprint (raw file bytes +
 parser version) is stored on every chunk, so rerunning only
-re-ingests files whose fingerprint changed.
+re-ingests files whose fingerprint changed. Within a changed file,
+chunks whose content is already stored under the same embed model keep
+their stored embedding, and rows that are identical are only re-tagged,
+so a small edit costs about as much as the diff.
 
 Examples
 --------
@@ -17,6 +22,7 @@ Examples
   python scripts/kb-ingest.py --dry-run
   python scripts/kb-ingest.py --source content/medical-kb/source/FSHD_知识库
   python scripts/kb-ingest.py --only .pdf,.docx
+  python scripts/kb-ingest.py --workers 8
 """
 
 from __future__ import annotations
@@ -26,12 +32,16 @@ import hashlib
 import json
 import logging
 import os
+import queue
 import re
 import sys
+import threading
 import unicodedata
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Sequence
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
 
 # pdfminer is noisy by default — it logs a "Could not get FontBBox"
 # warning for nearly every page of every academic PDF in the FSHD
@@ -48,7 +58,8 @@ sys.path.insert(0, str(HERE))
 
 from kb_backends import create_backend  # noqa: E402
 from kb_backends.base import BackendChunk, VectorBackend  # noqa: E402
-from embed_models import Embedder, create_embedder  # noqa: E402
+from embed_models import Embedder, create_ingest_embedder  # noqa: E402
+from kb_text import is_junk, norm_text  # noqa: E402
 from kb_parsers import (  # noqa: E402
     ALL_PARSERS,
     ParseResult,
@@ -72,6 +83,15 @@ DEFAULT_BACKEND = "pgvector"
 
 DEFAULT_BATCH_SIZE = int(os.getenv("KB_INGEST_BATCH_SIZE", "32"))
 
+#: Parser processes for `--workers`. 1 keeps the original in-process,
+#: one-file-at-a-time behaviour.
+DEFAULT_WORKERS = int(os.getenv("KB_INGEST_WORKERS", "1"))
+
+#: Batches buffered between the embed and upsert stages (and between
+#: the parse loop and the embedder). Enough to overlap the stages;
+#: small so a slow database can't pile up embedded vectors in memory.
+DEFAULT_QUEUE_DEPTH = int(os.getenv("KB_INGEST_QUEUE_DEPTH", "2"))
+
 #: Bumped when the chunker, parsers, or fingerprint logic changes in
 #: a way that would invalidate previously stored chunks. The
 #: per-file fingerprint includes this so a refactor invalidates the
@@ -330,6 +350,96 @@ def _chunk_sections(parse_result: ParseResult) -> List[RawChunk]:
     return chunks
 
 
+@dataclass
+class _PreparedChunk:
+    """Per-chunk output of the parse stage: everything the ingest loop
+    needs except the embedding, computed wherever the file was parsed."""
+
+    content: str
+    chunk_index: int
+    fingerprint: str
+    language: str
+    injection_hits: List[str]
+    is_junk: bool
+
+
+@dataclass
+class _ParsedFile:
+    """Result of `_parse_file`. `error` is the action-log detail when
+    the file could not be parsed; `chunks` is empty for empty files."""
+
+    error: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    chunks: List[_PreparedChunk] = field(default_factory=list)
+
+
+def _parse_file(file_path: Path, source_key: str) -> _ParsedFile:
+    """CPU-bound half of the per-file pipeline: parse, chunk, and scan
+    every chunk. Module-level and exception-free so it can run in a
+    `--workers` process and ship its result back by pickling."""
+    parser = get_parser_for(file_path)
+    if parser is None:
+        return _ParsedFile(error="parse failed: no parser for file type")
+    try:
+        parse_result = parser.parse(file_path)
+    except Exception as exc:
+        return _ParsedFile(error=f"parse failed: {exc}")
+    if parse_result.metadata.get("parse_error"):
+        return _ParsedFile(error=str(parse_result.metadata["parse_error"]))
+
+    chunks = [
+        _PreparedChunk(
+            content=raw.content,
+            chunk_index=raw.chunk_index,
+            fingerprint=chunk_fingerprint(source_key, raw.chunk_index, raw.content),
+            language=_detect_language(raw.content),
+            injection_hits=scan_for_injection_markers(raw.content),
+            is_junk=is_junk(norm_text(raw.content)),
+        )
+        for raw in _chunk_sections(parse_result)
+    ]
+    return _ParsedFile(metadata=dict(parse_result.metadata), chunks=chunks)
+
+
+def _parse_in_order(
+    jobs: Sequence[Optional[Tuple[Path, str]]],
+    workers: int,
+    max_in_flight: int,
+) -> Iterator[Optional[_ParsedFile]]:
+    """Yield `_parse_file` results parallel to `jobs` (None jobs yield
+    None), in job order whatever order the workers finish in, so the
+    action log and stats come out identical to a sequential run.
+
+    With `workers > 1` at most `max_in_flight` files are submitted
+    ahead of the one being consumed, which bounds how many parsed
+    files (full text + chunks) sit in memory at once.
+    """
+    if workers <= 1:
+        for job in jobs:
+            yield _parse_file(*job) if job is not None else None
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window: Deque[Optional[Future]] = deque()
+        submitted = 0
+        for _ in range(len(jobs)):
+            while submitted < len(jobs) and sum(f is not None for f in window) < max_in_flight:
+                job = jobs[submitted]
+                window.append(pool.submit(_parse_file, *job) if job is not None else None)
+                submitted += 1
+            future = window.popleft()
+            if future is None:
+                yield None
+                continue
+            try:
+                yield future.result()
+            except Exception as exc:
+                # Only reached when the worker itself died (OOM kill,
+                # segfault in a native parser); _parse_file catches
+                # ordinary parse errors.
+                yield _ParsedFile(error=f"parse failed: worker error: {exc}")
+
+
 # ------------------------------------------------------------------ pipeline
 
 @dataclass
@@ -342,6 +452,12 @@ class IngestStats:
     files_empty: int = 0
     files_errored: int = 0
     chunks_upserted: int = 0
+    #: Chunks of changed files whose stored embedding was reused
+    #: instead of re-embedded (includes `chunks_unchanged`).
+    chunks_reused: int = 0
+    #: Reused chunks whose stored row was identical: only re-tagged
+    #: with the new source fingerprint, not upserted.
+    chunks_unchanged: int = 0
     #: Number of (source_file, chunks) deletions issued by --prune.
     files_pruned: int = 0
     chunks_pruned: int = 0
@@ -448,6 +564,315 @@ def _prune_orphans(
             stats.actions.append(f"prune    error {source_key}: {exc}")
 
 
+def _plan_file(
+    file_path: Path,
+    content_root: Path,
+    existing_fps: Dict[str, set],
+    stats: IngestStats,
+    notes: List[str],
+) -> Tuple[Optional[Tuple[str, str, bool]], Optional[Tuple[Path, str]]]:
+    """Decide whether `file_path` needs (re-)parsing.
+
+    Returns `(plan, job)`: `plan` is `(source_key, file_fp,
+    already_in_backend)` and `job` the `_parse_file` arguments, both
+    None when the file is unchanged, unsupported or unreadable. Counters
+    go straight to `stats`; action-log lines go to `notes`, which the
+    caller replays in file order alongside the parse results.
+    """
+    source_key = relative_source_key(file_path, content_root)
+    parser: Parser | None = get_parser_for(file_path)
+    if parser is None:
+        # Filtered upstream, but defensive.
+        stats.files_skipped_unsupported += 1
+        return None, None
+
+    try:
+        # Streaming hash so the file body never lives in memory
+        # all at once. The parser still re-opens the file in
+        # parser.parse(); the duplicate I/O is the cost of the
+        # memory cap.
+        file_fp = source_fingerprint_from_path(
+            file_path, parser.parser_name, PIPELINE_VERSION
+        )
+    except Exception as exc:
+        stats.files_errored += 1
+        notes.append(f"error    {source_key}: read failed: {exc}")
+        return None, None
+
+    # Treat the file as unchanged ONLY when there's exactly one
+    # known fingerprint AND it matches the on-disk one. If the
+    # backend reports multiple fingerprints for this source, the
+    # previous run crashed between upsert and stale-cleanup —
+    # forcing re-ingestion is what triggers the cleanup retry on
+    # the next pass.
+    known_fps = existing_fps.get(source_key)
+    if known_fps == {file_fp}:
+        stats.files_unchanged += 1
+        notes.append(f"unchanged {source_key}")
+        return None, None
+    if known_fps and len(known_fps) > 1:
+        notes.append(
+            f"warn     {source_key}: backend reports {len(known_fps)} "
+            f"distinct fingerprints (likely an interrupted cleanup); "
+            f"forcing re-ingest"
+        )
+    return (source_key, file_fp, source_key in existing_fps), (file_path, source_key)
+
+
+def _plan_embedding_reuse(
+    stored: Sequence[BackendChunk],
+    chunks: List[BackendChunk],
+    embed_model: str,
+) -> Tuple[List[BackendChunk], List[BackendChunk], int]:
+    """Match a changed file's re-parsed chunks against its stored rows.
+
+    A chunk whose fingerprint (source, index, normalised content) is
+    already stored under the same `embed_model` takes the stored
+    embedding; so does a chunk whose exact content is stored at another
+    index (text inserted or removed above it shifts every later index,
+    and with it the fingerprint). Of the fingerprint matches, rows that
+    are identical apart from `source_fingerprint` need no upsert at all.
+
+    Returns `(to_upsert, unchanged, reused)`: chunks to write (those
+    still missing an embedding go to the embedder), unchanged chunks
+    to re-tag only, and how many embeddings were reused.
+    """
+    usable = [row for row in stored if row.embed_model == embed_model and len(row.embedding)]
+    by_fingerprint = {row.fingerprint: row for row in usable}
+    by_content = {row.content: row for row in usable}
+    to_upsert: List[BackendChunk] = []
+    unchanged: List[BackendChunk] = []
+    reused = 0
+    for chunk in chunks:
+        row = by_fingerprint.get(chunk.fingerprint)
+        if row is None:
+            row = by_content.get(chunk.content)
+        if row is None:
+            to_upsert.append(chunk)
+            continue
+        chunk.embedding = list(row.embedding)
+        reused += 1
+        if (
+            row.fingerprint == chunk.fingerprint
+            and row.content == chunk.content
+            and row.chunk_index == chunk.chunk_index
+            and row.metadata == chunk.metadata
+            and row.is_junk == chunk.is_junk
+        ):
+            unchanged.append(chunk)
+        else:
+            to_upsert.append(chunk)
+    return to_upsert, unchanged, reused
+
+
+_STAGE_DONE = object()
+
+
+class _EmbedUpsertPipeline:
+    """Embed and upsert stages of `ingest`, each on its own thread and
+    fed through bounded queues:
+
+        parse loop --batch--> embed --embedded batch--> upsert + cleanup
+
+    The parse loop keeps parsing while batch k+1 is embedded and batch k
+    upserted, so nothing waits for the whole corpus and at most
+    `queue_depth` batches sit between any two stages.
+
+    Stale-chunk cleanup for an updated file runs on the upsert thread
+    right after the batch holding that file's last chunk lands: the same
+    upsert-then-delete order as before, per file instead of per run.
+    Batches are upserted strictly in order and nothing is upserted after
+    a failure, so a file is only ever cleaned up once all of its new
+    chunks are in the backend.
+
+    A failing stage records the exception and keeps draining its input
+    so nothing upstream blocks on a full queue; `close()` re-raises it.
+    Batches embedded before an embed failure are still upserted.
+    """
+
+    def __init__(
+        self,
+        backend: VectorBackend,
+        embedder: Embedder,
+        batch_size: int,
+        queue_depth: int,
+    ) -> None:
+        self._backend = backend
+        self._embedder = embedder
+        self._batch_size = max(1, batch_size)
+        self._batch: List[BackendChunk] = []
+        # (end offset in self._batch, source_key, fingerprint to keep or
+        # None, unchanged chunks to re-tag) for files whose last chunk is
+        # in the unflushed batch.
+        self._file_ends: List[Tuple[int, str, Optional[str], List[BackendChunk]]] = []
+        self._batches_sent = 0
+        self._to_embed: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_depth))
+        self._to_upsert: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_depth))
+        self._cleanup_unsupported_logged = False
+        self._retag_unsupported_logged = False
+        self._aborted = False
+        #: Upsert / cleanup log lines, in batch order. Written only by
+        #: the upsert thread; read after `close()`.
+        self.actions: List[str] = []
+        self.error: Optional[BaseException] = None
+        self._threads = [
+            threading.Thread(target=self._embed_stage, name="kb-ingest-embed", daemon=True),
+            threading.Thread(target=self._upsert_stage, name="kb-ingest-upsert", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ------------------------------------------------------ producer side
+
+    def add_file(
+        self,
+        source_key: str,
+        chunks: List[BackendChunk],
+        keep_fp: Optional[str],
+        unchanged: Sequence[BackendChunk] = (),
+    ) -> None:
+        """Queue every chunk of one file. Chunks that already carry an
+        embedding skip the embedder. `keep_fp` is set for updated files:
+        once `chunks` are upserted, the `unchanged` rows are re-tagged
+        with it and every other fingerprint of the file is deleted."""
+        self._batch.extend(chunks)
+        self._file_ends.append((len(self._batch), source_key, keep_fp, list(unchanged)))
+        while len(self._batch) >= self._batch_size:
+            self._flush(self._batch_size)
+
+    def close(self) -> None:
+        """Flush the last partial batch, wait for both stages to drain,
+        and re-raise the first stage error."""
+        if (self._batch or self._file_ends) and not self._aborted:
+            # Also flushes the completions of trailing files that had
+            # no chunk left to write (everything unchanged).
+            self._flush(len(self._batch))
+        self._to_embed.put(_STAGE_DONE)
+        for thread in self._threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self) -> None:
+        """Stop after the caller failed: drop queued work, join threads."""
+        self._aborted = True
+        self._to_embed.put(_STAGE_DONE)
+        for thread in self._threads:
+            thread.join()
+
+    def _flush(self, size: int) -> None:
+        batch, self._batch = self._batch[:size], self._batch[size:]
+        completed = [(key, fp, same) for end, key, fp, same in self._file_ends if end <= size]
+        self._file_ends = [
+            (end - size, key, fp, same) for end, key, fp, same in self._file_ends if end > size
+        ]
+        if batch:
+            self._batches_sent += 1
+        self._to_embed.put((self._batches_sent, batch, completed))
+
+    # ------------------------------------------------------------- stages
+
+    def _stopped(self) -> bool:
+        return self.error is not None or self._aborted
+
+    def _embed_stage(self) -> None:
+        while True:
+            item = self._to_embed.get()
+            if item is _STAGE_DONE:
+                self._to_upsert.put(_STAGE_DONE)
+                return
+            if self._stopped():
+                continue
+            _, batch, _ = item
+            # Chunks with a reused embedding are passed through as is.
+            todo = [chunk for chunk in batch if not len(chunk.embedding)]
+            if todo:
+                try:
+                    embeddings = self._embedder.embed_texts([chunk.content for chunk in todo])
+                    if len(embeddings) != len(todo):
+                        raise RuntimeError(
+                            f"Embedder returned {len(embeddings)} vectors for "
+                            f"{len(todo)} chunks"
+                        )
+                except BaseException as exc:
+                    self.error = self.error or exc
+                    continue
+                for chunk, emb in zip(todo, embeddings):
+                    chunk.embedding = emb
+            self._to_upsert.put(item)
+
+    def _upsert_stage(self) -> None:
+        # Everything that reaches this stage was embedded before any
+        # embed failure (that stage stops forwarding once it fails), so
+        # it still lands; only an upsert failure of its own stops it.
+        failed = False
+        while True:
+            item = self._to_upsert.get()
+            if item is _STAGE_DONE:
+                return
+            if failed or self._aborted:
+                continue
+            number, batch, completed = item
+            try:
+                if batch:
+                    self._backend.upsert(batch)
+                    self.actions.append(f"upsert   batch {number}: {len(batch)} chunks")
+                for source_key, keep_fp, unchanged in completed:
+                    # Re-tag before cleanup, or the cleanup would delete
+                    # the unchanged rows along with the stale ones.
+                    if unchanged:
+                        self._retag_unchanged(unchanged, keep_fp)
+                    if keep_fp is not None:
+                        self._cleanup_stale(source_key, keep_fp)
+            except BaseException as exc:
+                self.error = self.error or exc
+                failed = True
+
+    def _retag_unchanged(self, unchanged: List[BackendChunk], keep_fp: str) -> None:
+        try:
+            self._backend.set_source_fingerprint(
+                [chunk.fingerprint for chunk in unchanged], keep_fp
+            )
+        except NotImplementedError as exc:
+            if not self._retag_unsupported_logged:
+                self.actions.append(
+                    f"warn     source-fingerprint re-tag unsupported: {exc}; "
+                    f"upserting unchanged chunks in full"
+                )
+                self._retag_unsupported_logged = True
+            for chunk in unchanged:
+                chunk.source_fingerprint = keep_fp
+            self._backend.upsert(unchanged)
+
+    def _cleanup_stale(self, source_key: str, keep_fp: str) -> None:
+        # Every new chunk of this file landed safely → drop the stale
+        # ones whose source_fingerprint no longer matches. Anything
+        # that fails here leaves the DB with both fingerprints present;
+        # the next ingest's list_source_fingerprints call will surface
+        # multiple fingerprints for that source_key and force
+        # re-ingestion (which retries the cleanup).
+        #
+        # Backends that don't implement scoped fingerprint deletion
+        # (e.g. chroma_cloud) raise NotImplementedError. Surfacing that
+        # as a single per-run warning (rather than falling back to
+        # delete_by_source, which would wipe the just-upserted chunks)
+        # lets the operator know stale chunks may persist on that
+        # backend without breaking the ingest.
+        try:
+            removed = self._backend.delete_by_source_other_fingerprints(source_key, keep_fp)
+            if removed:
+                self.actions.append(f"cleanup  {source_key}: removed {removed} stale chunks")
+        except NotImplementedError as exc:
+            if not self._cleanup_unsupported_logged:
+                self.actions.append(
+                    f"warn     scoped stale-chunk delete unsupported: {exc}; "
+                    f"old fingerprints will remain on this backend"
+                )
+                self._cleanup_unsupported_logged = True
+        except Exception as exc:
+            self.actions.append(f"cleanup  {source_key}: stale-chunk delete failed: {exc}")
+
+
 def ingest(
     *,
     content_root: Path,
@@ -457,6 +882,9 @@ def ingest(
     dry_run: bool = False,
     only: Sequence[str] | None = None,
     prune: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    max_in_flight: Optional[int] = None,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
 ) -> IngestStats:
     stats = IngestStats()
 
@@ -484,185 +912,159 @@ def ingest(
     source_keys = [relative_source_key(f, content_root) for f in files]
     existing_fps = backend.list_source_fingerprints(source_keys)
 
-    pending: List[BackendChunk] = []
-    chunks_per_source: Dict[str, int] = {}
-    # (source_key, new_source_fingerprint) pairs whose stale chunks
-    # should be removed after every new chunk has been upserted.
-    updated_sources: List[tuple[str, str]] = []
-
+    # Pass 1 (cheap, in-process): fingerprint every file and decide
+    # whether it needs parsing. `jobs` stays parallel to `files`;
+    # `plans` keeps what pass 2 needs per file.
+    plans: List[Optional[Tuple[str, str, bool]]] = []
+    jobs: List[Optional[Tuple[Path, str]]] = []
+    notes: List[List[str]] = []
     for file_path in files:
-        source_key = relative_source_key(file_path, content_root)
-        parser: Parser | None = get_parser_for(file_path)
-        if parser is None:
-            # Filtered upstream, but defensive.
-            stats.files_skipped_unsupported += 1
-            continue
-
-        try:
-            # Streaming hash so the file body never lives in memory
-            # all at once. The parser still re-opens the file in
-            # parser.parse(); the duplicate I/O is the cost of the
-            # memory cap.
-            file_fp = source_fingerprint_from_path(
-                file_path, parser.parser_name, PIPELINE_VERSION
-            )
-        except Exception as exc:
-            stats.files_errored += 1
-            stats.actions.append(f"error    {source_key}: read failed: {exc}")
-            continue
-
-        # Treat the file as unchanged ONLY when there's exactly one
-        # known fingerprint AND it matches the on-disk one. If the
-        # backend reports multiple fingerprints for this source, the
-        # previous run crashed between upsert and stale-cleanup —
-        # forcing re-ingestion is what triggers the cleanup retry on
-        # the next pass.
-        known_fps = existing_fps.get(source_key)
-        if known_fps == {file_fp}:
-            stats.files_unchanged += 1
-            stats.actions.append(f"unchanged {source_key}")
-            continue
-        if known_fps and len(known_fps) > 1:
-            stats.actions.append(
-                f"warn     {source_key}: backend reports {len(known_fps)} "
-                f"distinct fingerprints (likely an interrupted cleanup); "
-                f"forcing re-ingest"
-            )
-
-        try:
-            parse_result = parser.parse(file_path)
-        except Exception as exc:
-            stats.files_errored += 1
-            stats.actions.append(f"error    {source_key}: parse failed: {exc}")
-            continue
-
-        if parse_result.metadata.get("parse_error"):
-            stats.files_errored += 1
-            stats.actions.append(
-                f"error    {source_key}: {parse_result.metadata['parse_error']}"
-            )
-            continue
-
-        raw_chunks = _chunk_sections(parse_result)
-        if not raw_chunks:
-            stats.files_empty += 1
-            stats.actions.append(f"empty    {source_key}")
-            continue
-
-        if source_key in existing_fps:
-            stats.files_updated += 1
-            stats.actions.append(
-                f"updated  {source_key} ({len(raw_chunks)} chunks)"
-            )
-            # Defer the delete until AFTER the new chunks are upserted.
-            # The previous order (delete-then-upsert, with the upsert
-            # happening at the end of the whole-corpus loop) could leave
-            # a file with ZERO chunks if the process crashed between the
-            # delete and the upsert. The deferred delete pattern
-            # guarantees the file always has a usable set of chunks in
-            # the DB; in the crash window, both the old and new
-            # fingerprints coexist and the next ingest run dedupes them.
-            updated_sources.append((source_key, file_fp))
-        else:
-            stats.files_new += 1
-            stats.actions.append(
-                f"new      {source_key} ({len(raw_chunks)} chunks)"
-            )
-
-        chunks_per_source[source_key] = len(raw_chunks)
-        path_metadata = _derive_metadata_from_path(source_key)
-        file_metadata: Dict[str, Any] = {
-            **path_metadata,
-            **parse_result.metadata,
-            "file_type": file_path.suffix.lower().lstrip("."),
-        }
-
-        for raw in raw_chunks:
-            chunk_fp = chunk_fingerprint(source_key, raw.chunk_index, raw.content)
-            language = _detect_language(raw.content)
-
-            # Pattern-scan every chunk for prompt-injection markers.
-            # Hits surface as a warning in the action log; the chunk
-            # still ingests (legitimate research material may discuss
-            # these patterns) but the operator gets a visible audit
-            # trail to review before the chunk is served to an LLM.
-            injection_hits = scan_for_injection_markers(raw.content)
-            if injection_hits:
+        file_notes: List[str] = []
+        plan, job = _plan_file(file_path, content_root, existing_fps, stats, file_notes)
+        plans.append(plan)
+        jobs.append(job)
+        notes.append(file_notes)
+
+    # Pass 2: parse + chunk (fanned out to `workers` processes when
+    # asked), consumed in file order so the action log is stable. Each
+    # file's chunks stream straight into the embed / upsert stages, so
+    # parsing, embedding and upserting overlap instead of running one
+    # after the other over the whole corpus.
+    in_flight = max_in_flight if max_in_flight is not None else max(1, workers) * 2
+    parsed_stream = _parse_in_order(jobs, workers, max(1, in_flight))
+    pipeline = (
+        None
+        if dry_run
+        else _EmbedUpsertPipeline(backend, embedder, batch_size, queue_depth)
+    )
+    reuse_supported = True
+    try:
+        for file_path, plan, file_notes, parsed in zip(files, plans, notes, parsed_stream):
+            stats.actions.extend(file_notes)
+            if plan is None or parsed is None:
+                continue
+            source_key, file_fp, known = plan
+
+            if parsed.error is not None:
+                stats.files_errored += 1
+                stats.actions.append(f"error    {source_key}: {parsed.error}")
+                continue
+
+            if not parsed.chunks:
+                stats.files_empty += 1
+                stats.actions.append(f"empty    {source_key}")
+                continue
+
+            if known:
+                stats.files_updated += 1
                 stats.actions.append(
-                    f"warn     {source_key}#{raw.chunk_index}: "
-                    f"injection markers detected: {injection_hits}"
+                    f"updated  {source_key} ({len(parsed.chunks)} chunks)"
                 )
+            else:
+                stats.files_new += 1
+                stats.actions.append(
+                    f"new      {source_key} ({len(parsed.chunks)} chunks)"
+                )
+
+            for chunk in parsed.chunks:
+                # Every chunk was pattern-scanned for prompt-injection
+                # markers in _parse_file. Hits surface as a warning in
+                # the action log; the chunk still ingests (legitimate
+                # research material may discuss these patterns) but the
+                # operator gets a visible audit trail to review before
+                # the chunk is served to an LLM.
+                if chunk.injection_hits:
+                    stats.actions.append(
+                        f"warn     {source_key}#{chunk.chunk_index}: "
+                        f"injection markers detected: {chunk.injection_hits}"
+                    )
 
-            pending.append(
+            if pipeline is None:
+                stats.chunks_upserted += len(parsed.chunks)
+                continue
+
+            path_metadata = _derive_metadata_from_path(source_key)
+            file_metadata: Dict[str, Any] = {
+                **path_metadata,
+                **parsed.metadata,
+                "file_type": file_path.suffix.lower().lstrip("."),
+            }
+            backend_chunks = [
                 BackendChunk(
-                    content=raw.content,
-                    fingerprint=chunk_fp,
+                    content=chunk.content,
+                    fingerprint=chunk.fingerprint,
                     source_file=source_key,
                     source_fingerprint=file_fp,
-                    chunk_index=raw.chunk_index,
+                    chunk_index=chunk.chunk_index,
                     embedding=[],
                     metadata={
                         **file_metadata,
-                        "chunks_in_file": chunks_per_source[source_key],
-                        "language": language,
-                        "injection_hits": injection_hits if injection_hits else None,
+                        "chunks_in_file": len(parsed.chunks),
+                        "language": chunk.language,
+                        "injection_hits": chunk.injection_hits or None,
                     },
                     embed_model=embedder.model_name,
+                    # Evaluated once at ingest so the vector query can
+                    # drop junk server-side (db/migrations/016) instead
+                    # of the KB service re-scanning it on every request.
+                    is_junk=chunk.is_junk,
                 )
-            )
-
-    stats.chunks_upserted = len(pending)
-    if pending and not dry_run:
-        for start in range(0, len(pending), batch_size):
-            batch = pending[start : start + batch_size]
-            texts = [chunk.content for chunk in batch]
-            embeddings = embedder.embed_texts(texts)
-            if len(embeddings) != len(batch):
-                raise RuntimeError(
-                    f"Embedder returned {len(embeddings)} vectors for "
-                    f"{len(batch)} chunks"
-                )
-            for chunk, emb in zip(batch, embeddings):
-                chunk.embedding = emb
-            backend.upsert(batch)
-            stats.actions.append(
-                f"upsert   batch {start // batch_size + 1}: {len(batch)} chunks"
-            )
-
-        # All new chunks landed safely → drop the stale ones whose
-        # source_fingerprint no longer matches. Anything that fails
-        # here leaves the DB with both fingerprints present; the next
-        # ingest's list_source_fingerprints call will surface multiple
-        # fingerprints for that source_key and force re-ingestion
-        # (which retries the cleanup).
-        #
-        # Backends that don't implement scoped fingerprint deletion
-        # (e.g. chroma_cloud) raise NotImplementedError. Surfacing
-        # that as a single per-run warning (rather than falling back
-        # to delete_by_source, which would wipe the just-upserted
-        # batch) lets the operator know stale chunks may persist on
-        # that backend without breaking the ingest.
-        unsupported_logged = False
-        for source_key, keep_fp in updated_sources:
-            try:
-                removed = backend.delete_by_source_other_fingerprints(
-                    source_key, keep_fp
-                )
-                if removed:
+                for chunk in parsed.chunks
+            ]
+            unchanged: List[BackendChunk] = []
+            if known and reuse_supported:
+                # A small edit leaves most chunk fingerprints intact:
+                # reuse their stored embeddings and only embed the diff.
+                try:
+                    stored = backend.list_source_chunks(source_key)
+                except NotImplementedError as exc:
+                    reuse_supported = False
+                    stored = []
                     stats.actions.append(
-                        f"cleanup  {source_key}: removed {removed} stale chunks"
+                        f"warn     embedding reuse unsupported: {exc}; "
+                        f"re-embedding every chunk of changed files"
                     )
-            except NotImplementedError as exc:
-                if not unsupported_logged:
+                except Exception as exc:
+                    stored = []
                     stats.actions.append(
-                        f"warn     scoped stale-chunk delete unsupported: {exc}; "
-                        f"old fingerprints will remain on this backend"
+                        f"warn     {source_key}: stored chunk lookup failed: {exc}; "
+                        f"re-embedding"
                     )
-                    unsupported_logged = True
-            except Exception as exc:
-                stats.actions.append(
-                    f"cleanup  {source_key}: stale-chunk delete failed: {exc}"
+                backend_chunks, unchanged, reused = _plan_embedding_reuse(
+                    stored, backend_chunks, embedder.model_name
                 )
+                if reused:
+                    stats.chunks_reused += reused
+                    stats.chunks_unchanged += len(unchanged)
+                    stats.actions.append(
+                        f"reuse    {source_key}: {reused}/{len(parsed.chunks)} embeddings, "
+                        f"{len(unchanged)} rows unchanged"
+                    )
+            stats.chunks_upserted += len(backend_chunks)
+
+            # Updated files keep their old chunks until every new one
+            # is upserted; the pipeline then deletes the other
+            # fingerprints. The previous order (delete-then-upsert)
+            # could leave a file with ZERO chunks if the process crashed
+            # in between; this way, in the crash window both the old
+            # and new fingerprints coexist and the next ingest run
+            # dedupes them.
+            pipeline.add_file(
+                source_key, backend_chunks, file_fp if known else None, unchanged
+            )
+            if pipeline.error is not None:
+                # A stage failed: stop parsing, close() re-raises.
+                break
+    except BaseException:
+        if pipeline is not None:
+            pipeline.abort()
+            stats.actions.extend(pipeline.actions)
+        raise
+    if pipeline is not None:
+        try:
+            pipeline.close()
+        finally:
+            stats.actions.extend(pipeline.actions)
 
     if prune:
         _prune_orphans(
@@ -696,6 +1098,33 @@ def main() -> int:
         default=DEFAULT_BATCH_SIZE,
         help="Embedding + upsert batch size (default %(default)s)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=(
+            "Parse / OCR / chunk files in this many processes "
+            "(default %(default)s = in-process)"
+        ),
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help=(
+            "With --workers, max parsed files held ahead of the ingest "
+            "loop; bounds memory (default 2 x workers)"
+        ),
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=DEFAULT_QUEUE_DEPTH,
+        help=(
+            "Batches buffered between the parse, embed and upsert stages "
+            "(default %(default)s)"
+        ),
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -733,8 +1162,12 @@ def main() -> int:
         print(f"  effective    : {effective_source}  (stripped single-dir wrapper)")
     print(f"  backend      : {backend_name}")
     print(f"  embed model  : {os.getenv('KB_EMBED_MODEL', 'BAAI/bge-m3')}")
+    if os.getenv("KB_EMBED_STORE_PATH", "").strip():
+        print(f"  embed store  : {os.getenv('KB_EMBED_STORE_PATH').strip()}")
     print(f"  pipeline ver : {PIPELINE_VERSION}")
     print(f"  batch size   : {args.batch_size}")
+    if args.workers > 1:
+        print(f"  workers      : {args.workers}")
     if only_list:
         print(f"  only         : {only_list}")
     if args.dry_run:
@@ -742,7 +1175,7 @@ def main() -> int:
     print()
 
     backend = create_backend(backend_name)
-    embedder = create_embedder()
+    embedder = create_ingest_embedder()
 
     stats = ingest(
         content_root=effective_source,
@@ -752,6 +1185,9 @@ def main() -> int:
         dry_run=args.dry_run,
         only=only_list,
         prune=args.prune,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        queue_depth=args.queue_depth,
     )
 
     if args.verbose:
@@ -769,12 +1205,21 @@ def main() -> int:
     print(f"  empty              : {stats.files_empty}")
     print(f"  errored            : {stats.files_errored}")
     print(f"  chunks upserted    : {stats.chunks_upserted}")
+    print(f"  embeddings reused  : {stats.chunks_reused}")
+    print(f"  chunks unchanged   : {stats.chunks_unchanged}")
     if args.prune:
         print(f"  pruned files       : {stats.files_pruned}")
         print(f"  pruned chunks      : {stats.chunks_pruned}")
         print(f"  prune errors       : {stats.prune_errors}")
+    store_stats = embedder.stats().get("embedding_store")
+    if store_stats:
+        print(
+            f"  embed store        : {store_stats['hits']} hits, "
+            f"{store_stats['appended']} added ({store_stats['rows']} stored)"
+        )
 
     backend.close()
+    embedder.close()
     # Prune delete failures must contribute to a non-zero exit so an
     # operator (or CI) running --prune can't get a "green" run while
     # stale chunks remain in the DB.
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Rebuild the in-process numpy_mmap KB index from pgvector.
+
+The numpy_mmap backend (apps/api/kb_backends/numpy_mmap.py) answers
+retrieval from a memory-mapped snapshot instead of a database round
+trip. This script mirrors the source backend into that snapshot: files
+whose source fingerprints already match are skipped, changed files are
+re-copied (vectors included, nothing is re-embedded) and files gone
+from the source are dropped, then one new generation is published.
+Running KB services pick it up on their next query.
+
+Run it after every kb-ingest against pgvector.
+
+Examples
+--------
+  python scripts/kb-sync-numpy.py
+  python scripts/kb-sync-numpy.py --index /data/kb-index
+  python scripts/kb-sync-numpy.py --full      # drop the snapshot first
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+sys.path.insert(0, str(ROOT / "apps" / "api"))
+
+from kb_backends import create_backend  # noqa: E402
+from kb_backends.numpy_mmap import NumpyMmapBackend  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sync the numpy_mmap KB index from pgvector")
+    parser.add_argument(
+        "--index",
+        default=os.getenv("KB_NUMPY_INDEX_PATH", "").strip(),
+        help="Snapshot directory (default: KB_NUMPY_INDEX_PATH)",
+    )
+    parser.add_argument(
+        "--source",
+        default="pgvector",
+        help="Backend to copy from (default: pgvector)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the current snapshot and copy every file",
+    )
+    args = parser.parse_args(argv)
+    if not args.index:
+        parser.error("no index directory: pass --index or set KB_NUMPY_INDEX_PATH")
+
+    print("KB numpy_mmap sync")
+    print(f"  source : {args.source}")
+    print(f"  index  : {args.index}")
+    print()
+
+    started = time.time()
+    source = create_backend(args.source)
+    index = NumpyMmapBackend(args.index)
+    try:
+        if args.full:
+            for source_file in index.list_all_source_files():
+                index.delete_by_source(source_file)
+        stats = index.sync_from(source)
+    finally:
+        source.close()
+
+    health = index.health()
+    print("Summary:")
+    print(f"  source files   : {stats['files']}")
+    print(f"  files copied   : {stats['files_copied']}")
+    print(f"  files removed  : {stats['files_removed']}")
+    print(f"  chunks copied  : {stats['chunks_copied']}")
+    print(f"  index rows     : {health['rows']} (dim={health['dimension']})")
+    print(f"  generation     : {health['generation']}")
+    print(f"  elapsed        : {time.time() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,13 +13,18 @@ FSHD corpus (medical guidelines, journal papers, etc.).
 
 from __future__ import annotations
 
+import logging
+import os
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from .base import Parser, ParseResult, ParsedSection
 
+logger = logging.getLogger("fshd_kb.pdf_parser")
+
 # Same Pillow decompression-bomb guard as image_parser. pdf2image
 # converts PDF pages into Pillow Image objects; without this a
 # corpus-dropped scanned PDF with absurdly large page dimensions
@@ -47,6 +52,30 @@ _OCR_LANGS = "chi_sim+eng"
 _OCR_DPI = 300
 
 
+def _env_int(name: str, default: int) -> int:
+    # Read at import: a typo here must not break ingest of corpora
+    # that contain no PDFs at all.
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning("invalid %s=%r, falling back to %d", name, raw, default)
+        return default
+
+
+#: Concurrent tesseract runs per PDF. tesseract is a subprocess, so
+#: threads give real parallelism. Lower this when kb-ingest already
+#: runs with `--workers`, or the two multiply.
+_OCR_WORKERS = max(1, _env_int("KB_OCR_WORKERS", min(4, os.cpu_count() or 1)))
+
+#: Pages rasterised per pdf2image call. A 300 dpi A4 page is ~25 MB
+#: as a Pillow image, so this (not the page count of the PDF) is what
+#: bounds memory on a large scanned archive.
+_OCR_RASTER_BATCH = 2 * _OCR_WORKERS
+
+
 class PdfParser(Parser):
     extensions = (".pdf",)
     parser_name = "pdf"
@@ -67,12 +96,16 @@ class PdfParser(Parser):
         ocr_failures = 0
         last_ocr_error: Optional[str] = None
 
-        for section in sections:
-            if not _looks_empty(section.text):
-                continue
-            ocr_text, ocr_err = _ocr_page(
-                path, _page_index_from_label(section.label)
-            )
+        # Every low-text page goes to OCR in one batched pass; results
+        # stream back in page order as each rasterise batch finishes.
+        by_index = {
+            _page_index_from_label(section.label): section
+            for section in sections
+            if _looks_empty(section.text)
+        }
+        by_index.pop(-1, None)
+        for page_index, ocr_text, ocr_err in _ocr_pages(path, sorted(by_index)):
+            section = by_index[page_index]
             if ocr_err is not None:
                 # OCR couldn't even run for this page (missing
                 # poppler / tesseract / chi_sim traineddata, or a
@@ -87,6 +120,10 @@ class PdfParser(Parser):
                 section.extra["source_method"] = "ocr"
                 ocr_pages += 1
 
+        # The text layer emits one section per page, empty or not, so
+        # its length is the page count -- no separate parse needed.
+        pages_total = len(sections)
+
         # Drop pages that are still empty after OCR. Keeps the section
         # list aligned with what actually has content; downstream
         # chunker handles per-page wrap.
@@ -94,7 +131,7 @@ class PdfParser(Parser):
 
         metadata: dict = {
             "parser": self.parser_name,
-            "pages_total": _page_count(path),
+            "pages_total": pages_total,
             "pages_with_text": len(sections),
             "pages_via_ocr": ocr_pages,
             "ocr_failures": ocr_failures,
@@ -122,46 +159,55 @@ class PdfParser(Parser):
 def _parse_text_layer(path: Path) -> List[ParsedSection]:
     """Return one ParsedSection per PDF page using pdfminer's text
     extraction. Pages with no text layer come back empty; the caller
-    decides whether to retry via OCR."""
-    from pdfminer.high_level import extract_text_to_fp  # type: ignore
+    decides whether to retry via OCR. The list length is the page
+    count."""
+    return list(_iter_text_layer(path))
+
+
+def _iter_text_layer(path: Path) -> Iterator[ParsedSection]:
+    """Single pass over the document: one PDFPageInterpreter /
+    TextConverter pipeline walks `PDFPage.create_pages` once and yields
+    each page's section as soon as it is extracted.
+
+    The previous helper called `extract_text_to_fp(page_numbers=[i])`
+    per page, and each call re-opened and re-parsed the document from
+    the start, so a 400-page guideline paid O(pages^2) in xref /
+    page-tree walking. Output is identical: same LAParams, same
+    TextConverter, and the per-page form feed is stripped as before.
+    """
+    from pdfminer.converter import TextConverter  # type: ignore
     from pdfminer.layout import LAParams  # type: ignore
     from pdfminer.pdfdocument import PDFDocument  # type: ignore
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager  # type: ignore
     from pdfminer.pdfpage import PDFPage  # type: ignore
     from pdfminer.pdfparser import PDFParser  # type: ignore
 
-    laparams = LAParams()
-    sections: List[ParsedSection] = []
-
     with path.open("rb") as fh:
         document = PDFDocument(PDFParser(fh))
-        page_count = sum(1 for _ in PDFPage.create_pages(document))
-
-    for index in range(page_count):
+        rsrcmgr = PDFResourceManager(caching=True)
         buf = StringIO()
-        with path.open("rb") as fh:
-            extract_text_to_fp(
-                fh,
-                buf,
-                laparams=laparams,
-                page_numbers=[index],
-                output_type="text",
-            )
-        text = buf.getvalue().strip()
-        sections.append(
-            ParsedSection(
-                text=text,
-                label=f"page {index + 1}",
-                extra={"page_index": index, "source_method": "text_layer"},
-            )
-        )
-
-    return sections
-
-
-def _ocr_page(path: Path, page_index: int) -> Tuple[str, Optional[str]]:
-    """Rasterise one PDF page and run tesseract on it.
-
-    Returns `(text, error)` where:
+        device = TextConverter(rsrcmgr, buf, laparams=LAParams())
+        try:
+            interpreter = PDFPageInterpreter(rsrcmgr, device)
+            for index, page in enumerate(PDFPage.create_pages(document)):
+                buf.seek(0)
+                buf.truncate()
+                interpreter.process_page(page)
+                yield ParsedSection(
+                    text=buf.getvalue().strip(),
+                    label=f"page {index + 1}",
+                    extra={"page_index": index, "source_method": "text_layer"},
+                )
+        finally:
+            device.close()
+
+
+def _ocr_pages(
+    path: Path, page_indexes: Sequence[int]
+) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """Rasterise and OCR the given zero-based pages.
+
+    Yields `(page_index, text, error)` in ascending page order, where:
       - `text=''` and `error=None`  -> OCR ran, image had no text (a
         legitimately blank scan / cover page).
       - `text != ''` and `error=None` -> OCR succeeded.
@@ -169,58 +215,82 @@ def _ocr_page(path: Path, page_index: int) -> Tuple[str, Optional[str]]:
         poppler, missing tesseract binary, missing chi_sim
         traineddata, rasterise crash). The caller surfaces this so a
         missing host-side dep doesn't masquerade as a content gap.
+
+    Pages are rasterised `_OCR_RASTER_BATCH` at a time, one pdftoppm
+    call per contiguous run (instead of one process spawn per page),
+    and each batch is OCRed on `_OCR_WORKERS` threads before the next
+    one is rasterised, so at most one batch of images is alive.
     """
-    if page_index < 0:
-        return "", None
+    pages = sorted(set(i for i in page_indexes if i >= 0))
+    if not pages:
+        return
 
     try:
         from pdf2image import convert_from_path  # type: ignore
     except ImportError as exc:
-        return "", f"pdf2image not installed: {exc}"
+        yield from ((i, "", f"pdf2image not installed: {exc}") for i in pages)
+        return
     try:
         import pytesseract  # type: ignore
     except ImportError as exc:
-        return "", f"pytesseract not installed: {exc}"
-
-    try:
-        images = convert_from_path(
-            str(path),
-            dpi=_OCR_DPI,
-            first_page=page_index + 1,
-            last_page=page_index + 1,
-        )
-    except Exception as exc:
-        # pdf2image surfaces `PDFInfoNotInstalledError` /
-        # `FileNotFoundError` when poppler / pdftoppm isn't on PATH;
-        # both bubble up here. The bootstrap docs now list poppler
-        # alongside tesseract.
-        return "", f"PDF rasterise failed (poppler/pdftoppm?): {exc}"
-
-    if not images:
-        return "", None
-
-    try:
-        text = pytesseract.image_to_string(images[0], lang=_OCR_LANGS)
-    except Exception as exc:
-        # Common case: tesseract binary missing or chi_sim
-        # traineddata not in tessdata. Both want the operator to
-        # `brew install tesseract tesseract-lang`.
-        return "", f"tesseract OCR failed (binary/chi_sim missing?): {exc}"
-
-    return text.strip(), None
-
+        yield from ((i, "", f"pytesseract not installed: {exc}") for i in pages)
+        return
 
-def _page_count(path: Path) -> int:
-    try:
-        from pdfminer.pdfdocument import PDFDocument  # type: ignore
-        from pdfminer.pdfpage import PDFPage  # type: ignore
-        from pdfminer.pdfparser import PDFParser  # type: ignore
-
-        with path.open("rb") as fh:
-            document = PDFDocument(PDFParser(fh))
-            return sum(1 for _ in PDFPage.create_pages(document))
-    except Exception:
-        return 0
+    def _tesseract(image: Any) -> Tuple[str, Optional[str]]:
+        try:
+            return pytesseract.image_to_string(image, lang=_OCR_LANGS).strip(), None
+        except Exception as exc:
+            # Common case: tesseract binary missing or chi_sim
+            # traineddata not in tessdata. Both want the operator to
+            # `brew install tesseract tesseract-lang`.
+            return "", f"tesseract OCR failed (binary/chi_sim missing?): {exc}"
+
+    with ThreadPoolExecutor(max_workers=_OCR_WORKERS) as pool:
+        for start in range(0, len(pages), _OCR_RASTER_BATCH):
+            batch = pages[start : start + _OCR_RASTER_BATCH]
+            images: Dict[int, Any] = {}
+            errors: Dict[int, str] = {}
+            for first, last in _contiguous_runs(batch):
+                try:
+                    rendered = convert_from_path(
+                        str(path),
+                        dpi=_OCR_DPI,
+                        first_page=first + 1,
+                        last_page=last + 1,
+                        thread_count=min(_OCR_WORKERS, last - first + 1),
+                    )
+                except Exception as exc:
+                    # pdf2image surfaces `PDFInfoNotInstalledError` /
+                    # `FileNotFoundError` when poppler / pdftoppm isn't
+                    # on PATH; both bubble up here. The bootstrap docs
+                    # now list poppler alongside tesseract.
+                    for i in range(first, last + 1):
+                        errors[i] = f"PDF rasterise failed (poppler/pdftoppm?): {exc}"
+                    continue
+                images.update(zip(range(first, last + 1), rendered))
+
+            futures = {i: pool.submit(_tesseract, image) for i, image in images.items()}
+            images.clear()
+            for i in batch:
+                if i in errors:
+                    yield i, "", errors[i]
+                elif i in futures:
+                    text, err = futures.pop(i).result()
+                    yield i, text, err
+                else:
+                    # pdftoppm rendered fewer pages than asked for.
+                    yield i, "", None
+
+
+def _contiguous_runs(pages: Sequence[int]) -> List[Tuple[int, int]]:
+    """[1, 2, 3, 7, 9, 10] -> [(1, 3), (7, 7), (9, 10)]."""
+    runs: List[Tuple[int, int]] = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
 
 
 def _looks_empty(text: str) -> bool:
@@ -229,7 +299,7 @@ def _looks_empty(text: str) -> bool:
 
 def _page_index_from_label(label: str) -> int:
     """`page 7` -> 6 (zero-based). Returns -1 when the label isn't a
-    page label so `_ocr_page` can short-circuit."""
+    page label so the OCR pass can skip it."""
     if not label.startswith("page "):
         return -1
     try:
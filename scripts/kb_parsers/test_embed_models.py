@@ -0,0 +1,345 @@
+"""Tests for the embedder wrappers under apps/api/embed_models/.
+
+The real SentenceTransformer model is far too heavy for unit tests,
+so every wrapper is exercised against a tiny deterministic fake that
+records how it was called.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+from pathlib import Path
+from typing import List
+
+import pytest
+
+_HERE = Path(__file__).resolve().parent
+_API_ROOT = _HERE.parent.parent / "apps" / "api"
+
+
+@pytest.fixture(scope="module")
+def embed_models():
+    if str(_API_ROOT) not in sys.path:
+        sys.path.insert(0, str(_API_ROOT))
+    return importlib.import_module("embed_models")
+
+
+@pytest.fixture(scope="module")
+def batching_mod(embed_models):
+    return importlib.import_module("embed_models.batching")
+
+
+def _make_fake(embed_models, gate: threading.Event | None = None):
+    class _FakeEmbedder(embed_models.Embedder):
+        model_name = "fake-model"
+        dimension = 2
+
+        def __init__(self) -> None:
+            self.calls: List[List[str]] = []
+
+        def embed_texts(self, texts):
+            if gate is not None:
+                gate.wait(timeout=5)
+            self.calls.append(list(texts))
+            return [[float(len(t)), float(i)] for i, t in enumerate(texts)]
+
+    return _FakeEmbedder()
+
+
+# --------------------------------------------------------------- MicroBatchingEmbedder
+
+
+def test_micro_batching_returns_each_caller_its_own_slice(embed_models, batching_mod):
+    inner = _make_fake(embed_models)
+    embedder = batching_mod.MicroBatchingEmbedder(inner, window_ms=1, max_batch=8)
+    out = embedder.embed_texts(["a", "bbb"])
+    assert out == [[1.0, 0.0], [3.0, 1.0]]
+    assert embedder.embed_texts([]) == []
+    assert embedder.model_name == "fake-model"
+    assert embedder.dimension == 2
+
+
+def test_micro_batching_coalesces_concurrent_callers(embed_models, batching_mod):
+    """Callers arriving inside the window share one inner encode and
+    still get back vectors for their own texts only."""
+    inner = _make_fake(embed_models)
+    embedder = batching_mod.MicroBatchingEmbedder(inner, window_ms=200, max_batch=6)
+
+    results = {}
+
+    def _call(name, texts):
+        results[name] = embedder.embed_texts(texts)
+
+    threads = [
+        threading.Thread(target=_call, args=("one", ["x", "yy"])),
+        threading.Thread(target=_call, args=("two", ["zzz", "wwww"])),
+        threading.Thread(target=_call, args=("three", ["vvvvv", "uuuuuu"])),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    # max_batch=6 is reached by the three callers, so they must have
+    # been dispatched together in a single encode.
+    assert len(inner.calls) == 1
+    assert sorted(inner.calls[0]) == sorted(["x", "yy", "zzz", "wwww", "vvvvv", "uuuuuu"])
+    assert [v[0] for v in results["one"]] == [1.0, 2.0]
+    assert [v[0] for v in results["two"]] == [3.0, 4.0]
+    assert [v[0] for v in results["three"]] == [5.0, 6.0]
+
+    stats = embedder.stats()["micro_batching"]
+    assert stats["batches"] == 1
+    assert stats["requests"] == 3
+    assert stats["texts"] == 6
+    assert stats["avg_fill_ratio"] == 1.0
+    assert stats["avg_queue_wait_ms"] >= 0.0
+
+
+def test_micro_batching_does_not_split_oversized_request(embed_models, batching_mod):
+    inner = _make_fake(embed_models)
+    embedder = batching_mod.MicroBatchingEmbedder(inner, window_ms=1, max_batch=2)
+    out = embedder.embed_texts(["a", "b", "c", "d", "e"])
+    assert len(out) == 5
+    assert inner.calls == [["a", "b", "c", "d", "e"]]
+
+
+def test_micro_batching_propagates_inner_errors(embed_models, batching_mod):
+    class _Boom(embed_models.Embedder):
+        model_name = "boom"
+
+        def embed_texts(self, texts):
+            raise RuntimeError("encode failed")
+
+    embedder = batching_mod.MicroBatchingEmbedder(_Boom(), window_ms=1, max_batch=4)
+    with pytest.raises(RuntimeError, match="encode failed"):
+        embedder.embed_texts(["a"])
+    # The dispatcher must survive the failure and serve later calls.
+    with pytest.raises(RuntimeError, match="encode failed"):
+        embedder.embed_texts(["b"])
+
+
+def test_create_service_embedder_honours_disabled_window(embed_models, monkeypatch):
+    factory = importlib.import_module("embed_models.factory")
+    inner = _make_fake(embed_models)
+    monkeypatch.setattr(factory, "create_embedder", lambda model_name=None: inner)
+
+    monkeypatch.setenv("KB_EMBED_CACHE_MAX_BYTES", "0")
+    monkeypatch.setenv("KB_EMBED_BATCH_WINDOW_MS", "0")
+    assert factory.create_service_embedder() is inner
+
+    monkeypatch.setenv("KB_EMBED_BATCH_WINDOW_MS", "3")
+    monkeypatch.setenv("KB_EMBED_MAX_BATCH", "12")
+    wrapped = factory.create_service_embedder()
+    assert wrapped.inner is inner
+    assert wrapped.max_batch == 12
+
+
+# --------------------------------------------------------------- CachingEmbedder
+
+
+@pytest.fixture(scope="module")
+def cache_mod(embed_models):
+    return importlib.import_module("embed_models.cache")
+
+
+def test_cache_serves_repeats_without_calling_inner(embed_models, cache_mod):
+    inner = _make_fake(embed_models)
+    embedder = cache_mod.CachingEmbedder(inner, max_bytes=1 << 20)
+
+    first = embedder.embed_texts(["FSHD 是什么病", "D4Z4 重复减少"])
+    # Whitespace variants normalise onto the same key.
+    second = embedder.embed_texts(["  FSHD   是什么病 ", "D4Z4 重复减少"])
+
+    assert inner.calls == [["FSHD 是什么病", "D4Z4 重复减少"]]
+    assert second == first
+    stats = embedder.stats()["embedding_cache"]
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+
+
+def test_cache_dedupes_within_one_call(embed_models, cache_mod):
+    inner = _make_fake(embed_models)
+    embedder = cache_mod.CachingEmbedder(inner, max_bytes=1 << 20)
+    out = embedder.embed_texts(["same", "other", "same"])
+    assert inner.calls == [["same", "other"]]
+    assert out[0] == out[2]
+
+
+def test_cache_evicts_least_recently_used(embed_models, cache_mod):
+    inner = _make_fake(embed_models)
+    # Room for exactly two 2-d float32 entries.
+    per_entry = 2 * 4 + cache_mod._ENTRY_OVERHEAD_BYTES
+    embedder = cache_mod.CachingEmbedder(inner, max_bytes=2 * per_entry)
+    embedder.embed_texts(["a"])
+    embedder.embed_texts(["b"])
+    embedder.embed_texts(["a"])  # refresh "a"
+    embedder.embed_texts(["c"])  # evicts "b"
+    inner.calls.clear()
+
+    embedder.embed_texts(["a", "b"])
+    assert inner.calls == [["b"]]
+    assert embedder.stats()["embedding_cache"]["evictions"] >= 1
+
+
+def test_cache_expires_entries_after_ttl(embed_models, cache_mod, monkeypatch):
+    inner = _make_fake(embed_models)
+    embedder = cache_mod.CachingEmbedder(inner, max_bytes=1 << 20, ttl_seconds=10)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(cache_mod.time, "time", lambda: clock["now"])
+
+    embedder.embed_texts(["a"])
+    clock["now"] += 11
+    embedder.embed_texts(["a"])
+    assert inner.calls == [["a"], ["a"]]
+    assert embedder.stats()["embedding_cache"]["expired"] == 1
+
+
+def test_cache_keys_never_contain_query_text(cache_mod):
+    key = cache_mod.cache_key("BAAI/bge-m3", "张三 38 岁 家族史")
+    assert "张三" not in key
+    assert key != cache_mod.cache_key("all-MiniLM-L6-v2", "张三 38 岁 家族史")
+
+
+def test_cache_persists_and_reloads(embed_models, cache_mod, tmp_path):
+    path = tmp_path / "embed-cache.json"
+    inner = _make_fake(embed_models)
+    embedder = cache_mod.CachingEmbedder(inner, persist_path=str(path), flush_seconds=0)
+    vectors = embedder.embed_texts(["warm me"])
+    embedder.close()
+    assert path.exists()
+    assert "warm me" not in path.read_text(encoding="utf-8")
+
+    fresh_inner = _make_fake(embed_models)
+    restarted = cache_mod.CachingEmbedder(fresh_inner, persist_path=str(path), flush_seconds=0)
+    assert restarted.embed_texts(["warm me"]) == vectors
+    assert fresh_inner.calls == []
+
+
+def test_cache_ignores_snapshot_from_other_model(embed_models, cache_mod, tmp_path):
+    path = tmp_path / "embed-cache.json"
+    embedder = cache_mod.CachingEmbedder(
+        _make_fake(embed_models), persist_path=str(path), flush_seconds=0
+    )
+    embedder.embed_texts(["x"])
+    embedder.close()
+
+    other = _make_fake(embed_models)
+    other.model_name = "another-model"
+    assert cache_mod.CachingEmbedder(other, persist_path=str(path), flush_seconds=0).load() == 0
+
+
+def test_create_service_embedder_puts_cache_in_front_of_batching(embed_models, monkeypatch):
+    factory = importlib.import_module("embed_models.factory")
+    inner = _make_fake(embed_models)
+    monkeypatch.setattr(factory, "create_embedder", lambda model_name=None: inner)
+    monkeypatch.setenv("KB_EMBED_BATCH_WINDOW_MS", "2")
+    monkeypatch.setenv("KB_EMBED_CACHE_MAX_BYTES", "4096")
+    monkeypatch.delenv("KB_EMBED_CACHE_PATH", raising=False)
+
+    stack = factory.create_service_embedder()
+    assert type(stack).__name__ == "CachingEmbedder"
+    assert type(stack.inner).__name__ == "MicroBatchingEmbedder"
+    assert stack.inner.inner is inner
+    stats = stack.stats()
+    assert {"model", "micro_batching", "embedding_cache"} <= set(stats)
+
+
+# --------------------------------------------------------------- EmbeddingStore
+
+
+@pytest.fixture(scope="module")
+def store_mod(embed_models):
+    return importlib.import_module("embed_models.store")
+
+
+def _stored(embed_models, store_mod, root, **kwargs):
+    inner = _make_fake(embed_models)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return inner
+
+    store = store_mod.EmbeddingStore(root, "fake-model", **kwargs)
+    return store_mod.StoredEmbedder(store, load), inner, loads
+
+
+def test_store_serves_repeats_across_reopen_without_loading_model(
+    embed_models, store_mod, tmp_path
+):
+    embedder, inner, _ = _stored(embed_models, store_mod, tmp_path)
+    first = embedder.embed_texts(["FSHD1 chunk", "FSHD2 chunk", "FSHD1 chunk"])
+    assert inner.calls == [["FSHD1 chunk", "FSHD2 chunk"]]
+    assert first[0] == first[2]
+
+    reopened, _, loads = _stored(embed_models, store_mod, tmp_path)
+    assert len(reopened.store) == 2
+    assert reopened.embed_texts([" FSHD2   chunk", "FSHD1 chunk"]) == [first[1], first[0]]
+    assert loads == []  # every text was stored: the model never loaded
+    assert reopened.stats()["embedding_store"]["hits"] == 2
+
+    reopened.embed_texts(["new chunk"])
+    assert loads == [1]
+    assert len(reopened.store) == 3
+
+
+def test_store_is_partitioned_by_model(embed_models, store_mod, tmp_path):
+    embedder, _, _ = _stored(embed_models, store_mod, tmp_path)
+    embedder.embed_texts(["shared text"])
+    other = store_mod.EmbeddingStore(tmp_path, "another-model")
+    assert len(other) == 0
+    assert other.get_many([store_mod.content_key("shared text")]) == [None]
+
+
+def test_store_recovers_from_partial_append(embed_models, store_mod, tmp_path):
+    embedder, _, _ = _stored(embed_models, store_mod, tmp_path)
+    embedder.embed_texts(["a", "bb"])
+    # A writer crashed after the vector but before the key landed.
+    with (embedder.store.path / "vectors.bin").open("ab") as fh:
+        fh.write(b"\x00" * 8)
+
+    reopened, inner, _ = _stored(embed_models, store_mod, tmp_path)
+    assert len(reopened.store) == 2
+    assert reopened.embed_texts(["ccc", "a"]) == [[3.0, 0.0], [1.0, 0.0]]
+    assert inner.calls == [["ccc"]]
+    assert (reopened.store.path / "vectors.bin").stat().st_size == 3 * 2 * 4
+
+
+def test_store_export_import_seeds_a_cold_store(embed_models, store_mod, tmp_path):
+    warm, _, _ = _stored(embed_models, store_mod, tmp_path / "warm")
+    vectors = warm.embed_texts(["one", "two", "three"])
+    assert store_mod.export_store(warm.store, tmp_path / "kb.npz") == 3
+
+    _, added = store_mod.import_store(tmp_path / "cold", tmp_path / "kb.npz", dtype="float16")
+    assert added == 3
+    cold, _, loads = _stored(embed_models, store_mod, tmp_path / "cold")
+    assert cold.store.dtype == "float16"
+    assert cold.embed_texts(["one", "two", "three"]) == vectors  # small ints survive float16
+    assert loads == []
+    # Re-importing the same file adds nothing.
+    assert store_mod.import_store(tmp_path / "cold", tmp_path / "kb.npz")[1] == 0
+
+
+def test_store_rejects_dimension_change(embed_models, store_mod, tmp_path):
+    embedder, _, _ = _stored(embed_models, store_mod, tmp_path)
+    embedder.embed_texts(["x"])
+    with pytest.raises(RuntimeError, match="dim=2"):
+        store_mod.EmbeddingStore(tmp_path, "fake-model", dimension=3)
+
+
+def test_create_ingest_embedder_uses_store_when_configured(embed_models, monkeypatch, tmp_path):
+    factory = importlib.import_module("embed_models.factory")
+    inner = _make_fake(embed_models)
+    monkeypatch.setattr(factory, "create_embedder", lambda model_name=None: inner)
+    monkeypatch.delenv("KB_EMBED_STORE_PATH", raising=False)
+    assert factory.create_ingest_embedder("fake-model") is inner
+
+    monkeypatch.setenv("KB_EMBED_STORE_PATH", str(tmp_path))
+    stored = factory.create_ingest_embedder("fake-model")
+    assert type(stored).__name__ == "StoredEmbedder"
+    assert stored.embed_texts(["y"]) == [[1.0, 0.0]]
+    assert stored.inner is inner
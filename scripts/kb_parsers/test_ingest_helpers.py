@@ -10,8 +10,10 @@ beyond `tmp_path` are needed.
 
 from __future__ import annotations
 
+import copy
 import importlib.util
 import sys
+import threading
 from pathlib import Path
 
 import pytest
@@ -410,6 +412,10 @@ class _StatefulBackend:
         self._fingerprints = {k: set(v) for k, v in seeded_fingerprints.items()}
         self.upserts = []  # list of [BackendChunk]
         self.scoped_deletes = []  # list of (source_key, keep_fp)
+        self.retags = []  # list of ([fingerprint], source_fingerprint)
+        # {fingerprint: BackendChunk} for every upserted chunk, so a
+        # re-ingest can reuse stored embeddings.
+        self.rows = {}
         self._supports_scoped_delete = supports_scoped_delete
 
     def list_source_fingerprints(self, source_files):
@@ -426,6 +432,21 @@ class _StatefulBackend:
             self._fingerprints.setdefault(chunk.source_file, set()).add(
                 chunk.source_fingerprint
             )
+            self.rows[chunk.fingerprint] = copy.copy(chunk)
+
+    def list_source_chunks(self, source_file):
+        return sorted(
+            (copy.copy(row) for row in self.rows.values() if row.source_file == source_file),
+            key=lambda row: row.chunk_index,
+        )
+
+    def set_source_fingerprint(self, fingerprints, source_fingerprint):
+        self.retags.append((list(fingerprints), source_fingerprint))
+        for fp in fingerprints:
+            row = self.rows[fp]
+            row.source_fingerprint = source_fingerprint
+            self._fingerprints.setdefault(row.source_file, set()).add(source_fingerprint)
+        return len(fingerprints)
 
     def delete_by_source(self, source_key):  # pragma: no cover
         # Used only when an old backend falls back; the contract change
@@ -440,6 +461,11 @@ class _StatefulBackend:
         existing = self._fingerprints.get(source_key, set())
         removed_count = sum(1 for fp in existing if fp != keep_fp)
         self._fingerprints[source_key] = {keep_fp} if keep_fp in existing else set()
+        self.rows = {
+            fp: row
+            for fp, row in self.rows.items()
+            if row.source_file != source_key or row.source_fingerprint == keep_fp
+        }
         return removed_count
 
 
@@ -611,3 +637,224 @@ def test_prune_errors_force_nonzero_exit(ingest_mod):
     assert exit_code(files_only) == 1
     assert exit_code(prune_only) == 1
     assert exit_code(both) == 1
+
+
+# ------------------------------------------------- --workers process pool
+
+def test_parallel_ingest_matches_sequential(ingest_mod, tmp_path):
+    """`--workers` must not change what gets ingested or the order of
+    the action log, even when in-flight files are capped below the
+    worker count."""
+    body = "FSHD knowledge base fixture body for the kb-ingest test suite, file {i}.\n"
+    for i in range(6):
+        (tmp_path / f"doc-{i}.md").write_text(f"# title {i}\n\n" + body.format(i=i), encoding="utf-8")
+    (tmp_path / "empty.md").write_text("# x\n", encoding="utf-8")
+
+    sequential_backend = _StatefulBackend(seeded_fingerprints={})
+    sequential = ingest_mod.ingest(
+        content_root=tmp_path,
+        backend=sequential_backend,
+        embedder=_NoopEmbedderReturningOnes(),
+    )
+    parallel_backend = _StatefulBackend(seeded_fingerprints={})
+    parallel = ingest_mod.ingest(
+        content_root=tmp_path,
+        backend=parallel_backend,
+        embedder=_NoopEmbedderReturningOnes(),
+        workers=3,
+        max_in_flight=2,
+    )
+
+    assert parallel.actions == sequential.actions
+    assert parallel.files_new == sequential.files_new == 6
+    assert parallel.files_empty == sequential.files_empty == 1
+    assert [c.fingerprint for batch in parallel_backend.upserts for c in batch] == [
+        c.fingerprint for batch in sequential_backend.upserts for c in batch
+    ]
+
+
+# ------------------------------------------ streaming embed / upsert stages
+
+def _write_docs(root, count):
+    body = "FSHD knowledge base fixture body for the kb-ingest test suite, file {i}.\n"
+    for i in range(count):
+        (root / f"doc-{i}.md").write_text(f"# title {i}\n\n" + body.format(i=i), encoding="utf-8")
+
+
+class _GatedEmbedder:
+    """Records every batch it embeds; the backend below uses `seen` to
+    prove batch k+1 was embedded while batch k was still upserting."""
+
+    model_name = "test-embedder"
+
+    def __init__(self, fail_on_call=None):
+        self.calls = 0
+        self.second_batch_started = threading.Event()
+        self.fail_on_call = fail_on_call
+
+    def embed_texts(self, texts):
+        self.calls += 1
+        if self.calls == 2:
+            self.second_batch_started.set()
+        if self.fail_on_call == self.calls:
+            raise RuntimeError("simulated embedder outage")
+        return [[1.0] for _ in texts]
+
+
+class _EventLogBackend(_StatefulBackend):
+    def __init__(self, seeded_fingerprints, embedder=None):
+        super().__init__(seeded_fingerprints)
+        self.events = []
+        self._embedder = embedder
+        self.overlapped = None
+
+    def upsert(self, chunks):
+        if self._embedder is not None and self.overlapped is None:
+            # Hold the first upsert until the embedder reaches batch 2.
+            self.overlapped = self._embedder.second_batch_started.wait(timeout=5)
+        super().upsert(chunks)
+        self.events.append(("upsert", [c.source_file for c in chunks]))
+
+    def delete_by_source_other_fingerprints(self, source_key, keep_fp):
+        self.events.append(("cleanup", source_key))
+        return super().delete_by_source_other_fingerprints(source_key, keep_fp)
+
+
+def test_embedding_overlaps_upsert(ingest_mod, tmp_path):
+    _write_docs(tmp_path, 4)
+    embedder = _GatedEmbedder()
+    backend = _EventLogBackend({}, embedder=embedder)
+
+    stats = ingest_mod.ingest(
+        content_root=tmp_path, backend=backend, embedder=embedder, batch_size=1
+    )
+
+    assert backend.overlapped is True
+    assert stats.chunks_upserted == 4
+    assert [e for e in backend.events if e[0] == "upsert"] == [
+        ("upsert", [f"doc-{i}.md"]) for i in range(4)
+    ]
+
+
+def test_stale_cleanup_runs_per_file_after_its_last_upsert(ingest_mod, tmp_path):
+    _write_docs(tmp_path, 3)
+    backend = _EventLogBackend({f"doc-{i}.md": {"old-fp"} for i in range(3)})
+
+    stats = ingest_mod.ingest(
+        content_root=tmp_path,
+        backend=backend,
+        embedder=_NoopEmbedderReturningOnes(),
+        batch_size=2,
+    )
+
+    assert stats.files_updated == 3
+    # Batches: [doc-0, doc-1], [doc-2]. Each file is cleaned up right
+    # after the batch holding its last chunk, never before.
+    assert backend.events == [
+        ("upsert", ["doc-0.md", "doc-1.md"]),
+        ("cleanup", "doc-0.md"),
+        ("cleanup", "doc-1.md"),
+        ("upsert", ["doc-2.md"]),
+        ("cleanup", "doc-2.md"),
+    ]
+    assert [a for a in stats.actions if a.startswith("upsert")] == [
+        "upsert   batch 1: 2 chunks",
+        "upsert   batch 2: 1 chunks",
+    ]
+
+
+def test_stage_failure_propagates_and_skips_unfinished_cleanup(ingest_mod, tmp_path):
+    _write_docs(tmp_path, 4)
+    backend = _EventLogBackend({f"doc-{i}.md": {"old-fp"} for i in range(4)})
+
+    with pytest.raises(RuntimeError, match="simulated embedder outage"):
+        ingest_mod.ingest(
+            content_root=tmp_path,
+            backend=backend,
+            embedder=_GatedEmbedder(fail_on_call=2),
+            batch_size=1,
+        )
+
+    # Only the file whose chunks all landed was cleaned up; the rest
+    # keep their old fingerprints for the next run to retry.
+    assert backend.events == [("upsert", ["doc-0.md"]), ("cleanup", "doc-0.md")]
+    assert backend._fingerprints["doc-1.md"] == {"old-fp"}
+
+
+# ------------------------------------------ chunk-level embedding reuse
+
+_SECTIONS = [
+    "## Genetics\n\nFSHD1 is caused by D4Z4 contraction on chromosome 4q35 in most patients.\n",
+    "## Symptoms\n\nFacial and shoulder girdle weakness is usually the first clinical sign.\n",
+    "## Management\n\nPhysical therapy and orthoses help maintain mobility over the long term.\n",
+]
+
+
+class _CountingEmbedder(_NoopEmbedderReturningOnes):
+    def __init__(self, model_name="test-embedder"):
+        self.model_name = model_name
+        self.texts = []
+
+    def embed_texts(self, texts):
+        self.texts.extend(texts)
+        return super().embed_texts(texts)
+
+
+def _ingest_twice(ingest_mod, tmp_path, sections, second_embedder):
+    src = tmp_path / "guide.md"
+    src.write_text("# Guide\n\n" + "\n".join(_SECTIONS), encoding="utf-8")
+    backend = _StatefulBackend(seeded_fingerprints={})
+    first = _CountingEmbedder()
+    ingest_mod.ingest(content_root=tmp_path, backend=backend, embedder=first)
+    first_rows = dict(backend.rows)
+    backend.upserts.clear()
+
+    src.write_text("# Guide\n\n" + "\n".join(sections), encoding="utf-8")
+    stats = ingest_mod.ingest(content_root=tmp_path, backend=backend, embedder=second_embedder)
+    return backend, first, first_rows, stats
+
+
+def test_reingest_embeds_only_changed_chunks(ingest_mod, tmp_path):
+    edited = list(_SECTIONS)
+    edited[1] = "## Symptoms\n\nFacial and shoulder girdle weakness, often asymmetric, comes first.\n"
+    embedder = _CountingEmbedder()
+    backend, first, first_rows, stats = _ingest_twice(ingest_mod, tmp_path, edited, embedder)
+
+    assert len(first.texts) == 3
+    assert len(embedder.texts) == 1 and "asymmetric" in embedder.texts[0]
+    assert stats.files_updated == 1
+    assert (stats.chunks_reused, stats.chunks_unchanged, stats.chunks_upserted) == (2, 2, 1)
+    # Only the edited chunk is written; the two unchanged rows are
+    # re-tagged with the new file fingerprint and survive the cleanup.
+    assert [[c.content for c in batch] for batch in backend.upserts] == [[embedder.texts[0]]]
+    (retagged, new_fp), = backend.retags
+    assert set(retagged) < set(first_rows)
+    assert {row.source_fingerprint for row in backend.rows.values()} == {new_fp}
+    assert len(backend.rows) == 3
+
+
+def test_reingest_with_other_embed_model_reembeds_everything(ingest_mod, tmp_path):
+    embedder = _CountingEmbedder(model_name="other-embedder")
+    edited = _SECTIONS[:2] + ["## Management\n\nPhysical therapy helps maintain mobility.\n"]
+    backend, _, _, stats = _ingest_twice(ingest_mod, tmp_path, edited, embedder)
+
+    assert len(embedder.texts) == 3
+    assert (stats.chunks_reused, stats.chunks_unchanged) == (0, 0)
+    assert backend.retags == []
+
+
+def test_reingest_reuses_embeddings_of_shifted_chunks(ingest_mod, tmp_path):
+    """Inserting a section shifts every later chunk_index, and with it
+    the fingerprint; the content match still avoids re-embedding."""
+    inserted = "## Diagnosis\n\nGenetic testing measures the D4Z4 repeat array size directly.\n"
+    embedder = _CountingEmbedder()
+    backend, _, first_rows, stats = _ingest_twice(
+        ingest_mod, tmp_path, [_SECTIONS[0], inserted] + _SECTIONS[1:], embedder
+    )
+
+    assert len(embedder.texts) == 1 and "Genetic testing" in embedder.texts[0]
+    assert stats.chunks_reused == 3
+    # `chunks_in_file` moved from 3 to 4, so every row is rewritten,
+    # but with the stored vectors; shifted chunks get new fingerprints.
+    assert (stats.chunks_unchanged, stats.chunks_upserted) == (0, 4)
+    assert len(backend.rows) == 4
@@ -10,6 +10,7 @@ from __future__ import annotations
 
 import importlib
 import sys
+import time
 from pathlib import Path
 
 import pytest
@@ -328,3 +329,74 @@ def test_dev_placeholder_matches_docker_compose_yaml(kb_service):
         f'because the runtime token would no longer equal the constant the '
         f'guard compares against.'
     )
+
+
+# --------------------------------------------------------------- _AdmissionGate
+
+
+def test_admission_gate_sheds_when_queue_is_full(kb_service):
+    """One slot busy + zero queue depth means the next caller is shed
+    immediately instead of blocking the handler thread."""
+    gate = kb_service._AdmissionGate(max_concurrency=1, max_queue=0, queue_timeout=5)
+    assert gate.acquire() is True
+    assert gate.acquire() is False
+    snap = gate.snapshot()
+    assert snap['inFlight'] == 1
+    assert snap['shed'] == 1
+    gate.release()
+    assert gate.acquire() is True
+    gate.release()
+    assert gate.snapshot()['inFlight'] == 0
+
+
+def test_admission_gate_queued_request_gets_freed_slot(kb_service):
+    import threading
+
+    gate = kb_service._AdmissionGate(max_concurrency=1, max_queue=1, queue_timeout=5)
+    assert gate.acquire() is True
+
+    result = {}
+    waiter = threading.Thread(target=lambda: result.setdefault('ok', gate.acquire()))
+    waiter.start()
+    # Wait until the second caller is parked in the queue.
+    for _ in range(200):
+        if gate.snapshot()['queued'] == 1:
+            break
+        threading.Event().wait(0.01)
+    assert gate.snapshot()['queued'] == 1
+    # Queue is full now: a third caller is shed.
+    assert gate.acquire() is False
+
+    gate.release()
+    waiter.join(timeout=5)
+    assert result['ok'] is True
+    snap = gate.snapshot()
+    assert snap['inFlight'] == 1
+    assert snap['queued'] == 0
+
+
+def test_admission_gate_times_out_queued_request(kb_service):
+    gate = kb_service._AdmissionGate(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    assert gate.acquire() is True
+    assert gate.acquire() is False
+    snap = gate.snapshot()
+    assert snap['queued'] == 0
+    assert snap['shed'] == 1
+
+
+def test_admission_gate_zero_timeout_sheds_without_waiting(kb_service):
+    gate = kb_service._AdmissionGate(max_concurrency=1, max_queue=4, queue_timeout=0)
+    assert gate.acquire() is True
+    started = time.monotonic()
+    assert gate.acquire() is False
+    assert time.monotonic() - started < 1.0
+    assert gate.snapshot()['shed'] == 1
+
+
+def test_admission_gate_concurrency_defaults_to_pool_max(kb_service, monkeypatch):
+    monkeypatch.setenv('KB_PG_POOL_MAX', '6')
+    monkeypatch.delenv('KB_SERVICE_MAX_CONCURRENCY', raising=False)
+    monkeypatch.setenv('KB_SERVICE_MAX_QUEUE', '3')
+    gate = kb_service._build_admission_gate()
+    assert gate.max_concurrency == 6
+    assert gate.max_queue == 3
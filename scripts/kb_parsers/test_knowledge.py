@@ -0,0 +1,364 @@
+"""Tests for `apps/api/knowledge.py` (FSHDKnowledgeBase.search_multi).
+
+The orchestrator is exercised against an in-memory backend and a
+deterministic embedder so the merge / dedup / rank / cache behaviour
+can be pinned without Postgres or a transformer model.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+_HERE = Path(__file__).resolve().parent
+_API_ROOT = _HERE.parent.parent / "apps" / "api"
+
+
+@pytest.fixture(scope="module")
+def knowledge():
+    if str(_API_ROOT) not in sys.path:
+        sys.path.insert(0, str(_API_ROOT))
+    return importlib.import_module("knowledge")
+
+
+_LONG = "，这是一段足够长的测试文本，用来通过最小长度的垃圾过滤规则。"
+
+
+def _make_backend(knowledge, hits_per_query, version="1", diversified=None, two_phase=False):
+    QueryHit = knowledge.QueryHit
+    CandidateHit = knowledge.CandidateHit
+
+    def _fp(hit):
+        return hit["fingerprint"] or knowledge._fingerprint(knowledge._norm_text(hit["content"]))
+
+    class _FakeBackend(knowledge.VectorBackend):
+        id = "fake"
+
+        def __init__(self):
+            self.version = version
+            self.query_calls = 0
+            self.diversified_calls = 0
+            self.hydrated = []
+            self.version_calls = 0
+
+        def query_multi(self, query_embeddings, fetch_k, where=None):
+            self.query_calls += 1
+            return [
+                [QueryHit(**hit) for hit in hits_per_query[i]][:fetch_k]
+                for i in range(len(query_embeddings))
+            ]
+
+        def query_diversified(self, query_embeddings, fetch_k, final_n, max_per_source, where=None):
+            self.diversified_calls += 1
+            if diversified is None:
+                return None
+            return [[QueryHit(**hit) for hit in bucket] for bucket in diversified]
+
+        def query_ids_multi(self, query_embeddings, fetch_k, where=None):
+            if not two_phase:
+                return None
+            self.query_calls += 1
+            return [
+                [
+                    CandidateHit(
+                        fingerprint=_fp(hit),
+                        distance=hit["distance"],
+                        source_file=hit["source_file"],
+                        is_junk=hit["is_junk"],
+                    )
+                    for hit in hits_per_query[i][:fetch_k]
+                ]
+                for i in range(len(query_embeddings))
+            ]
+
+        def hydrate(self, fingerprints):
+            self.hydrated.append(list(fingerprints))
+            bodies = {_fp(hit): hit for hits in hits_per_query for hit in hits}
+            return {fp: QueryHit(**bodies[fp]) for fp in fingerprints if fp in bodies}
+
+        def corpus_version(self):
+            self.version_calls += 1
+            return self.version
+
+        def upsert(self, chunks):  # pragma: no cover
+            raise NotImplementedError
+
+        def delete_fingerprints(self, fingerprints):  # pragma: no cover
+            raise NotImplementedError
+
+        def list_source_fingerprints(self, source_files):  # pragma: no cover
+            raise NotImplementedError
+
+        def delete_by_source(self, source_file):  # pragma: no cover
+            raise NotImplementedError
+
+    return _FakeBackend()
+
+
+def _make_embedder(knowledge):
+    class _FakeEmbedder(knowledge.Embedder):
+        model_name = "fake-model"
+        dimension = 2
+
+        def __init__(self):
+            self.calls = 0
+
+        def embed_texts(self, texts):
+            self.calls += 1
+            return [[1.0, 0.0] for _ in texts]
+
+    return _FakeEmbedder()
+
+
+def _hit(text, distance, source, fingerprint=None, is_junk=None):
+    return {
+        "content": text + _LONG,
+        "metadata": {"source_file": source},
+        "distance": distance,
+        "fingerprint": fingerprint,
+        "source_file": source,
+        "is_junk": is_junk,
+    }
+
+
+# --------------------------------------------------------------- search_multi
+
+
+def test_search_multi_merges_dedups_and_ranks(knowledge):
+    hits = [
+        [_hit("甲", 0.30, "a.md"), _hit("乙", 0.10, "b.md"), _hit("目录 垃圾", 0.01, "c.md")],
+        [_hit("乙", 0.12, "b.md"), _hit("丙", 0.20, "a.md")],
+    ]
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=_make_backend(knowledge, hits), embedder=_make_embedder(knowledge)
+    )
+    result = kb.search_multi("问题", ["q1", "q2"], final_n=8, fetch_k=10, max_per_source=4)
+    contents = [c["content"][:1] for c in result["chunks"]]
+    assert contents == ["乙", "丙", "甲"]
+    assert result["metadata"]["cache_hit"] is False
+
+
+def test_search_multi_caps_chunks_per_source(knowledge):
+    hits = [[_hit(f"文{i}", 0.1 * i, "same.md") for i in range(1, 6)]]
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=_make_backend(knowledge, hits), embedder=_make_embedder(knowledge)
+    )
+    result = kb.search_multi("问题", ["q"], final_n=8, fetch_k=10, max_per_source=2)
+    assert len(result["chunks"]) == 2
+
+
+# --------------------------------------------------------------- RetrievalResultCache
+
+
+def test_result_cache_serves_repeat_without_backend(knowledge):
+    backend = _make_backend(knowledge, [[_hit("甲", 0.1, "a.md")]])
+    embedder = _make_embedder(knowledge)
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=backend,
+        embedder=embedder,
+        result_cache=knowledge.RetrievalResultCache(version_check_seconds=60),
+    )
+    first = kb.search_multi("FSHD 是什么病", ["FSHD 是什么病"])
+    second = kb.search_multi("FSHD 是什么病", ["FSHD 是什么病"])
+
+    assert first["metadata"]["cache_hit"] is False
+    assert second["metadata"]["cache_hit"] is True
+    assert second["chunks"] == first["chunks"]
+    assert backend.query_calls == 1
+    assert embedder.calls == 1
+    # The version is only polled once inside the check interval.
+    assert backend.version_calls == 1
+    assert kb.result_cache.stats()["hits"] == 1
+
+
+def test_result_cache_invalidates_on_corpus_version_change(knowledge):
+    backend = _make_backend(knowledge, [[_hit("甲", 0.1, "a.md")]])
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=backend,
+        embedder=_make_embedder(knowledge),
+        result_cache=knowledge.RetrievalResultCache(version_check_seconds=0),
+    )
+    kb.search_multi("问题", ["q"])
+    backend.version = "2"
+    again = kb.search_multi("问题", ["q"])
+    assert again["metadata"]["cache_hit"] is False
+    assert backend.query_calls == 2
+    assert kb.result_cache.stats()["invalidations"] == 1
+
+
+def test_result_cache_keys_include_search_knobs(knowledge):
+    backend = _make_backend(knowledge, [[_hit("甲", 0.1, "a.md")]])
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=backend,
+        embedder=_make_embedder(knowledge),
+        result_cache=knowledge.RetrievalResultCache(version_check_seconds=60),
+    )
+    kb.search_multi("问题", ["q"], final_n=8)
+    kb.search_multi("问题", ["q"], final_n=4)
+    kb.search_multi("问题", ["q"], final_n=8, where={"language": "zh"})
+    assert backend.query_calls == 3
+
+
+def test_result_cache_bypassed_without_corpus_version(knowledge):
+    backend = _make_backend(knowledge, [[_hit("甲", 0.1, "a.md")]], version=None)
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=backend,
+        embedder=_make_embedder(knowledge),
+        result_cache=knowledge.RetrievalResultCache(version_check_seconds=0),
+    )
+    kb.search_multi("问题", ["q"])
+    kb.search_multi("问题", ["q"])
+    assert backend.query_calls == 2
+    assert kb.result_cache.stats()["entries"] == 0
+
+
+def test_result_cache_hit_is_isolated_from_caller_mutation(knowledge):
+    backend = _make_backend(knowledge, [[_hit("甲", 0.1, "a.md")]])
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=backend,
+        embedder=_make_embedder(knowledge),
+        result_cache=knowledge.RetrievalResultCache(version_check_seconds=60),
+    )
+    first = kb.search_multi("问题", ["q"])
+    first["chunks"].clear()
+    second = kb.search_multi("问题", ["q"])
+    assert len(second["chunks"]) == 1
+
+
+def test_search_multi_handles_missing_distances_and_fingerprints(knowledge):
+    """Hits without a backend fingerprint (Chroma) dedup on the content
+    hash, whitespace variants included; missing distances sink."""
+    hits = [
+        [_hit("甲", None, "a.md"), _hit("乙  正文", 0.4, "b.md")],
+        [_hit("乙 正文", 0.1, "b.md"), _hit("丙", 0.2, "c.md", fingerprint="fp-c")],
+    ]
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=_make_backend(knowledge, hits), embedder=_make_embedder(knowledge)
+    )
+    result = kb.search_multi("问题", ["q1", "q2"], keep_debug_fields=True)
+    chunks = result["chunks"]
+    assert [c["content"][:1] for c in chunks] == ["丙", "乙", "甲"]
+    # First occurrence wins the dedup, keeping its own distance + query.
+    assert chunks[1]["distance"] == 0.4
+    assert chunks[1]["_hit_query"] == "q1"
+    assert chunks[1]["content"].startswith("乙 正文")
+
+
+def test_search_multi_trusts_stored_junk_flag(knowledge):
+    """A stored ingest-time verdict wins over the runtime regex; rows
+    without one (NULL, pre-016) still get the runtime check."""
+    hits = [
+        [
+            _hit("目录 但入库判定为正文", 0.1, "a.md", is_junk=False),
+            _hit("正文 但入库判定为垃圾", 0.2, "b.md", is_junk=True),
+            _hit("目录 旧数据", 0.3, "c.md"),
+            _hit("丙", 0.4, "d.md"),
+        ]
+    ]
+    kb = knowledge.FSHDKnowledgeBase(
+        backend=_make_backend(knowledge, hits), embedder=_make_embedder(knowledge)
+    )
+    result = kb.search_multi("问题", ["q"])
+    assert [c["content"][:1] for c in result["chunks"]] == ["目", "丙"]
+
+
+def test_search_multi_uses_server_side_merge_when_available(knowledge):
+    """Survivors come back in their winning query's bucket; the Python
+    merge re-ranks across buckets and query_multi is never called."""
+    survivors = [[_hit("乙", 0.3, "b.md")], [_hit("甲", 0.1, "a.md")]]
+    backend = _make_backend(knowledge, [[], []], diversified=survivors)
+    kb = knowledge.FSHDKnowledgeBase(backend=backend, embedder=_make_embedder(knowledge))
+    result = kb.search_multi("问题", ["q1", "q2"], keep_debug_fields=True)
+    assert backend.query_calls == 0
+    assert [c["content"][:1] for c in result["chunks"]] == ["甲", "乙"]
+    assert [c["_hit_query"] for c in result["chunks"]] == ["q2", "q1"]
+    assert result["metadata"]["retrieval"] == "server_merge"
+
+
+def test_search_multi_falls_back_to_query_multi(knowledge):
+    backend = _make_backend(knowledge, [[_hit("甲", 0.1, "a.md")]])
+    kb = knowledge.FSHDKnowledgeBase(backend=backend, embedder=_make_embedder(knowledge))
+    result = kb.search_multi("问题", ["q"])
+    assert backend.diversified_calls == 1
+    assert backend.query_calls == 1
+    assert result["metadata"]["retrieval"] == "query_multi"
+
+
+def test_two_phase_matches_single_phase(knowledge):
+    """Junk hydrated in the first round frees a per-source slot for a
+    candidate the round skipped; the second round must pick it up so
+    the output equals the single-phase merge."""
+    hits = [
+        [
+            _hit("甲1", 0.10, "a.md"),
+            _hit("目录 甲2", 0.20, "a.md"),
+            _hit("乙", 0.25, "b.md"),
+            _hit("甲3", 0.30, "a.md"),
+            _hit("丙", 0.40, "c.md"),
+        ],
+        [_hit("甲1", 0.05, "a.md"), _hit("丁", 0.35, "d.md")],
+    ]
+    single = knowledge.FSHDKnowledgeBase(
+        backend=_make_backend(knowledge, hits), embedder=_make_embedder(knowledge)
+    ).search_multi("问题", ["q1", "q2"], final_n=3, max_per_source=2, keep_debug_fields=True)
+
+    backend = _make_backend(knowledge, hits, two_phase=True)
+    kb = knowledge.FSHDKnowledgeBase(backend=backend, embedder=_make_embedder(knowledge))
+    result = kb.search_multi(
+        "问题", ["q1", "q2"], final_n=3, max_per_source=2, keep_debug_fields=True
+    )
+
+    assert result["chunks"] == single["chunks"]
+    assert [c["content"].split("，")[0] for c in result["chunks"]] == ["甲1", "乙", "甲3"]
+    assert result["metadata"]["retrieval"] == "two_phase"
+    assert len(backend.hydrated) == 2
+    assert len(backend.hydrated[0]) == 3
+
+
+def test_two_phase_hydrates_once_without_junk(knowledge):
+    hits = [[_hit(f"文{i}", 0.1 * i, f"{i}.md") for i in range(1, 20)]]
+    backend = _make_backend(knowledge, hits, two_phase=True)
+    kb = knowledge.FSHDKnowledgeBase(backend=backend, embedder=_make_embedder(knowledge))
+    result = kb.search_multi("问题", ["q"], final_n=4)
+    assert len(result["chunks"]) == 4
+    assert [len(batch) for batch in backend.hydrated] == [4]
+
+
+def test_chroma_dedups_same_content_under_different_ids(knowledge):
+    """Chroma ids are not content hashes, so the same text stored under
+    two ids must still take a single result slot."""
+    chroma_cloud = importlib.import_module("kb_backends.chroma_cloud")
+
+    class _FakeCollection:
+        def query(self, **kwargs):
+            text = "甲" + _LONG
+            return {
+                "ids": [["legacy-1", "ingest-2", "ingest-3"]],
+                "documents": [[text, text, "乙" + _LONG]],
+                "metadatas": [[{"source_file": "a.md"}, {"source_file": "b.md"}, {"source_file": "c.md"}]],
+                "distances": [[0.1, 0.2, 0.3]],
+            }
+
+    backend = object.__new__(chroma_cloud.ChromaCloudBackend)
+    backend.collection = _FakeCollection()
+    assert backend.query_ids_multi([[1.0, 0.0]], 3) is None
+
+    kb = knowledge.FSHDKnowledgeBase(backend=backend, embedder=_make_embedder(knowledge))
+    result = kb.search_multi("问题", ["q"])
+    assert [c["content"][:1] for c in result["chunks"]] == ["甲", "乙"]
+    assert result["metadata"]["retrieval"] == "query_multi"
+
+
+# ------------------------------------------------------------------- kb_text
+
+
+def test_is_junk_rule(knowledge):
+    kb_text = importlib.import_module("kb_text")
+    assert kb_text.is_junk("")
+    assert kb_text.is_junk("太短")
+    assert kb_text.is_junk(kb_text.norm_text("上一篇" + _LONG))
+    assert not kb_text.is_junk(kb_text.norm_text("正文" + _LONG))
+    assert kb_text.norm_text("  a \n\t b  ") == "a b"
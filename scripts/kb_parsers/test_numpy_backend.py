@@ -0,0 +1,180 @@
+"""Tests for the in-process numpy_mmap backend under apps/api/kb_backends/.
+
+Search results are checked against a plain NumPy brute-force reference,
+so the argpartition / bitmap shortcuts can't drift from exact cosine
+ranking.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+_HERE = Path(__file__).resolve().parent
+_API_ROOT = _HERE.parent.parent / "apps" / "api"
+
+
+@pytest.fixture(scope="module")
+def numpy_mod():
+    if str(_API_ROOT) not in sys.path:
+        sys.path.insert(0, str(_API_ROOT))
+    return importlib.import_module("kb_backends.numpy_mmap")
+
+
+@pytest.fixture(scope="module")
+def base_mod(numpy_mod):
+    return importlib.import_module("kb_backends.base")
+
+
+def _chunks(base_mod, count=60, dim=16, seed=7, source_fp="fp-1"):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim))
+    return [
+        base_mod.BackendChunk(
+            content=f"chunk {i}",
+            fingerprint=f"c{i}",
+            source_file=f"doc-{i % 6}.md",
+            source_fingerprint=f"{source_fp}-{i % 6}",
+            chunk_index=i // 6,
+            embedding=vectors[i].tolist(),
+            metadata={
+                "category": "genetics" if i % 3 == 0 else "care",
+                "page": i % 4,
+                "ok": i % 2 == 0,
+            },
+            embed_model="test-embedder",
+            is_junk=(i % 10 == 9),
+        )
+        for i in range(count)
+    ]
+
+
+def _reference(chunks, query, k, keep=lambda chunk: True):
+    q = np.asarray(query) / np.linalg.norm(query)
+    scored = []
+    for chunk in chunks:
+        if chunk.is_junk or not keep(chunk):
+            continue
+        v = np.asarray(chunk.embedding) / np.linalg.norm(chunk.embedding)
+        scored.append((1.0 - float(q @ v), chunk.fingerprint))
+    return [fp for _, fp in sorted(scored)[:k]]
+
+
+@pytest.fixture
+def loaded(numpy_mod, base_mod, tmp_path):
+    chunks = _chunks(base_mod)
+    backend = numpy_mod.NumpyMmapBackend(str(tmp_path / "index"))
+    backend.upsert(chunks)
+    backend.close()
+    return numpy_mod.NumpyMmapBackend(str(tmp_path / "index")), chunks
+
+
+def test_query_multi_matches_brute_force_reference(loaded):
+    backend, chunks = loaded
+    queries = np.random.default_rng(1).normal(size=(3, 16)).tolist()
+
+    results = backend.query_multi(queries, fetch_k=5)
+
+    assert len(results) == 3
+    for query, hits in zip(queries, results):
+        assert [hit.fingerprint for hit in hits] == _reference(chunks, query, 5)
+        assert [hit.distance for hit in hits] == sorted(hit.distance for hit in hits)
+        assert all(0.0 <= hit.distance <= 2.0 for hit in hits)
+        assert not any(hit.is_junk for hit in hits)
+    assert results[0][0].content.startswith("chunk ")
+
+
+def test_where_filters_use_pgvector_text_equality(loaded):
+    backend, chunks = loaded
+    query = np.random.default_rng(2).normal(size=16).tolist()
+
+    # Broad filter (masked full scan) and narrow filter (gathered rows).
+    genetics = backend.query_multi([query], fetch_k=50, where={"category": "genetics"})[0]
+    assert [h.fingerprint for h in genetics] == _reference(
+        chunks, query, 50, lambda c: c.metadata["category"] == "genetics"
+    )
+    narrow = backend.query_multi([query], fetch_k=50, where={"category": "care", "page": 2})[0]
+    assert [h.fingerprint for h in narrow] == _reference(
+        chunks, query, 50, lambda c: c.metadata["category"] == "care" and c.metadata["page"] == 2
+    )
+    # `metadata ->> 'ok'` renders JSON booleans as true/false.
+    assert backend.query_multi([query], fetch_k=50, where={"ok": "true"})[0]
+    assert backend.query_multi([query], fetch_k=5, where={"category": "missing"}) == [[]]
+
+
+def test_two_phase_candidates_hydrate_to_the_same_hits(loaded):
+    backend, _ = loaded
+    query = np.random.default_rng(3).normal(size=16).tolist()
+    full = backend.query_multi([query], fetch_k=4)[0]
+    candidates = backend.query_ids_multi([query], fetch_k=4)[0]
+
+    assert [c.fingerprint for c in candidates] == [h.fingerprint for h in full]
+    assert [c.source_file for c in candidates] == [h.source_file for h in full]
+    hydrated = backend.hydrate([c.fingerprint for c in candidates] + ["gone"])
+    assert set(hydrated) == {c.fingerprint for c in candidates}
+    assert hydrated[full[0].fingerprint].content == full[0].content
+
+
+def test_reader_picks_up_a_new_generation(numpy_mod, base_mod, loaded, tmp_path):
+    reader, chunks = loaded
+    version = reader.corpus_version()
+    writer = numpy_mod.NumpyMmapBackend(str(tmp_path / "index"))
+    assert writer.delete_by_source("doc-0.md") == 10
+    assert reader.corpus_version() == version  # not published yet
+    writer.flush()
+
+    assert reader.corpus_version() != version
+    assert reader.health()["rows"] == 50
+    assert "doc-0.md" not in reader.list_all_source_files()
+    assert len(list((tmp_path / "index").glob("vectors-*.f32"))) == 1
+
+
+def test_ingest_contract_scoped_cleanup_and_retag(numpy_mod, base_mod, tmp_path):
+    backend = numpy_mod.NumpyMmapBackend(str(tmp_path / "index"))
+    backend.upsert(_chunks(base_mod, count=12))
+    fresh = _chunks(base_mod, count=12, seed=8, source_fp="fp-2")[:6]
+    for chunk in fresh:
+        chunk.fingerprint += "-v2"
+    backend.upsert(fresh)
+
+    assert backend.list_source_fingerprints(["doc-0.md"]) == {"doc-0.md": {"fp-1-0", "fp-2-0"}}
+    assert backend.set_source_fingerprint(["c6"], "fp-2-0") == 1
+    assert backend.delete_by_source_other_fingerprints("doc-0.md", "fp-2-0") == 1
+    stored = backend.list_source_chunks("doc-0.md")
+    assert {c.fingerprint for c in stored} == {"c0-v2", "c6"}
+    assert all(abs(np.linalg.norm(c.embedding) - 1.0) < 1e-5 for c in stored)
+
+
+def test_sync_from_copies_only_changed_files(numpy_mod, base_mod, tmp_path):
+    source = numpy_mod.NumpyMmapBackend(str(tmp_path / "source"))
+    source.upsert(_chunks(base_mod))
+    source.flush()
+    index = numpy_mod.NumpyMmapBackend(str(tmp_path / "index"))
+
+    first = index.sync_from(source)
+    assert (first["files_copied"], first["chunks_copied"]) == (6, 60)
+
+    source.delete_by_source("doc-5.md")
+    changed = [c for c in _chunks(base_mod, source_fp="fp-2") if c.source_file == "doc-1.md"]
+    source.delete_by_source("doc-1.md")
+    source.upsert(changed)
+    source.flush()
+
+    second = index.sync_from(source)
+    assert (second["files_copied"], second["files_removed"]) == (1, 1)
+    query = np.random.default_rng(4).normal(size=16).tolist()
+    assert [h.fingerprint for h in index.query_multi([query], 8)[0]] == [
+        h.fingerprint for h in source.query_multi([query], 8)[0]
+    ]
+
+
+def test_factory_builds_numpy_backend(numpy_mod, monkeypatch, tmp_path):
+    factory = importlib.import_module("kb_backends.factory")
+    monkeypatch.setenv("KB_NUMPY_INDEX_PATH", str(tmp_path))
+    backend = factory.create_backend("numpy_mmap")
+    assert backend.id == "numpy_mmap"
+    assert backend.query_multi([[1.0, 0.0]], 3) == [[]]
@@ -1,9 +1,8 @@
 """Tests for the PDF parser.
 
 We don't ship binary PDF fixtures — instead we monkeypatch the
-module-level helpers (`_parse_text_layer`, `_ocr_page`,
-`_page_count`) so each test exercises a specific control flow with
-synthetic input. This keeps the suite hermetic + fast and pins the
+module-level helpers (`_parse_text_layer`, `_ocr_pages`) so each test
+exercises a specific control flow with synthetic input. This keeps the suite hermetic + fast and pins the
 contract between the parser orchestration and its helpers.
 """
 
@@ -27,6 +26,17 @@ def _section(page: int, text: str) -> ParsedSection:
     )
 
 
+def _per_page(ocr_one):
+    """Adapt a `(path, page_index) -> (text, error)` stub to the
+    batched `_ocr_pages` generator the parser calls."""
+
+    def _ocr_pages(path, page_indexes):
+        for idx in page_indexes:
+            yield (idx, *ocr_one(path, idx))
+
+    return _ocr_pages
+
+
 def test_keeps_pages_with_text_unchanged(monkeypatch, tmp_path: Path) -> None:
     monkeypatch.setattr(
         pdf_parser,
@@ -36,13 +46,12 @@ def test_keeps_pages_with_text_unchanged(monkeypatch, tmp_path: Path) -> None:
             _section(2, "more real text" * 20),
         ],
     )
-    monkeypatch.setattr(pdf_parser, "_page_count", lambda p: 2)
 
     # No OCR should run for non-empty pages — fail loudly if it does.
     def explode(*_a, **_kw):  # pragma: no cover
         raise AssertionError("OCR must not be invoked for non-empty pages")
 
-    monkeypatch.setattr(pdf_parser, "_ocr_page", explode)
+    monkeypatch.setattr(pdf_parser, "_ocr_pages", _per_page(explode))
 
     result = PdfParser().parse(tmp_path / "x.pdf")
     assert len(result.sections) == 2
@@ -58,11 +67,10 @@ def test_ocr_rescues_low_text_pages(monkeypatch, tmp_path: Path) -> None:
         "_parse_text_layer",
         lambda p: [_section(1, ""), _section(2, "good text on this page that is long enough to clear the OCR fallback threshold")],
     )
-    monkeypatch.setattr(pdf_parser, "_page_count", lambda p: 2)
     monkeypatch.setattr(
         pdf_parser,
-        "_ocr_page",
-        lambda p, idx: ("recovered text from scanned page" * 5, None),
+        "_ocr_pages",
+        _per_page(lambda p, idx: ("recovered text from scanned page" * 5, None)),
     )
 
     result = PdfParser().parse(tmp_path / "x.pdf")
@@ -85,11 +93,10 @@ def test_ocr_env_failure_surfaces_in_metadata(monkeypatch, tmp_path: Path) -> No
         "_parse_text_layer",
         lambda p: [_section(1, ""), _section(2, "good text on this page that is long enough to clear the OCR fallback threshold")],
     )
-    monkeypatch.setattr(pdf_parser, "_page_count", lambda p: 2)
     monkeypatch.setattr(
         pdf_parser,
-        "_ocr_page",
-        lambda p, idx: ("", "PDF rasterise failed (poppler/pdftoppm?): boom"),
+        "_ocr_pages",
+        _per_page(lambda p, idx: ("", "PDF rasterise failed (poppler/pdftoppm?): boom")),
     )
 
     result = PdfParser().parse(tmp_path / "x.pdf")
@@ -115,11 +122,10 @@ def test_fully_scanned_pdf_with_broken_ocr_is_a_parse_error(
         "_parse_text_layer",
         lambda p: [_section(1, ""), _section(2, "")],
     )
-    monkeypatch.setattr(pdf_parser, "_page_count", lambda p: 2)
     monkeypatch.setattr(
         pdf_parser,
-        "_ocr_page",
-        lambda p, idx: ("", "tesseract OCR failed: chi_sim not found"),
+        "_ocr_pages",
+        _per_page(lambda p, idx: ("", "tesseract OCR failed: chi_sim not found")),
     )
 
     result = PdfParser().parse(tmp_path / "x.pdf")
@@ -139,8 +145,7 @@ def test_legitimately_blank_scan_is_not_an_error(monkeypatch, tmp_path: Path) ->
         "_parse_text_layer",
         lambda p: [_section(1, ""), _section(2, "text content here")],
     )
-    monkeypatch.setattr(pdf_parser, "_page_count", lambda p: 2)
-    monkeypatch.setattr(pdf_parser, "_ocr_page", lambda p, idx: ("", None))
+    monkeypatch.setattr(pdf_parser, "_ocr_pages", _per_page(lambda p, idx: ("", None)))
 
     result = PdfParser().parse(tmp_path / "x.pdf")
     assert len(result.sections) == 1
@@ -162,10 +167,98 @@ def test_text_layer_extraction_failure_short_circuits(
     monkeypatch.setattr(pdf_parser, "_parse_text_layer", boom)
     # If OCR were called, this would fail the test.
     monkeypatch.setattr(
-        pdf_parser, "_ocr_page", lambda p, idx: pytest.fail("OCR should not run")
+        pdf_parser, "_ocr_pages", lambda p, idxs: pytest.fail("OCR should not run")
     )
 
     result = PdfParser().parse(tmp_path / "x.pdf")
     assert result.sections == []
     assert "parse_error" in result.metadata
     assert "encrypted" in result.metadata["parse_error"]
+
+
+def test_pages_total_counts_blank_pages(monkeypatch, tmp_path: Path) -> None:
+    """pages_total comes from the text-layer pass (one section per
+    page, blank ones included), not from a separate page-count parse."""
+    monkeypatch.setattr(
+        pdf_parser,
+        "_parse_text_layer",
+        lambda p: [_section(1, "real text" * 20), _section(2, ""), _section(3, "")],
+    )
+    monkeypatch.setattr(pdf_parser, "_ocr_pages", _per_page(lambda p, idx: ("", None)))
+
+    result = PdfParser().parse(tmp_path / "x.pdf")
+    assert result.metadata["pages_total"] == 3
+    assert result.metadata["pages_with_text"] == 1
+
+
+def _write_text_pdf(path: Path, pages: List[str]) -> None:
+    """Smallest PDF pdfminer reads without repair: one Helvetica text
+    line per page (empty string -> blank page)."""
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1") if text else b""
+        kids.append(len(objs) + 1)
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs) + 2} 0 R >>".encode()
+        )
+        objs.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def test_text_layer_single_pass_emits_every_page(tmp_path: Path) -> None:
+    pytest.importorskip("pdfminer")
+    pdf = tmp_path / "three.pdf"
+    _write_text_pdf(pdf, ["First page body", "", "Third page body"])
+
+    sections = pdf_parser._parse_text_layer(pdf)
+    assert [s.label for s in sections] == ["page 1", "page 2", "page 3"]
+    assert [s.text for s in sections] == ["First page body", "", "Third page body"]
+    assert [s.extra["page_index"] for s in sections] == [0, 1, 2]
+
+
+def test_ocr_pages_rasterises_contiguous_runs_in_batches(monkeypatch, tmp_path: Path) -> None:
+    """One pdf2image call per contiguous run inside each batch, results
+    back in page order, and a failed run only fails its own pages."""
+    import sys
+    import types
+
+    calls = []
+
+    def convert_from_path(path, dpi, first_page, last_page, thread_count):
+        calls.append((first_page, last_page))
+        if first_page == 6:
+            raise RuntimeError("pdftoppm crashed")
+        return [f"img{p}" for p in range(first_page, last_page + 1)]
+
+    fake_tess = types.SimpleNamespace(image_to_string=lambda image, lang: f" text of {image} ")
+    monkeypatch.setitem(sys.modules, "pdf2image", types.SimpleNamespace(convert_from_path=convert_from_path))
+    monkeypatch.setitem(sys.modules, "pytesseract", fake_tess)
+    monkeypatch.setattr(pdf_parser, "_OCR_RASTER_BATCH", 3)
+
+    results = list(pdf_parser._ocr_pages(tmp_path / "x.pdf", [5, 0, 1, 2, 9, -1]))
+
+    assert calls == [(1, 3), (6, 6), (10, 10)]
+    assert [r[0] for r in results] == [0, 1, 2, 5, 9]
+    assert results[0] == (0, "text of img1", None)
+    assert results[3][1] == "" and "pdftoppm crashed" in results[3][2]
+    assert results[4] == (9, "text of img10", None)
+
+
+def test_bad_ocr_workers_env_falls_back_to_default(monkeypatch) -> None:
+    monkeypatch.setenv("KB_OCR_WORKERS", "four")
+    assert pdf_parser._env_int("KB_OCR_WORKERS", 3) == 3
+    monkeypatch.setenv("KB_OCR_WORKERS", " 2 ")
+    assert pdf_parser._env_int("KB_OCR_WORKERS", 3) == 2